@@ -0,0 +1,41 @@
+"""
+Standalone ASGI app serving only the chat endpoints.
+
+Run chat on its own workers and keep CRUD workers free of langchain/langgraph:
+
+    CHAT_ENABLED=false uvicorn app.main:app --port 8000
+    uvicorn app.chat_app:app --port 8001
+"""
+from fastapi import FastAPI
+from fastapi.middleware.cors import CORSMiddleware
+
+from app.middleware.metrics import MetricsMiddleware
+from app.middleware.profiling import ProfilingMiddleware
+from app.middleware.tracing import TracingMiddleware
+from app.routers.chat import router as chat_router
+from app.routers.metrics import router as metrics_router
+from app.routers.profiles import router as profiles_router
+from app.utils import config
+
+app = FastAPI()
+
+app.add_middleware(
+    CORSMiddleware,
+    allow_origins=["*"],
+    allow_credentials=True,
+    allow_methods=["*"],
+    allow_headers=["*"],
+)
+
+if config.get_metrics_enabled():
+    app.add_middleware(MetricsMiddleware)
+    app.include_router(metrics_router)
+
+if config.get_tracing_enabled():
+    app.add_middleware(TracingMiddleware)
+
+if config.get_profiling_secret():
+    app.add_middleware(ProfilingMiddleware)
+    app.include_router(profiles_router)
+
+app.include_router(chat_router)
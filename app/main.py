@@ -1,8 +1,17 @@
-from fastapi import FastAPI, WebSocket, WebSocketDisconnect, HTTPException, Depends
+from fastapi import FastAPI, HTTPException, Depends
 from fastapi.middleware.cors import CORSMiddleware
-from app.services.chat_service import handle_chat
-from app.database import get_db, create_tables
+from app.utils import config
+from app.middleware.metrics import MetricsMiddleware
+from app.middleware.profiling import ProfilingMiddleware
+from app.middleware.query_stats import QueryStatsMiddleware
+from app.middleware.tracing import TracingMiddleware
+from app.routers.metrics import router as metrics_router
+from app.routers.profiles import router as profiles_router
+from app.database import get_db
+from app import migrations
 from app.models import SchemaObject, SchemaWorkflow, SchemaApp, AppStatus, User, AppUser, UserRole, SchemaRecord, Metadata
+from app.services.record_index import record_index
+from app.utils import tracing
 from sqlalchemy.orm import Session
 import json
 import os
@@ -20,6 +29,22 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+if config.get_metrics_enabled():
+    app.add_middleware(MetricsMiddleware)
+    app.include_router(metrics_router)
+
+if config.get_db_query_stats_enabled():
+    app.add_middleware(QueryStatsMiddleware)
+
+# Server spans for every request (TRACING_ENABLED); see app/utils/tracing.py
+if config.get_tracing_enabled():
+    app.add_middleware(TracingMiddleware)
+
+# Requests carrying a signed X-Profile header are profiled (see app/middleware/profiling.py)
+if config.get_profiling_secret():
+    app.add_middleware(ProfilingMiddleware)
+    app.include_router(profiles_router)
+
 # Pydantic models for API requests/responses
 class AppCreate(BaseModel):
     name: str
@@ -36,10 +61,17 @@ class AppResponse(BaseModel):
     created_at: datetime
     updated_at: datetime
 
-# Create database tables on startup
+# Chat (/ws/chat, /chat/*) can be disabled for CRUD-only workers and served
+# separately by app.chat_app
+if config.get_chat_enabled():
+    from app.routers.chat import router as chat_router
+    app.include_router(chat_router)
+
+# Schema changes are applied by `python -m app.migrations upgrade`; startup only
+# checks the recorded version (see app/migrations)
 @app.on_event("startup")
 async def startup_event():
-    create_tables()
+    migrations.check()
 
 @app.get("/apps", response_model=List[AppResponse])
 async def get_apps(db: Session = Depends(get_db)):
@@ -269,36 +301,6 @@ async def update_workflow_layout(workflow_id: int, layout_data: Dict[str, Any],
         db.rollback()
         raise HTTPException(status_code=500, detail=f"Failed to update layout: {str(e)}")
 
-@app.websocket("/ws/chat")
-async def websocket_endpoint(websocket: WebSocket):
-    await websocket.accept()
-    try:
-        while True:
-            data = await websocket.receive_text()
-            
-            # Parse the message with context
-            try:
-                parsed_data = json.loads(data)
-                messages = parsed_data.get("messages")
-                context = parsed_data.get("context", {})
-                session_id = context.get("session_id", "default")
-            except json.JSONDecodeError:
-                # Fallback for plain text messages
-                messages = None
-                session_id = "default"
-            
-            # Use the chat service to process the message and stream response
-            if messages:
-                async for chunk in handle_chat(messages=messages, session_id=session_id):
-                    await websocket.send_text(chunk)
-            else:
-                # Fallback: treat as single message
-                message = parsed_data.get("message", "") if 'parsed_data' in locals() else data
-                async for chunk in handle_chat(messages=[{"role": "user", "content": message}], session_id=session_id):
-                    await websocket.send_text(chunk)
-    except WebSocketDisconnect:
-        pass
-
 # User management endpoints
 @app.get("/users")
 async def get_users(db: Session = Depends(get_db)):
@@ -460,6 +462,12 @@ async def remove_user_from_app(app_id: int, user_id: int, db: Session = Depends(
         raise HTTPException(status_code=500, detail=f"Failed to remove user from app: {str(e)}")
 
 # Records endpoints
+def index_record(record: SchemaRecord, object_name: str = None, app_id: int = None):
+    # Keep the chat retrieval index current when chat runs in this process
+    if config.get_chat_enabled() and config.get_chat_record_retrieval_enabled():
+        with tracing.span("record.index"):
+            record_index.upsert(record.id, record.object_id, record.data or {}, object_name, app_id)
+
 @app.get("/objects/{object_id}/records")
 async def get_object_records(object_id: int, db: Session = Depends(get_db)):
     """Get all records for a specific object"""
@@ -474,18 +482,21 @@ async def create_record(object_id: int, record_data: Dict[str, Any], db: Session
     """Create a new record for an object"""
     try:
         # Check if object exists
-        object_obj = db.query(SchemaObject).filter(SchemaObject.id == object_id).first()
-        if not object_obj:
-            raise HTTPException(status_code=404, detail="Object not found")
+        with tracing.span("record.validate", object_id=object_id):
+            object_obj = db.query(SchemaObject).filter(SchemaObject.id == object_id).first()
+            if not object_obj:
+                raise HTTPException(status_code=404, detail="Object not found")
         
         record = SchemaRecord(
             object_id=object_id,
             data=record_data.get("data", {})
         )
         
-        db.add(record)
-        db.commit()
-        db.refresh(record)
+        with tracing.span("record.commit"):
+            db.add(record)
+            db.commit()
+            db.refresh(record)
+        index_record(record, object_obj.name, object_obj.app_id)
         
         return {
             "id": record.id,
@@ -503,15 +514,18 @@ async def create_record(object_id: int, record_data: Dict[str, Any], db: Session
 async def update_record(record_id: int, record_data: Dict[str, Any], db: Session = Depends(get_db)):
     """Update a record"""
     try:
-        record = db.query(SchemaRecord).filter(SchemaRecord.id == record_id).first()
-        if not record:
-            raise HTTPException(status_code=404, detail="Record not found")
+        with tracing.span("record.validate", record_id=record_id):
+            record = db.query(SchemaRecord).filter(SchemaRecord.id == record_id).first()
+            if not record:
+                raise HTTPException(status_code=404, detail="Record not found")
         
         record.data = record_data.get("data", record.data)
         record.updated_at = datetime.utcnow()
         
-        db.commit()
-        db.refresh(record)
+        with tracing.span("record.commit"):
+            db.commit()
+            db.refresh(record)
+        index_record(record)
         
         return {
             "id": record.id,
@@ -0,0 +1,65 @@
+"""
+ASGI middleware recording per-endpoint HTTP metrics.
+
+Requests are labelled by the matched route template ("/records/{record_id}")
+rather than the raw path, so label cardinality stays bounded; requests that
+match no route share the "unmatched" label. It is a plain ASGI middleware
+(not BaseHTTPMiddleware) so streaming responses are not buffered and the
+per-request cost is a few dictionary updates.
+"""
+import time
+
+from app.utils import metrics
+
+SIZE_BUCKETS = (100, 1000, 10_000, 100_000, 1_000_000, 10_000_000)
+
+requests_total = metrics.registry.counter(
+    "http_requests_total", "HTTP requests by route template, method and status", ("method", "route", "status"))
+request_seconds = metrics.registry.histogram(
+    "http_request_duration_seconds", "HTTP request latency by route template", ("method", "route"))
+response_bytes = metrics.registry.histogram(
+    "http_response_size_bytes", "HTTP response body size by route template", ("method", "route"),
+    buckets=SIZE_BUCKETS)
+requests_in_progress = metrics.registry.gauge(
+    "http_requests_in_progress", "HTTP requests currently being served", ("method",))
+
+
+def route_template(scope) -> str:
+    route = scope.get("route")
+    return getattr(route, "path_format", None) or getattr(route, "path", None) or "unmatched"
+
+
+class MetricsMiddleware:
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        method = scope["method"]
+        status = 500
+        size = 0
+
+        async def send_wrapper(message):
+            nonlocal status, size
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            elif message["type"] == "http.response.body":
+                size += len(message.get("body", b""))
+            await send(message)
+
+        in_progress_key = (method,)
+        requests_in_progress.inc_values(in_progress_key)
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            elapsed = time.perf_counter() - started
+            requests_in_progress.inc_values(in_progress_key, -1)
+            # The router stores the matched route in the scope while dispatching
+            key = (method, route_template(scope))
+            requests_total.inc_values(key + (str(status),))
+            request_seconds.observe_values(key, elapsed)
+            response_bytes.observe_values(key, size)
@@ -0,0 +1,200 @@
+"""
+On-demand profiling of single requests.
+
+A request is profiled when the X-Profile header or the ``profile`` query
+parameter carries a signature for its path:
+
+    <expires>.<hex HMAC-SHA256(PROFILING_SECRET, "<expires>:<path>")>
+
+Make one with sign() or ``python -m app.middleware.profiling /records/42``.
+The request runs under cProfile and the profile is saved as a .pstats file
+(with a .json sidecar) in PROFILE_DIR; only the newest PROFILE_MAX_FILES are
+kept. The response carries an X-Profile-Id header, and /admin/profiles lists
+and serves the saved profiles.
+
+Only one request is profiled at a time. cProfile traces the event-loop
+thread, so coroutines of other requests that run while the profiled request
+is awaiting show up in its profile too; sync endpoints running in the
+threadpool are not traced.
+"""
+import asyncio
+import cProfile
+import hashlib
+import hmac
+import io
+import json
+import os
+import pstats
+import re
+import sys
+import time
+import uuid
+from typing import Any, Dict, List, Optional
+from urllib.parse import parse_qs
+
+from app.utils import config
+
+PROFILE_HEADER = b"x-profile"
+QUERY_PARAM = "profile"
+# Signed path that grants access to the listing endpoints
+ADMIN_PATH = "/admin/profiles"
+
+_PROFILE_ID = re.compile(r"^[0-9]+-[0-9a-f]{8}$")
+
+
+def _digest(secret: str, expires: int, path: str) -> str:
+    return hmac.new(secret.encode(), f"{expires}:{path}".encode(), hashlib.sha256).hexdigest()
+
+
+def sign(path: str, ttl: float = 300, secret: Optional[str] = None) -> str:
+    """Signature allowing ``path`` to be profiled for the next ``ttl`` seconds"""
+    secret = secret if secret is not None else config.get_profiling_secret()
+    expires = int(time.time() + ttl)
+    return f"{expires}.{_digest(secret, expires, path)}"
+
+
+def verify(token: str, path: str, secret: Optional[str] = None) -> bool:
+    secret = secret if secret is not None else config.get_profiling_secret()
+    if not secret:
+        return False
+    expires, _, digest = token.partition(".")
+    if not expires.isdigit() or int(expires) < time.time():
+        return False
+    return hmac.compare_digest(digest, _digest(secret, int(expires), path))
+
+
+def request_token(scope) -> Optional[str]:
+    for name, value in scope.get("headers", []):
+        if name == PROFILE_HEADER:
+            return value.decode("latin-1")
+    query = scope.get("query_string", b"")
+    if b"profile=" in query:
+        values = parse_qs(query.decode("latin-1")).get(QUERY_PARAM)
+        if values:
+            return values[0]
+    return None
+
+
+class ProfileStore:
+    """Directory of saved profiles, pruned to the newest ``max_files``"""
+
+    def __init__(self, directory: str, max_files: int = 20):
+        self.directory = directory
+        self.max_files = max_files
+
+    def new_id(self) -> str:
+        return f"{int(time.time() * 1000)}-{uuid.uuid4().hex[:8]}"
+
+    def path(self, profile_id: str, suffix: str = ".pstats") -> Optional[str]:
+        # Ids come from URLs, so only accept the generated format
+        if not _PROFILE_ID.match(profile_id):
+            return None
+        path = os.path.join(self.directory, profile_id + suffix)
+        return path if os.path.exists(path) else None
+
+    def save(self, profile_id: str, profiler: cProfile.Profile, meta: Dict[str, Any]):
+        os.makedirs(self.directory, exist_ok=True)
+        base = os.path.join(self.directory, profile_id)
+        profiler.dump_stats(base + ".pstats")
+        with open(base + ".json", "w") as f:
+            json.dump({"id": profile_id, **meta}, f)
+        self._prune()
+
+    def list(self) -> List[Dict[str, Any]]:
+        """Metadata of saved profiles, newest first"""
+        if not os.path.isdir(self.directory):
+            return []
+        profiles = []
+        for name in sorted(os.listdir(self.directory), reverse=True):
+            if not name.endswith(".json"):
+                continue
+            try:
+                with open(os.path.join(self.directory, name)) as f:
+                    profiles.append(json.load(f))
+            except (OSError, ValueError):
+                continue
+        return profiles
+
+    def summary(self, profile_id: str, limit: int = 40, sort: str = "cumulative") -> Optional[str]:
+        """pstats text report of the top ``limit`` functions"""
+        path = self.path(profile_id)
+        if path is None:
+            return None
+        out = io.StringIO()
+        pstats.Stats(path, stream=out).strip_dirs().sort_stats(sort).print_stats(limit)
+        return out.getvalue()
+
+    def _prune(self):
+        ids = sorted({name.rsplit(".", 1)[0] for name in os.listdir(self.directory)
+                      if _PROFILE_ID.match(name.rsplit(".", 1)[0])})
+        for profile_id in ids[:max(0, len(ids) - self.max_files)]:
+            for suffix in (".pstats", ".json"):
+                try:
+                    os.remove(os.path.join(self.directory, profile_id + suffix))
+                except FileNotFoundError:
+                    pass
+
+
+_store: Optional[ProfileStore] = None
+
+
+def get_store() -> ProfileStore:
+    global _store
+    if _store is None:
+        _store = ProfileStore(config.get_profile_dir(), config.get_profile_max_files())
+    return _store
+
+
+class ProfilingMiddleware:
+    def __init__(self, app, secret: Optional[str] = None, store: Optional[ProfileStore] = None):
+        self.app = app
+        self.secret = secret if secret is not None else config.get_profiling_secret()
+        self.store = store
+        self._active = False
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not self.secret or self._active:
+            await self.app(scope, receive, send)
+            return
+        path = scope["path"]
+        token = request_token(scope)
+        if token is None or path.startswith(ADMIN_PATH) or not verify(token, path, self.secret):
+            await self.app(scope, receive, send)
+            return
+
+        store = self.store or get_store()
+        profile_id = store.new_id()
+        status = 500
+
+        async def send_wrapper(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                message["headers"] = list(message.get("headers", [])) + [(b"x-profile-id", profile_id.encode())]
+            await send(message)
+
+        self._active = True
+        profiler = cProfile.Profile()
+        started_at = time.time()
+        started = time.perf_counter()
+        profiler.enable()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            profiler.disable()
+            self._active = False
+            meta = {
+                "method": scope["method"],
+                "path": path,
+                "status": status,
+                "started_at": started_at,
+                "duration_ms": round((time.perf_counter() - started) * 1000, 2),
+            }
+            await asyncio.to_thread(store.save, profile_id, profiler, meta)
+
+
+if __name__ == "__main__":
+    # python -m app.middleware.profiling <path> [ttl_seconds]
+    if len(sys.argv) < 2:
+        sys.exit("usage: python -m app.middleware.profiling <path> [ttl_seconds]")
+    print(sign(sys.argv[1], float(sys.argv[2]) if len(sys.argv) > 2 else 300))
@@ -0,0 +1,57 @@
+"""
+ASGI middleware collecting SQL statement statistics per HTTP request.
+
+Each request runs with its own QueryStats (see app/utils/query_stats.py).
+Statement count and DB time per request feed histograms labelled by route
+template, which makes N+1 endpoints stand out on /metrics. With DEBUG=true the
+numbers are also returned as X-DB-* and Server-Timing response headers.
+Headers are written when the response starts, so for streaming responses they
+only cover statements run before the first byte.
+"""
+from app.middleware.metrics import route_template
+from app.utils import config, metrics, query_stats
+
+COUNT_BUCKETS = (0, 1, 2, 5, 10, 25, 50, 100, 250, 1000)
+
+statements_per_request = metrics.registry.histogram(
+    "http_db_statements_per_request", "SQL statements per HTTP request", ("method", "route"),
+    buckets=COUNT_BUCKETS)
+db_seconds_per_request = metrics.registry.histogram(
+    "http_db_seconds_per_request", "Total SQL statement time per HTTP request", ("method", "route"))
+
+
+def stats_headers(stats: query_stats.QueryStats):
+    total_ms = stats.total * 1000
+    return [
+        (b"x-db-statements", str(stats.count).encode()),
+        (b"x-db-time-ms", f"{total_ms:.2f}".encode()),
+        (b"x-db-slowest-ms", f"{stats.slowest * 1000:.2f}".encode()),
+        (b"server-timing", f'db;dur={total_ms:.2f};desc="{stats.count} statements"'.encode()),
+    ]
+
+
+class QueryStatsMiddleware:
+    def __init__(self, app, debug_headers=None):
+        self.app = app
+        self.debug_headers = config.get_debug_enabled() if debug_headers is None else debug_headers
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        token = query_stats.start()
+        stats = query_stats.current()
+
+        async def send_wrapper(message):
+            if self.debug_headers and message["type"] == "http.response.start":
+                message["headers"] = list(message.get("headers", [])) + stats_headers(stats)
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            query_stats.stop(token)
+            key = (scope["method"], route_template(scope))
+            statements_per_request.observe_values(key, stats.count)
+            db_seconds_per_request.observe_values(key, stats.total)
@@ -0,0 +1,40 @@
+"""
+ASGI middleware opening a server span for every HTTP request.
+
+The span continues the caller's trace when the request has a valid
+``traceparent`` header and is named after the matched route template. The
+response carries the span's context in a ``traceresponse`` header, so a slow
+response can be looked up in the span file or collector by its trace id.
+"""
+from app.middleware.metrics import route_template
+from app.utils import tracing
+
+
+def _header(scope, name: bytes):
+    for key, value in scope.get("headers", []):
+        if key == name:
+            return value.decode("latin-1")
+    return None
+
+
+class TracingMiddleware:
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or tracing.get_tracer() is None:
+            await self.app(scope, receive, send)
+            return
+
+        with tracing.span("http.request", _header(scope, b"traceparent"), method=scope["method"]) as server_span:
+            async def send_wrapper(message):
+                if message["type"] == "http.response.start":
+                    server_span.set_attribute("status", message["status"])
+                    message["headers"] = list(message.get("headers", [])) + [
+                        (b"traceresponse", server_span.traceparent.encode())]
+                await send(message)
+
+            try:
+                await self.app(scope, receive, send_wrapper)
+            finally:
+                server_span.name = f"{scope['method']} {route_template(scope)}"
@@ -0,0 +1,258 @@
+"""
+Versioned schema migrations.
+
+Each module in app/migrations/versions/ named ``NNNN_description.py`` defines
+``upgrade(m)``. ``m`` is a Migration: the connection plus helpers for changes
+that are safe on a live database. The versions applied so far are recorded in
+the ``schema_version`` table.
+
+    python -m app.migrations            # show the current and pending versions
+    python -m app.migrations upgrade    # apply pending migrations
+
+A migration runs in one transaction, together with its schema_version row.
+Set ``transactional = False`` in the module when it builds indexes or
+backfills. Index builds use CREATE INDEX CONCURRENTLY on Postgres, and that
+statement cannot run inside a transaction. A backfill commits each batch
+separately. Such a migration must be safe to re-run: the helpers skip work
+that was already done. Every DDL statement runs under
+MIGRATION_LOCK_TIMEOUT_MS, so a statement that cannot get its lock fails
+instead of blocking the writes queued behind it.
+
+The app no longer creates tables at startup. It only checks the recorded
+version (or applies pending migrations when DB_AUTO_MIGRATE=true).
+"""
+import importlib
+import logging
+import os
+import re
+import time
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Iterable, List, Optional, Sequence
+
+from sqlalchemy import Column, DateTime, Integer, MetaData, String, Table, inspect, text
+
+from app.utils import config
+
+logger = logging.getLogger(__name__)
+
+VERSIONS_DIR = os.path.join(os.path.dirname(__file__), "versions")
+_MODULE_NAME = re.compile(r"^(\d{4})_(\w+)\.py$")
+# Arbitrary key for the Postgres advisory lock serialising concurrent upgrades
+_ADVISORY_LOCK_KEY = 804_211_307
+
+_metadata = MetaData()
+schema_version = Table(
+    "schema_version", _metadata,
+    Column("version", Integer, primary_key=True, autoincrement=False),
+    Column("name", String, nullable=False),
+    Column("applied_at", DateTime, nullable=False),
+    Column("duration_ms", Integer, nullable=False),
+)
+
+
+class MigrationError(Exception):
+    pass
+
+
+class Migration:
+    """What a migration's upgrade() is given: its connection plus online-DDL helpers"""
+
+    def __init__(self, conn, transactional: bool):
+        self.conn = conn
+        self.transactional = transactional
+
+    @property
+    def dialect(self) -> str:
+        return self.conn.dialect.name
+
+    def execute(self, sql: str, params: Optional[dict] = None):
+        return self.conn.execute(text(sql), params or {})
+
+    def has_table(self, table: str) -> bool:
+        return inspect(self.conn).has_table(table)
+
+    def has_column(self, table: str, column: str) -> bool:
+        return any(c["name"] == column for c in inspect(self.conn).get_columns(table))
+
+    def has_index(self, table: str, name: str) -> bool:
+        return any(i["name"] == name for i in inspect(self.conn).get_indexes(table))
+
+    def add_column(self, table: str, column: str, ddl_type: str):
+        """Add a nullable column without a default if missing; on Postgres this does not rewrite the table"""
+        if not self.has_column(table, column):
+            self.execute(f"ALTER TABLE {table} ADD COLUMN {column} {ddl_type}")
+
+    def _require_autocommit(self, what: str):
+        if self.transactional:
+            raise MigrationError(f"{what} needs its own commits; set transactional = False in the migration")
+
+    def create_index(self, name: str, table: str, columns: Sequence[str], unique: bool = False,
+                     using: Optional[str] = None, where: Optional[str] = None):
+        """Build an index without blocking writes (CONCURRENTLY on Postgres); no-op if it exists"""
+        self._require_autocommit("create_index")
+        unique_sql = "UNIQUE " if unique else ""
+        using_sql = f" USING {using}" if using else ""
+        where_sql = f" WHERE {where}" if where else ""
+        columns_sql = ", ".join(columns)
+        if self.dialect == "postgresql":
+            valid = self.execute(
+                "SELECT i.indisvalid FROM pg_class c JOIN pg_index i ON i.indexrelid = c.oid WHERE c.relname = :name",
+                {"name": name}).scalar()
+            if valid:
+                return
+            if valid is not None:
+                # A failed concurrent build leaves an invalid index behind; drop it and build again
+                logger.warning("Rebuilding invalid index %s", name)
+                self.execute(f"DROP INDEX CONCURRENTLY IF EXISTS {name}")
+            self.execute(f"CREATE {unique_sql}INDEX CONCURRENTLY {name} ON {table}{using_sql} ({columns_sql}){where_sql}")
+        else:
+            self.execute(f"CREATE {unique_sql}INDEX IF NOT EXISTS {name} ON {table} ({columns_sql}){where_sql}")
+
+    def drop_index(self, name: str):
+        self._require_autocommit("drop_index")
+        concurrently = "CONCURRENTLY " if self.dialect == "postgresql" else ""
+        self.execute(f"DROP INDEX {concurrently}IF EXISTS {name}")
+
+    def backfill(self, table: str, assignments: str, where: Optional[str] = None,
+                 batch_size: int = 5000, rows_per_second: Optional[float] = None, params: Optional[dict] = None) -> int:
+        """UPDATE ``table`` SET ``assignments`` in primary-key chunks of ``batch_size``, each committed on its own
+
+        Runs on app.migrations.backfill without a checkpoint. ``where``
+        should exclude rows already done, so an interrupted migration can be
+        re-run. Returns the number of rows updated.
+        """
+        from app.migrations.backfill import Backfill
+
+        self._require_autocommit("backfill")
+        condition = f" AND ({where})" if where else ""
+        statement = text(f"UPDATE {table} SET {assignments} WHERE id BETWEEN :_first AND :_last{condition}")
+
+        def update(conn, first, last):
+            return conn.execute(statement, {**(params or {}), "_first": first, "_last": last}).rowcount
+
+        return Backfill(f"migration:{table}", table, update, engine=self.conn.engine, chunk_size=batch_size,
+                        rows_per_second=rows_per_second, checkpoint=False).run()["changed"]
+
+
+class MigrationScript:
+    def __init__(self, version: int, name: str, module):
+        self.version = version
+        self.name = name
+        self.module = module
+        self.transactional = getattr(module, "transactional", True)
+
+    def __repr__(self):
+        return f"<Migration {self.version:04d} {self.name}>"
+
+
+def discover(directory: str = VERSIONS_DIR, package: str = "app.migrations.versions") -> List[MigrationScript]:
+    """Migration modules in ``directory``, ordered by version"""
+    scripts = []
+    for filename in sorted(os.listdir(directory)):
+        match = _MODULE_NAME.match(filename)
+        if match is None:
+            continue
+        module = importlib.import_module(f"{package}.{filename[:-3]}")
+        scripts.append(MigrationScript(int(match.group(1)), match.group(2), module))
+    versions = [s.version for s in scripts]
+    if len(set(versions)) != len(versions):
+        raise MigrationError(f"Duplicate migration versions in {directory}: {versions}")
+    return scripts
+
+
+def applied_versions(conn) -> List[int]:
+    if not inspect(conn).has_table("schema_version"):
+        return []
+    return [row[0] for row in conn.execute(text("SELECT version FROM schema_version ORDER BY version"))]
+
+
+def current_version(engine) -> Optional[int]:
+    """Highest applied version, or None for a database that was never migrated"""
+    with engine.connect() as conn:
+        versions = applied_versions(conn)
+    return versions[-1] if versions else None
+
+
+def pending(engine, scripts: Optional[Iterable[MigrationScript]] = None) -> List[MigrationScript]:
+    scripts = discover() if scripts is None else scripts
+    with engine.connect() as conn:
+        done = set(applied_versions(conn))
+    return [s for s in scripts if s.version not in done]
+
+
+@contextmanager
+def _lock_timeout(conn):
+    # Session setting, so it also covers autocommit migrations; reset before the connection goes back to the pool
+    if conn.dialect.name != "postgresql":
+        yield
+        return
+    conn.execute(text(f"SET lock_timeout = {int(config.get_migration_lock_timeout_ms())}"))
+    try:
+        yield
+    finally:
+        conn.execute(text("RESET lock_timeout"))
+
+
+@contextmanager
+def _upgrade_lock(engine):
+    # Only one process migrates at a time (e.g. several workers with DB_AUTO_MIGRATE)
+    if engine.dialect.name != "postgresql":
+        yield
+        return
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        conn.execute(text("SELECT pg_advisory_lock(:key)"), {"key": _ADVISORY_LOCK_KEY})
+        try:
+            yield
+        finally:
+            conn.execute(text("SELECT pg_advisory_unlock(:key)"), {"key": _ADVISORY_LOCK_KEY})
+
+
+def _apply(engine, script: MigrationScript):
+    started = time.perf_counter()
+    logger.info("Applying migration %04d %s", script.version, script.name)
+
+    def record(conn):
+        conn.execute(schema_version.insert().values(
+            version=script.version, name=script.name, applied_at=datetime.utcnow(),
+            duration_ms=int((time.perf_counter() - started) * 1000)))
+
+    if script.transactional:
+        with engine.begin() as conn, _lock_timeout(conn):
+            script.module.upgrade(Migration(conn, transactional=True))
+            record(conn)
+    else:
+        with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn, _lock_timeout(conn):
+            script.module.upgrade(Migration(conn, transactional=False))
+            record(conn)
+
+
+def upgrade(engine=None, target: Optional[int] = None, scripts: Optional[Iterable[MigrationScript]] = None) -> List[int]:
+    """Apply pending migrations up to ``target`` (default: all); returns the versions applied"""
+    if engine is None:
+        from app.database import engine
+    scripts = discover() if scripts is None else list(scripts)
+    applied = []
+    with _upgrade_lock(engine):
+        schema_version.create(bind=engine, checkfirst=True)
+        for script in pending(engine, scripts):
+            if target is not None and script.version > target:
+                break
+            _apply(engine, script)
+            applied.append(script.version)
+    return applied
+
+
+def check(engine=None) -> bool:
+    """Startup check: True when the schema is current, else a warning (or an upgrade with DB_AUTO_MIGRATE)"""
+    if engine is None:
+        from app.database import engine
+    if config.get_db_auto_migrate():
+        upgrade(engine)
+        return True
+    missing = pending(engine)
+    if missing:
+        logger.warning("Database schema is behind: %d pending migration(s) up to %04d; "
+                       "run `python -m app.migrations upgrade`", len(missing), missing[-1].version)
+        return False
+    return True
@@ -0,0 +1,33 @@
+"""
+python -m app.migrations [status|upgrade [VERSION]]
+"""
+import logging
+import sys
+
+from app.database import engine
+from app.migrations import current_version, discover, pending, upgrade
+
+
+def main(argv):
+    command = argv[0] if argv else "status"
+    if command == "status":
+        scripts = discover()
+        missing = pending(engine, scripts)
+        version = current_version(engine)
+        print(f"current version: {'none' if version is None else f'{version:04d}'}")
+        for script in missing:
+            print(f"pending: {script.version:04d} {script.name}{'' if script.transactional else ' (online)'}")
+        if not missing:
+            print("up to date")
+        return 0
+    if command == "upgrade":
+        logging.basicConfig(level=logging.INFO, format="%(message)s")
+        target = int(argv[1]) if len(argv) > 1 else None
+        applied = upgrade(engine, target)
+        print(f"applied {len(applied)} migration(s)" + (f", now at {applied[-1]:04d}" if applied else ""))
+        return 0
+    print(__doc__.strip(), file=sys.stderr)
+    return 2
+
+
+sys.exit(main(sys.argv[1:]))
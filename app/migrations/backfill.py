@@ -0,0 +1,176 @@
+"""
+Chunked, resumable backfills for data fixes on large tables.
+
+    def assign(conn, first, last):
+        return conn.execute(update(objects).where(objects.c.id.between(first, last), ...)).rowcount
+
+    Backfill("object_app_ids", "objects", assign, chunk_size=1000, rows_per_second=5000).run()
+
+The runner walks the table's primary key in chunks of ``chunk_size`` rows.
+It uses keyset pagination, so gaps in the ids do not make chunks uneven. For
+each chunk it calls ``process(conn, first_id, last_id)`` in a transaction of
+the chunk's own. Locks are therefore held for one chunk only.
+
+The last id done is saved in the ``backfill_checkpoints`` table in that same
+transaction. An interrupted run resumes after the last committed chunk, and
+no chunk is applied twice. Running a finished backfill again visits only the
+rows added since (ids past the checkpoint); ``reset()`` (``--restart``)
+scans the whole table again.
+
+``rows_per_second`` throttles the scan to a target rate. On Postgres each
+chunk runs under MIGRATION_LOCK_TIMEOUT_MS. A chunk that fails with a
+transient error (a lock timeout, a deadlock, SQLite's "database is locked")
+is retried a few times.
+"""
+import logging
+import time
+from datetime import datetime
+from typing import Any, Callable, Dict, Optional
+
+from sqlalchemy import Column, DateTime, Integer, MetaData, String, Table, column, func, select, table, text
+from sqlalchemy.exc import OperationalError
+
+from app.utils import config
+
+logger = logging.getLogger(__name__)
+
+_metadata = MetaData()
+checkpoints = Table(
+    "backfill_checkpoints", _metadata,
+    Column("name", String, primary_key=True),
+    Column("last_id", Integer, nullable=True),
+    Column("rows_scanned", Integer, nullable=False, default=0),
+    Column("rows_changed", Integer, nullable=False, default=0),
+    Column("updated_at", DateTime, nullable=False),
+    Column("finished_at", DateTime, nullable=True),
+)
+
+PROGRESS_INTERVAL = 5.0
+
+
+class Backfill:
+    def __init__(self, name: str, table: str, process: Callable[[Any, int, int], Optional[int]], engine=None,
+                 chunk_size: int = 1000, rows_per_second: Optional[float] = None, checkpoint: bool = True,
+                 key: str = "id", retries: int = 3):
+        if engine is None:
+            from app.database import engine
+        self.name = name
+        self.table = table
+        self.process = process
+        self.engine = engine
+        self.chunk_size = chunk_size
+        self.rows_per_second = rows_per_second
+        self.checkpoint = checkpoint
+        self.key = key
+        self.retries = retries
+
+    def status(self) -> Optional[Dict[str, Any]]:
+        """The saved checkpoint, or None if this backfill never ran"""
+        checkpoints.create(bind=self.engine, checkfirst=True)
+        with self.engine.connect() as conn:
+            row = conn.execute(select(checkpoints).where(checkpoints.c.name == self.name)).mappings().first()
+        return dict(row) if row else None
+
+    def reset(self):
+        """Forget the checkpoint so the next run starts from the beginning"""
+        checkpoints.create(bind=self.engine, checkfirst=True)
+        with self.engine.begin() as conn:
+            conn.execute(checkpoints.delete().where(checkpoints.c.name == self.name))
+
+    def _save(self, conn, last_id, scanned, changed, finished=False):
+        now = datetime.utcnow()
+        values = {"last_id": last_id, "rows_scanned": scanned, "rows_changed": changed, "updated_at": now,
+                  "finished_at": now if finished else None}
+        result = conn.execute(checkpoints.update().where(checkpoints.c.name == self.name).values(**values))
+        if result.rowcount == 0:
+            conn.execute(checkpoints.insert().values(name=self.name, **values))
+
+    def _chunk(self, conn, after, high):
+        # First and last id and row count of the next chunk, walking the primary key index
+        key = self._key()
+        ids = select(key).where(key <= high)
+        if after is not None:
+            ids = ids.where(key > after)
+        ids = ids.order_by(key).limit(self.chunk_size).subquery()
+        return conn.execute(select(func.min(ids.c[self.key]), func.max(ids.c[self.key]), func.count())).one()
+
+    def _key(self):
+        return table(self.table, column(self.key)).c[self.key]
+
+    def _run_chunk(self, after, high, scanned, changed):
+        for attempt in range(self.retries + 1):
+            try:
+                with self.engine.begin() as conn:
+                    if conn.dialect.name == "postgresql":
+                        conn.execute(text(f"SET LOCAL lock_timeout = {int(config.get_migration_lock_timeout_ms())}"))
+                    first, last, count = self._chunk(conn, after, high)
+                    if count == 0:
+                        if self.checkpoint:
+                            self._save(conn, after, scanned, changed, finished=True)
+                        return None, 0, 0
+                    chunk_changed = self.process(conn, first, last) or 0
+                    if self.checkpoint:
+                        self._save(conn, last, scanned + count, changed + chunk_changed)
+                    return last, count, chunk_changed
+            except OperationalError as e:
+                if attempt == self.retries:
+                    raise
+                delay = 0.5 * 2 ** attempt
+                logger.warning("Backfill %s: chunk after id %s failed (%s); retrying in %.1fs",
+                               self.name, after, e.orig, delay)
+                time.sleep(delay)
+
+    def run(self) -> Dict[str, Any]:
+        """Process every remaining chunk; returns chunk, scanned and changed row counts for this run.
+        ``finished_at`` is set when an earlier run had already finished."""
+        state = self.status() if self.checkpoint else None
+        result = {"name": self.name, "chunks": 0, "scanned": 0, "changed": 0, "resumed_after": None, "seconds": 0.0,
+                  "finished_at": state["finished_at"] if state else None}
+        if result["finished_at"]:
+            logger.info("Backfill %s finished at %s; processing rows added after id %s",
+                        self.name, result["finished_at"], state["last_id"])
+        after = state["last_id"] if state else None
+        total_scanned = state["rows_scanned"] if state else 0
+        total_changed = state["rows_changed"] if state else 0
+        result["resumed_after"] = after
+        with self.engine.connect() as conn:
+            high = conn.execute(select(func.max(self._key()))).scalar()
+
+        started = last_report = time.perf_counter()
+        while high is not None:
+            last, count, chunk_changed = self._run_chunk(after, high, total_scanned, total_changed)
+            if last is None:
+                break
+            after = last
+            result["chunks"] += 1
+            result["scanned"] += count
+            result["changed"] += chunk_changed
+            total_scanned += count
+            total_changed += chunk_changed
+
+            elapsed = time.perf_counter() - started
+            if self.rows_per_second:
+                # Sleep until the scan is back down to the target rate
+                ahead = result["scanned"] / self.rows_per_second - elapsed
+                if ahead > 0:
+                    time.sleep(ahead)
+            if time.perf_counter() - last_report >= PROGRESS_INTERVAL:
+                last_report = time.perf_counter()
+                logger.info("Backfill %s: up to id %s of %s, %d rows scanned, %d changed (%.0f rows/s)",
+                            self.name, after, high, total_scanned, total_changed,
+                            result["scanned"] / max(time.perf_counter() - started, 1e-9))
+        if high is None and self.checkpoint:
+            with self.engine.begin() as conn:
+                self._save(conn, None, 0, 0, finished=True)
+        result["seconds"] = round(time.perf_counter() - started, 3)
+        logger.info("Backfill %s: %d rows scanned, %d changed in %d chunks (%.1fs)",
+                    self.name, result["scanned"], result["changed"], result["chunks"], result["seconds"])
+        return result
+
+
+def add_arguments(parser):
+    """The command-line options every backfill script shares"""
+    parser.add_argument("--chunk-size", type=int, default=1000, help="rows per transaction")
+    parser.add_argument("--rows-per-second", type=float, help="throttle the scan to this many rows per second")
+    parser.add_argument("--restart", action="store_true", help="ignore the saved checkpoint and start over")
+    return parser
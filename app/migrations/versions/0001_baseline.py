@@ -0,0 +1,85 @@
+"""
+Baseline: the schema as created by create_tables() and the migrate_add_*.py scripts.
+
+Tables that already exist are kept. Columns that the old scripts added by
+hand are added if missing, so databases from either path reach the same
+version 1. The tables are defined here rather than taken from app.models, so
+later model changes do not alter what this migration creates.
+"""
+from sqlalchemy import JSON, Column, DateTime, Enum, ForeignKey, Integer, MetaData, String, Table, Text
+
+metadata = MetaData()
+
+Table(
+    "apps", metadata,
+    Column("id", Integer, primary_key=True, index=True),
+    Column("name", String, nullable=False, index=True),
+    Column("description", Text),
+    Column("status", Enum("ACTIVE", "INACTIVE", "DRAFT", name="appstatus"), nullable=False),
+    Column("app_metadata", JSON),
+    Column("created_at", DateTime),
+    Column("updated_at", DateTime),
+)
+Table(
+    "users", metadata,
+    Column("id", Integer, primary_key=True, index=True),
+    Column("name", String, nullable=False),
+    Column("email", String, nullable=False, unique=True, index=True),
+    Column("password_hash", String, nullable=False),
+    Column("created_at", DateTime),
+    Column("updated_at", DateTime),
+)
+Table(
+    "app_users", metadata,
+    Column("id", Integer, primary_key=True, index=True),
+    Column("app_id", Integer, ForeignKey("apps.id"), nullable=False),
+    Column("user_id", Integer, ForeignKey("users.id"), nullable=False),
+    Column("role", Enum("ADMIN", "USER", "VIEWER", name="userrole"), nullable=False),
+    Column("created_at", DateTime),
+    Column("updated_at", DateTime),
+)
+Table(
+    "objects", metadata,
+    Column("id", Integer, primary_key=True, index=True),
+    Column("name", String, nullable=False, index=True),
+    Column("fields", JSON, nullable=False),
+    Column("app_id", Integer, ForeignKey("apps.id")),
+    Column("created_at", DateTime),
+    Column("updated_at", DateTime),
+)
+Table(
+    "records", metadata,
+    Column("id", Integer, primary_key=True, index=True),
+    Column("object_id", Integer, ForeignKey("objects.id"), nullable=False),
+    Column("data", JSON, nullable=False),
+    Column("created_at", DateTime),
+    Column("updated_at", DateTime),
+)
+Table(
+    "workflows", metadata,
+    Column("id", Integer, primary_key=True, index=True),
+    Column("name", String, nullable=False, index=True),
+    Column("steps", JSON, nullable=False),
+    Column("layout", JSON),
+    Column("app_id", Integer, index=True),
+    Column("created_at", DateTime),
+    Column("updated_at", DateTime),
+)
+Table(
+    "metadata", metadata,
+    Column("id", Integer, primary_key=True, index=True),
+    Column("key", String, nullable=False, unique=True, index=True),
+    Column("value", JSON, nullable=False),
+    Column("description", Text),
+    Column("app_id", Integer, ForeignKey("apps.id")),
+    Column("created_at", DateTime),
+    Column("updated_at", DateTime),
+)
+
+
+def upgrade(m):
+    metadata.create_all(bind=m.conn, checkfirst=True)
+    # Columns the old scripts added to existing tables
+    m.add_column("workflows", "app_id", "INTEGER")
+    m.add_column("workflows", "layout", "JSON")
+    m.add_column("objects", "app_id", "INTEGER REFERENCES apps(id)")
@@ -0,0 +1,18 @@
+"""
+Indexes for the hot lookups, built without blocking writes.
+
+- records (object_id, id): record lists per object and find_records, which pages by id.
+- records (updated_at): the record index's incremental sync.
+- objects (app_id), metadata (app_id), app_users (app_id, user_id) and
+  app_users (user_id): per-app and per-user listings.
+"""
+transactional = False
+
+
+def upgrade(m):
+    m.create_index("ix_records_object_id_id", "records", ["object_id", "id"])
+    m.create_index("ix_records_updated_at", "records", ["updated_at"])
+    m.create_index("ix_objects_app_id", "objects", ["app_id"])
+    m.create_index("ix_metadata_app_id", "metadata", ["app_id"])
+    m.create_index("ix_app_users_app_id_user_id", "app_users", ["app_id", "user_id"])
+    m.create_index("ix_app_users_user_id", "app_users", ["user_id"])
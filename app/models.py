@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Text, DateTime, JSON, Enum, ForeignKey, Table
+from sqlalchemy import Column, Integer, String, Text, DateTime, JSON, Enum, ForeignKey, Table, Index
 from sqlalchemy.sql import func
 from sqlalchemy.orm import relationship
 from datetime import datetime
@@ -27,10 +27,11 @@ class User(Base):
 
 class AppUser(Base):
     __tablename__ = "app_users"
+    __table_args__ = (Index("ix_app_users_app_id_user_id", "app_id", "user_id"),)
     
     id = Column(Integer, primary_key=True, index=True)
     app_id = Column(Integer, ForeignKey("apps.id"), nullable=False)
-    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False, index=True)
     role = Column(Enum(UserRole), default=UserRole.USER, nullable=False)
     created_at = Column(DateTime, default=func.now())
     updated_at = Column(DateTime, default=func.now(), onupdate=func.now())
@@ -41,18 +42,20 @@ class SchemaObject(Base):
     id = Column(Integer, primary_key=True, index=True)
     name = Column(String, nullable=False, index=True)
     fields = Column(JSON, nullable=False)  # Store fields as JSON
-    app_id = Column(Integer, ForeignKey("apps.id"), nullable=True)  # Reference to app
+    app_id = Column(Integer, ForeignKey("apps.id"), nullable=True, index=True)  # Reference to app
     created_at = Column(DateTime, default=func.now())
     updated_at = Column(DateTime, default=func.now(), onupdate=func.now())
 
 class SchemaRecord(Base):
     __tablename__ = "records"
+    # Per-object listings page by id; keep in step with app/migrations/versions
+    __table_args__ = (Index("ix_records_object_id_id", "object_id", "id"),)
     
     id = Column(Integer, primary_key=True, index=True)
     object_id = Column(Integer, ForeignKey("objects.id"), nullable=False)
     data = Column(JSON, nullable=False)  # Store record data as JSON
     created_at = Column(DateTime, default=func.now())
-    updated_at = Column(DateTime, default=func.now(), onupdate=func.now())
+    updated_at = Column(DateTime, default=func.now(), onupdate=func.now(), index=True)
 
 class SchemaWorkflow(Base):
     __tablename__ = "workflows"
@@ -83,6 +86,6 @@ class Metadata(Base):
     key = Column(String, nullable=False, index=True, unique=True)
     value = Column(JSON, nullable=False)  # Store configuration as JSON
     description = Column(Text, nullable=True)
-    app_id = Column(Integer, ForeignKey("apps.id"), nullable=True)  # Optional app-specific metadata
+    app_id = Column(Integer, ForeignKey("apps.id"), nullable=True, index=True)  # Optional app-specific metadata
     created_at = Column(DateTime, default=func.now())
     updated_at = Column(DateTime, default=func.now(), onupdate=func.now()) 
\ No newline at end of file
@@ -0,0 +1,150 @@
+"""
+Chat endpoints: the /ws/chat WebSocket, the /chat/stream SSE endpoint and
+chat statistics. Included by app.main, or served on its own by app.chat_app.
+
+The LLM client and graph are built lazily by chat_service, so importing this
+router stays cheap until the first chat turn.
+"""
+import json
+from contextlib import asynccontextmanager
+from typing import Any, Dict
+
+from fastapi import APIRouter, HTTPException, Request, WebSocket
+from fastapi.responses import StreamingResponse
+from starlette.requests import HTTPConnection
+
+from app.services import chat_service
+from app.services.chat_pipeline import GenerationRegistry
+from app.services.chat_protocol import ChatConnection, chat_request_from_dict
+from app.services.coalescer import CoalesceSettings
+from app.services.connection_manager import ConnectionSettings, manager as connection_manager
+from app.utils import config, metrics
+
+@asynccontextmanager
+async def chat_lifespan(app):
+    if config.get_chat_eager_init():
+        chat_service.init_chat()
+    yield
+
+router = APIRouter(lifespan=chat_lifespan)
+
+def coalesce_settings_for(connection: HTTPConnection) -> CoalesceSettings:
+    """Read per-connection coalescing from ?coalesce_bytes=&coalesce_ms= query params"""
+    params = connection.query_params
+    try:
+        return CoalesceSettings(
+            max_bytes=int(params.get("coalesce_bytes", config.get_chat_coalesce_bytes())),
+            max_delay_ms=float(params.get("coalesce_ms", config.get_chat_coalesce_ms()))
+        )
+    except ValueError:
+        return CoalesceSettings(config.get_chat_coalesce_bytes(), config.get_chat_coalesce_ms())
+
+def connection_settings_for(websocket: WebSocket) -> ConnectionSettings:
+    """Outbound queue settings, with ?slow_policy= and ?heartbeat_s= overrides"""
+    params = websocket.query_params
+    defaults = ConnectionSettings(
+        max_queue=config.get_chat_send_queue_size(),
+        policy=config.get_chat_slow_consumer_policy(),
+        send_timeout=config.get_chat_send_timeout_seconds(),
+        heartbeat_interval=config.get_chat_heartbeat_seconds(),
+        idle_timeout=config.get_chat_idle_timeout_seconds()
+    )
+    try:
+        return ConnectionSettings(
+            max_queue=defaults.max_queue,
+            policy=params.get("slow_policy", defaults.policy),
+            send_timeout=defaults.send_timeout,
+            heartbeat_interval=float(params.get("heartbeat_s", defaults.heartbeat_interval)),
+            idle_timeout=defaults.idle_timeout
+        )
+    except ValueError:
+        return defaults
+
+@router.websocket("/ws/chat")
+async def websocket_endpoint(websocket: WebSocket):
+    await websocket.accept()
+    outbound = connection_manager.connect(websocket, connection_settings_for(websocket))
+    try:
+        # Legacy text frames and framed, multiplexed streams share the socket (see chat_protocol)
+        connection = ChatConnection(outbound, chat_service.handle_chat, coalesce_settings_for(websocket))
+        await connection.run()
+    finally:
+        await connection_manager.disconnect(outbound)
+
+# SSE generations, kept for a while so clients can resume with Last-Event-ID
+sse_generations = GenerationRegistry(
+    ttl_seconds=config.get_chat_sse_resume_ttl_seconds(),
+    orphan_grace=config.get_chat_sse_orphan_grace_seconds()
+)
+
+def format_sse(event_id: str, event: Dict[str, Any]) -> str:
+    return f"id: {event_id}\nevent: {event['type']}\ndata: {json.dumps(event)}\n\n"
+
+async def stream_sse_chat(request: Request, payload: Dict[str, Any]):
+    """Start or resume an SSE chat stream; payload uses the same shape as /ws/chat frames"""
+    last_event_id = request.headers.get("last-event-id") or request.query_params.get("last_event_id")
+
+    chat_request = chat_request_from_dict(payload)
+    generation = None
+    after = -1
+    if last_event_id:
+        # Event ids are "<generation id>:<event index>"; only the session that started it may resume
+        generation_id, _, index = last_event_id.rpartition(":")
+        generation = sse_generations.get(generation_id, chat_request.get("session_id", "default"))
+        if generation is None or not index.isdigit():
+            raise HTTPException(status_code=404, detail="Stream not found or expired")
+        after = int(index)
+    else:
+        if chat_request["type"] != "chat":
+            raise HTTPException(status_code=400, detail="Expected a chat message")
+        generation = sse_generations.start(chat_service.handle_chat, chat_request, coalesce_settings_for(request))
+
+    async def event_stream():
+        async for index, event in generation.follow(after):
+            yield format_sse(f"{generation.id}:{index}", {"type": event["type"], "stream_id": generation.id, **event})
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@router.post("/chat/stream")
+async def chat_stream(request: Request, payload: Dict[str, Any] = None):
+    """Stream a chat reply as Server-Sent Events (body: {"messages" | "message", "context"})"""
+    return await stream_sse_chat(request, payload or {})
+
+@router.get("/chat/stream")
+async def chat_stream_get(request: Request, message: str = "", session_id: str = "default", cache: bool = None,
+                          parse: bool = False, app_id: int = None, object_id: int = None):
+    """EventSource-friendly variant of POST /chat/stream for single prompts"""
+    payload = {"message": message, "context": {"session_id": session_id, "app_id": app_id, "object_id": object_id},
+               "parse": parse}
+    if cache is not None:
+        payload["context"]["cache"] = cache
+    return await stream_sse_chat(request, payload)
+
+@router.get("/chat/stats")
+async def get_chat_stats():
+    """Get chat admission queue and response cache statistics"""
+    return {
+        "admission": chat_service.admission.stats(),
+        "cache": chat_service.response_cache.stats(),
+        "routes": chat_service.route_stats(),
+        "timings": metrics.registry.snapshot("chat_"),
+        "connections": connection_manager.summary(),
+        "sse_generations": sse_generations.stats()
+    }
+
+@router.get("/chat/sessions/{session_id}/timings")
+async def get_chat_session_timings(session_id: str):
+    """Get timing summaries of a session's recent chat turns"""
+    context = chat_service.context_store.get(session_id)
+    if context is None:
+        raise HTTPException(status_code=404, detail="Session not found")
+    return context.timings_summary()
+
+@router.get("/chat/connections")
+async def get_chat_connections():
+    """Get live chat sockets with per-socket throughput statistics"""
+    return connection_manager.snapshot()
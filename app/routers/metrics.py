@@ -0,0 +1,14 @@
+"""Prometheus scrape endpoint for the process-wide metrics registry"""
+from fastapi import APIRouter
+from fastapi.responses import PlainTextResponse
+
+from app.utils import metrics
+
+router = APIRouter()
+
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+@router.get("/metrics", include_in_schema=False)
+async def get_metrics():
+    return PlainTextResponse(metrics.render_prometheus(metrics.registry), media_type=PROMETHEUS_CONTENT_TYPE)
@@ -0,0 +1,36 @@
+"""Admin endpoints listing and serving profiles saved by ProfilingMiddleware"""
+from fastapi import APIRouter, Depends, HTTPException, Request
+from fastapi.responses import FileResponse, PlainTextResponse
+
+from app.middleware import profiling
+
+
+def require_signature(request: Request):
+    # Same signature scheme as profiled requests, signed for ADMIN_PATH
+    token = request.headers.get("x-profile") or request.query_params.get(profiling.QUERY_PARAM)
+    if not token or not profiling.verify(token, profiling.ADMIN_PATH):
+        raise HTTPException(status_code=403, detail="Missing or invalid profile signature")
+
+
+router = APIRouter(prefix=profiling.ADMIN_PATH, dependencies=[Depends(require_signature)],
+                   include_in_schema=False)
+
+
+@router.get("")
+async def list_profiles():
+    return profiling.get_store().list()
+
+
+@router.get("/{profile_id}")
+async def get_profile(profile_id: str, format: str = "text", sort: str = "cumulative", limit: int = 40):
+    """pstats text report (default) or the raw .pstats file with format=pstats"""
+    store = profiling.get_store()
+    path = store.path(profile_id)
+    if path is None:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    if format == "pstats":
+        return FileResponse(path, media_type="application/octet-stream", filename=f"{profile_id}.pstats")
+    try:
+        return PlainTextResponse(store.summary(profile_id, limit=limit, sort=sort))
+    except KeyError:
+        raise HTTPException(status_code=400, detail=f"Unknown sort key: {sort}")
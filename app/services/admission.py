@@ -0,0 +1,152 @@
+import asyncio
+import logging
+import time
+from contextlib import asynccontextmanager
+from typing import Dict
+
+logger = logging.getLogger(__name__)
+
+
+class ChatBusyError(Exception):
+    """Raised when a chat turn cannot be admitted to the LLM"""
+
+    def __init__(self, reason: str, queue_depth: int):
+        super().__init__(f"Chat service busy ({reason})")
+        self.reason = reason
+        self.queue_depth = queue_depth
+
+    def to_frame(self) -> Dict[str, object]:
+        return {"type": "busy", "reason": self.reason, "queue_depth": self.queue_depth}
+
+
+class AdmissionController:
+    """Limits concurrent LLM calls globally and to one in-flight turn per session.
+
+    Turns that cannot start immediately wait in a bounded queue; when the queue
+    is full, or a turn waits longer than ``queue_timeout`` seconds, ChatBusyError
+    is raised instead of piling more load on the upstream API.
+    """
+
+    def __init__(self, max_concurrent: int = 8, max_queue: int = 32, queue_timeout: float = 30.0):
+        self.max_concurrent = max_concurrent
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self._semaphore = asyncio.Semaphore(max_concurrent)
+        self._session_locks: Dict[str, asyncio.Lock] = {}
+        self._session_refs: Dict[str, int] = {}
+
+        self.active = 0
+        self.extra_calls = 0
+        self.waiting = 0
+        self.admitted = 0
+        self.rejected = 0
+        self.timed_out = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+        self.last_wait = 0.0
+
+    def _can_start_now(self, session_id: str) -> bool:
+        lock = self._session_locks.get(session_id)
+        return not self._semaphore.locked() and (lock is None or not lock.locked())
+
+    async def _acquire(self, lock: asyncio.Lock):
+        await lock.acquire()
+        try:
+            await self._semaphore.acquire()
+        except BaseException:
+            lock.release()
+            raise
+
+    def _release_session(self, session_id: str):
+        self._session_refs[session_id] -= 1
+        if self._session_refs[session_id] == 0:
+            del self._session_refs[session_id]
+            del self._session_locks[session_id]
+
+    @asynccontextmanager
+    async def slot(self, session_id: str):
+        if self.waiting >= self.max_queue and not self._can_start_now(session_id):
+            self.rejected += 1
+            logger.warning("Chat queue full (%d waiting), rejecting session %s", self.waiting, session_id)
+            raise ChatBusyError("queue_full", self.waiting)
+
+        lock = self._session_locks.setdefault(session_id, asyncio.Lock())
+        self._session_refs[session_id] = self._session_refs.get(session_id, 0) + 1
+
+        started = time.monotonic()
+        self.waiting += 1
+        try:
+            await asyncio.wait_for(self._acquire(lock), timeout=self.queue_timeout)
+        except asyncio.TimeoutError:
+            self.timed_out += 1
+            self._release_session(session_id)
+            logger.warning("Chat turn for session %s timed out after %.1fs in queue", session_id, self.queue_timeout)
+            raise ChatBusyError("timeout", self.waiting - 1)
+        except BaseException:
+            self._release_session(session_id)
+            raise
+        finally:
+            self.waiting -= 1
+
+        wait = time.monotonic() - started
+        self.admitted += 1
+        self.total_wait += wait
+        self.max_wait = max(self.max_wait, wait)
+        self.last_wait = wait
+        self.active += 1
+        try:
+            yield wait
+        finally:
+            self.active -= 1
+            self._semaphore.release()
+            lock.release()
+            self._release_session(session_id)
+
+    def turn_calls(self) -> "TurnCalls":
+        """Limiter for the parallel LLM calls of one admitted turn (see TurnCalls)"""
+        return TurnCalls(self)
+
+    def stats(self) -> Dict[str, object]:
+        return {
+            "max_concurrent": self.max_concurrent,
+            "max_queue": self.max_queue,
+            "active": self.active,
+            "extra_calls": self.extra_calls,
+            "queue_depth": self.waiting,
+            "admitted": self.admitted,
+            "rejected": self.rejected,
+            "timed_out": self.timed_out,
+            "avg_wait_ms": round(self.total_wait / self.admitted * 1000, 2) if self.admitted else 0.0,
+            "max_wait_ms": round(self.max_wait * 1000, 2),
+            "last_wait_ms": round(self.last_wait * 1000, 2),
+        }
+
+
+class TurnCalls:
+    """Parallel upstream calls made by one admitted turn, such as fan-out parts.
+
+    The turn's admission slot covers one call at a time. A further call takes a
+    free slot from the shared limit when no turn is queued for it, and otherwise
+    waits for the turn's own slot. Concurrent upstream calls therefore never
+    exceed ``max_concurrent``, and a turn always makes progress on its own slot.
+    """
+
+    def __init__(self, admission: AdmissionController):
+        self._admission = admission
+        self._own = asyncio.Lock()
+
+    @asynccontextmanager
+    async def call(self):
+        admission = self._admission
+        if self._own.locked() and not admission._semaphore.locked():
+            # A free slot with nobody queued for it; acquire() returns without waiting
+            await admission._semaphore.acquire()
+            admission.extra_calls += 1
+            try:
+                yield
+            finally:
+                admission.extra_calls -= 1
+                admission._semaphore.release()
+        else:
+            async with self._own:
+                yield
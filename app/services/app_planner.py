@@ -0,0 +1,135 @@
+"""
+Fan-out generation of complete app schemas.
+
+Instead of one long LLM call producing every object and workflow, a planning
+call lists the entities, each object/workflow config is generated by its own
+call in parallel, and the results are merged into the usual
+{"reply", "type": "admin", "config"} envelope. The graph wiring lives in
+chat_service; this module holds the prompts and the plan/merge logic.
+"""
+import json
+from typing import Any, Dict, List, Optional
+
+# Markers at the start of the planner prompts (the fake backend keys off them)
+PLAN_MARKER = "[app-plan]"
+PART_MARKER = "[app-part]"
+
+PLAN_PROMPT = (
+    PLAN_MARKER + " You plan custom business applications. Based on the conversation, "
+    "list the data objects and workflows the application needs. "
+    "Respond ONLY with JSON in this exact format:\n"
+    "{\n"
+    '  "app": "Application name",\n'
+    '  "objects": [{"name": "Customer", "description": "one sentence"}],\n'
+    '  "workflows": [{"name": "Onboarding", "description": "one sentence"}]\n'
+    "}\n"
+    "If the user did not give specifics, plan a common application with reasonable defaults."
+)
+
+OBJECT_PROMPT = (
+    PART_MARKER + " Generate the config for the data object '{name}' ({description}) "
+    "of the application '{app}'. The application also has objects: {objects}; and workflows: {workflows}. "
+    'Respond ONLY with JSON in this exact format: {{"fields": {{"field_name": {{"type": "text"}}}}}}. '
+    "Field types: text, number, email, phone, date, select, boolean, reference."
+)
+
+WORKFLOW_PROMPT = (
+    PART_MARKER + " Generate the config for the workflow '{name}' ({description}) "
+    "of the application '{app}'. The application has objects: {objects}; and workflows: {workflows}. "
+    'Respond ONLY with JSON in this exact format: {{"steps": [{{"name": "Step name", "description": "..."}}]}}.'
+)
+
+
+def extract_json(text: str) -> Optional[Any]:
+    """Parse the outermost JSON object in a model reply, or None"""
+    start = text.find("{")
+    end = text.rfind("}")
+    if start < 0 or end < start:
+        return None
+    try:
+        return json.loads(text[start:end + 1])
+    except json.JSONDecodeError:
+        return None
+
+
+def _entities(items: Any) -> List[Dict[str, str]]:
+    entities = []
+    seen = set()
+    for item in items if isinstance(items, list) else []:
+        if isinstance(item, str):
+            item = {"name": item}
+        if not isinstance(item, dict) or not str(item.get("name", "")).strip():
+            continue
+        name = str(item["name"]).strip()
+        if name in seen:
+            continue
+        seen.add(name)
+        entities.append({"name": name, "description": str(item.get("description", "")).strip()})
+    return entities
+
+
+def parse_plan(text: str, max_parts: int) -> Optional[Dict[str, Any]]:
+    """Validate a planner reply; returns None when it is unusable"""
+    data = extract_json(text)
+    if not isinstance(data, dict):
+        return None
+    objects = _entities(data.get("objects"))
+    workflows = _entities(data.get("workflows"))
+    if not objects and not workflows:
+        return None
+    # Keep objects first: workflows are less useful without them
+    objects = objects[:max_parts]
+    workflows = workflows[:max(0, max_parts - len(objects))]
+    return {"app": str(data.get("app") or "Application"), "objects": objects, "workflows": workflows}
+
+
+def plan_parts(plan: Dict[str, Any]) -> List[Dict[str, str]]:
+    """One generation task per planned entity"""
+    return (
+        [{"kind": "object", **entity} for entity in plan["objects"]]
+        + [{"kind": "workflow", **entity} for entity in plan["workflows"]]
+    )
+
+
+def part_prompt(plan: Dict[str, Any], part: Dict[str, str]) -> str:
+    template = OBJECT_PROMPT if part["kind"] == "object" else WORKFLOW_PROMPT
+    return template.format(
+        name=part["name"],
+        description=part["description"] or "no description",
+        app=plan["app"],
+        objects=", ".join(o["name"] for o in plan["objects"]) or "none",
+        workflows=", ".join(w["name"] for w in plan["workflows"]) or "none",
+    )
+
+
+def parse_part(part: Dict[str, str], text: str) -> Dict[str, Any]:
+    """Turn a branch reply into a part result; "config" is None when it did not parse"""
+    data = extract_json(text)
+    key = "fields" if part["kind"] == "object" else "steps"
+    expected = dict if key == "fields" else list
+    config = None
+    if isinstance(data, dict) and isinstance(data.get(key), expected):
+        config = {key: data[key]}
+    return {"kind": part["kind"], "name": part["name"], "config": config}
+
+
+def merge_parts(plan: Dict[str, Any], parts: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Assemble branch results into the admin reply envelope, in plan order"""
+    by_key = {(p["kind"], p["name"]): p for p in parts}
+    config: Dict[str, Any] = {"objects": {}, "workflows": {}}
+    failed = []
+    for part in plan_parts(plan):
+        result = by_key.get((part["kind"], part["name"]))
+        if result is None or result["config"] is None:
+            failed.append(part["name"])
+            continue
+        config["objects" if part["kind"] == "object" else "workflows"][part["name"]] = result["config"]
+
+    lines = [f"- Designing {plan['app']}"]
+    if config["objects"]:
+        lines.append(f"- Objects: {', '.join(config['objects'])}")
+    if config["workflows"]:
+        lines.append(f"- Workflows: {', '.join(config['workflows'])}")
+    if failed:
+        lines.append(f"- Could not generate: {', '.join(failed)}; ask me to retry them")
+    return {"reply": "\n".join(lines), "type": "admin", "config": config}
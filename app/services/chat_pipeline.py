@@ -0,0 +1,166 @@
+"""
+Transport-independent chat generation.
+
+generate_reply() turns one chat request into a sequence of event dicts:
+coalesced "chunk" events numbered by "seq", then a terminal "done", "error"
+or "busy" event. Requests with "parse" set get the parsed envelope instead
+of raw chunks: numbered "reply_delta" events, an early "reply_type" and a
+"config" (or "parse_error") event before "done" (see reply_parser).
+Fan-out app generation adds unnumbered "progress" events, which the chat
+handler yields as dicts between text chunks. The WebSocket protocol and the SSE endpoint both render
+these events; SSE additionally runs them through a Generation so a client
+can reconnect and resume from the last event it saw.
+"""
+import asyncio
+import logging
+import secrets
+from contextlib import aclosing
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional, Tuple
+
+from app.services.admission import ChatBusyError
+from app.services.coalescer import CoalesceSettings, coalesce_chunks
+from app.services.reply_parser import ReplyStreamParser
+from app.utils.ttl_cache import TTLCache
+
+logger = logging.getLogger(__name__)
+
+TERMINAL_EVENTS = ("done", "error", "busy")
+
+
+async def generate_reply(chat_handler: Callable, request: Dict[str, Any], coalesce: CoalesceSettings) -> AsyncIterator[Dict[str, Any]]:
+    """Run one chat turn and yield its chunk events followed by a terminal event"""
+    seq = 0
+    parser = ReplyStreamParser() if request.get("parse") else None
+    try:
+        # aclosing() releases the LLM stream and admission slot promptly on cancel
+        async with aclosing(coalesce_chunks(chat_handler(
+            messages=request["messages"],
+            session_id=request["session_id"],
+            use_cache=request["use_cache"],
+            app_id=request.get("app_id"),
+            object_id=request.get("object_id")
+        ), coalesce)) as chunks:
+            async for chunk in chunks:
+                if isinstance(chunk, dict):
+                    yield chunk
+                    continue
+                if parser is None:
+                    yield {"type": "chunk", "seq": seq, "data": chunk}
+                    seq += 1
+                    continue
+                for event in parser.feed(chunk):
+                    if event["type"] == "reply_delta":
+                        event["seq"] = seq
+                        seq += 1
+                    yield event
+        if parser is not None:
+            for event in parser.finish():
+                if event["type"] == "reply_delta":
+                    event["seq"] = seq
+                    seq += 1
+                yield event
+    except ChatBusyError as e:
+        yield e.to_frame()
+        return
+    except Exception as e:
+        logger.exception("Chat generation failed for session %s", request["session_id"])
+        yield {"type": "error", "error": str(e)}
+        return
+    yield {"type": "done", "seq": seq}
+
+
+class Generation:
+    """A reply generated in the background and buffered so followers can resume.
+
+    When the last follower goes away before the reply is finished, generation
+    keeps running for ``orphan_grace`` seconds to give the client a chance to
+    reconnect, and is cancelled after that.
+    """
+
+    def __init__(self, generation_id: str, chat_handler: Callable, request: Dict[str, Any],
+                 coalesce: CoalesceSettings, orphan_grace: float = 15.0):
+        self.id = generation_id
+        self.session_id = request["session_id"]
+        self.events: List[Dict[str, Any]] = []
+        self.finished = False
+        self.orphan_grace = orphan_grace
+        self.followers = 0
+        self._changed = asyncio.Event()
+        self._orphan_timer: Optional[asyncio.TimerHandle] = None
+        self.task = asyncio.create_task(self._run(chat_handler, request, coalesce))
+
+    async def _run(self, chat_handler, request, coalesce):
+        try:
+            async with aclosing(generate_reply(chat_handler, request, coalesce)) as events:
+                async for event in events:
+                    self._append(event)
+        except asyncio.CancelledError:
+            self._append({"type": "error", "error": "cancelled"})
+            raise
+        finally:
+            self.finished = True
+            self._notify()
+
+    def _append(self, event: Dict[str, Any]):
+        self.events.append(event)
+        self._notify()
+
+    def _notify(self):
+        self._changed.set()
+        self._changed = asyncio.Event()
+
+    def cancel(self):
+        if not self.task.done():
+            self.task.cancel()
+
+    def _cancel_if_orphaned(self):
+        self._orphan_timer = None
+        if self.followers == 0:
+            logger.info("Cancelling orphaned chat generation %s", self.id)
+            self.cancel()
+
+    async def follow(self, after: int = -1) -> AsyncIterator[Tuple[int, Dict[str, Any]]]:
+        """Yield (index, event) pairs after ``after``, then tail until the reply ends"""
+        self.followers += 1
+        if self._orphan_timer is not None:
+            self._orphan_timer.cancel()
+            self._orphan_timer = None
+        index = after + 1
+        try:
+            while True:
+                changed = self._changed
+                while index < len(self.events):
+                    yield index, self.events[index]
+                    index += 1
+                if self.finished:
+                    return
+                await changed.wait()
+        finally:
+            self.followers -= 1
+            if self.followers == 0 and not self.finished:
+                loop = asyncio.get_running_loop()
+                self._orphan_timer = loop.call_later(self.orphan_grace, self._cancel_if_orphaned)
+
+
+class GenerationRegistry:
+    """Recent generations by id, kept for a while so clients can resume them"""
+
+    def __init__(self, max_entries: int = 1024, ttl_seconds: float = 300.0, orphan_grace: float = 15.0):
+        self._generations = TTLCache(max_entries=max_entries, ttl_seconds=ttl_seconds)
+        self.orphan_grace = orphan_grace
+
+    def start(self, chat_handler: Callable, request: Dict[str, Any], coalesce: CoalesceSettings) -> Generation:
+        # Unguessable and unique across workers; a resume must also present the owning session
+        generation = Generation(secrets.token_urlsafe(16), chat_handler, request, coalesce, self.orphan_grace)
+        self._generations.set(generation.id, generation)
+        return generation
+
+    def get(self, generation_id: str, session_id: str) -> Optional[Generation]:
+        """The generation with this id, if it belongs to ``session_id``"""
+        generation = self._generations.get(generation_id)
+        if generation is None or generation.session_id != session_id:
+            return None
+        return generation
+
+    def stats(self) -> Dict[str, Any]:
+        return self._generations.stats()
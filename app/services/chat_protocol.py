@@ -0,0 +1,238 @@
+"""
+/ws/chat wire protocol.
+
+Two kinds of client frames are accepted on the same socket:
+
+* Legacy frames - plain text, or JSON with "messages"/"message" and "context".
+  The reply is streamed back as raw text chunks, and a new legacy message
+  supersedes the one in flight.
+* Framed messages - JSON objects carrying a "stream_id". Several streams can
+  run concurrently on one connection and every server frame is a JSON envelope:
+
+    {"type": "chunk", "stream_id": "s1", "seq": 0, "data": "Hel"}
+    {"type": "done", "stream_id": "s1", "seq": 3}
+    {"type": "error", "stream_id": "s1", "error": "..."}
+    {"type": "busy", "stream_id": "s1", "reason": "queue_full", "queue_depth": 32}
+    {"type": "cancelled", "stream_id": "s1", "active": true}
+    {"type": "progress", "stream_id": "s1", "stage": "generated", "kind": "object",
+     "name": "Customer", "ok": true, "completed": 2, "total": 5}
+
+  "done" carries the number of chunk frames sent for the stream. "progress"
+  frames (stages "planning", "planned", "generated") are only sent while a
+  complete app is generated in parallel parts; legacy streams skip them.
+
+JSON chat frames may carry a W3C "traceparent"; the reply's "ws.message" span
+then continues that trace.
+
+Both kinds accept {"type": "cancel"} (with "stream_id" for framed streams).
+When heartbeats are enabled the server sends {"type": "ping"} frames while the
+socket is quiet; clients may answer with {"type": "pong"}. A client
+{"type": "ping"} is answered with {"type": "pong"}.
+
+Outbound frames go through the connection's bounded send queue (see
+connection_manager), so a slow reader never blocks the LLM stream directly.
+Under the "drop" policy only framed reply chunks may be dropped; their "seq"
+numbers show the gap. Legacy text chunks carry no sequence number, so a legacy
+client that falls behind is disconnected rather than sent a reply with holes.
+"""
+import asyncio
+import json
+import logging
+import time
+from contextlib import aclosing, suppress
+from typing import Any, Callable, Dict, Optional
+
+from fastapi import WebSocketDisconnect
+
+from app.services.chat_pipeline import generate_reply
+from app.services.coalescer import CoalesceSettings
+from app.services.connection_manager import ConnectionClosed, ManagedConnection
+from app.utils import metrics, tracing
+
+logger = logging.getLogger(__name__)
+
+REPLY_FRAMES = ("chunk", "reply_delta")
+
+first_frame_seconds = metrics.registry.histogram(
+    "chat_ws_first_frame_seconds", "Time from receiving a chat message to queueing its first reply frame", ("mode",))
+frames_per_reply = metrics.registry.histogram(
+    "chat_ws_frames_per_reply", "Reply frames sent per chat message", ("mode",),
+    buckets=(1, 5, 10, 25, 50, 100, 250, 500, 1000))
+
+# Key used for the single legacy (unframed) stream of a connection
+LEGACY_STREAM = None
+
+
+def parse_chat_message(data: str) -> Dict[str, Any]:
+    """Normalize an incoming /ws/chat frame into a chat or cancel request"""
+    try:
+        parsed_data = json.loads(data)
+    except json.JSONDecodeError:
+        parsed_data = None
+    if not isinstance(parsed_data, dict):
+        # Fallback for plain text messages
+        return {
+            "type": "chat",
+            "stream_id": LEGACY_STREAM,
+            "messages": [{"role": "user", "content": data}],
+            "session_id": "default",
+            "use_cache": None,
+            "parse": False
+        }
+    return chat_request_from_dict(parsed_data)
+
+
+def chat_request_from_dict(parsed_data: Dict[str, Any]) -> Dict[str, Any]:
+    """Normalize a decoded JSON chat frame (also used for SSE request bodies)"""
+    stream_id = parsed_data.get("stream_id")
+    if stream_id is not None:
+        stream_id = str(stream_id)
+
+    if parsed_data.get("type") in ("cancel", "ping", "pong"):
+        return {"type": parsed_data["type"], "stream_id": stream_id}
+
+    context = parsed_data.get("context", {})
+    messages = parsed_data.get("messages")
+    if not messages:
+        # Fallback: treat as single message
+        messages = [{"role": "user", "content": parsed_data.get("message", "")}]
+    return {
+        "type": "chat",
+        "stream_id": stream_id,
+        "messages": messages,
+        "session_id": context.get("session_id", "default"),
+        # Sessions may opt out of the response cache with {"context": {"cache": false}}
+        "use_cache": context.get("cache"),
+        # The app and object the user is looking at; record retrieval stays within them
+        "app_id": context.get("app_id"),
+        "object_id": context.get("object_id"),
+        # Framed and SSE clients may ask for the parsed reply envelope
+        "parse": bool(parsed_data.get("parse")),
+        "traceparent": parsed_data.get("traceparent")
+    }
+
+
+class ChatConnection:
+    """Drives one /ws/chat socket: reads frames and runs each reply as a cancellable task"""
+
+    def __init__(self, outbound: ManagedConnection, chat_handler: Callable, coalesce: CoalesceSettings):
+        self.outbound = outbound
+        self.chat_handler = chat_handler
+        self.coalesce = coalesce
+        self.streams: Dict[Optional[str], asyncio.Task] = {}
+        # The idle timeout never closes a socket while replies are streaming
+        outbound.is_busy = lambda: bool(self.streams)
+
+    async def run(self):
+        try:
+            while True:
+                data = await self.outbound.receive_text()
+                await self.handle_frame(data)
+        except (WebSocketDisconnect, ConnectionClosed):
+            pass
+        finally:
+            # Stop generating for a client that is gone
+            await self.close()
+
+    async def handle_frame(self, data: str):
+        received_at = time.perf_counter()
+        request = parse_chat_message(data)
+        request["received_at"] = received_at
+        stream_id = request["stream_id"]
+
+        if request["type"] == "pong":
+            return
+        if request["type"] == "ping":
+            await self.send_json({"type": "pong"}, droppable=False)
+            return
+
+        # A new message or an explicit cancel supersedes the reply in flight on that stream
+        cancelled = await self.cancel(stream_id)
+
+        if request["type"] == "cancel":
+            frame = {"type": "cancelled", "active": cancelled}
+            if stream_id is not LEGACY_STREAM:
+                frame["stream_id"] = stream_id
+            await self.send_json(frame, droppable=False)
+            return
+
+        if stream_id is LEGACY_STREAM:
+            # Legacy clients always get raw text
+            request["parse"] = False
+            task = asyncio.create_task(self.stream_legacy(request))
+        else:
+            task = asyncio.create_task(self.stream_framed(request))
+        self.streams[stream_id] = task
+        task.add_done_callback(lambda t, key=stream_id: self._forget(key, t))
+
+    def _forget(self, stream_id: Optional[str], task: asyncio.Task):
+        if self.streams.get(stream_id) is task:
+            del self.streams[stream_id]
+        if task.cancelled():
+            return
+        error = task.exception()
+        if error is not None and not isinstance(error, ConnectionClosed):
+            logger.warning("Chat stream %s failed: %r", stream_id, error)
+
+    async def cancel(self, stream_id: Optional[str]) -> bool:
+        """Cancel the reply running on ``stream_id``; returns whether one was active"""
+        task = self.streams.pop(stream_id, None)
+        if task is None:
+            return False
+        active = not task.done()
+        task.cancel()
+        with suppress(asyncio.CancelledError, Exception):
+            await task
+        return active
+
+    async def close(self):
+        for stream_id in list(self.streams):
+            await self.cancel(stream_id)
+
+    async def send_text(self, text: str, droppable: bool = True):
+        await self.outbound.send(text, droppable)
+
+    async def send_json(self, frame: Dict[str, Any], droppable: bool = True):
+        await self.outbound.send_json(frame, droppable)
+
+    async def stream_legacy(self, request: Dict[str, Any]):
+        """Stream a reply as raw text chunks (original protocol)"""
+        frames = 0
+        with tracing.span("ws.message", request.get("traceparent"), mode="legacy") as span:
+            try:
+                async with aclosing(generate_reply(self.chat_handler, request, self.coalesce)) as events:
+                    async for event in events:
+                        if event["type"] == "chunk":
+                            frames = self._count_reply_frame(request, frames, "legacy")
+                            # Nothing would tell the client a chunk is missing, so never drop one
+                            await self.send_text(event["data"], droppable=False)
+                        elif event["type"] not in ("done", "progress"):
+                            # Busy and error frames are JSON so the client is not left waiting
+                            await self.send_json(event, droppable=False)
+            finally:
+                frames_per_reply.observe(frames, mode="legacy")
+                span.set_attribute("frames", frames)
+
+    async def stream_framed(self, request: Dict[str, Any]):
+        """Stream a reply as sequenced JSON envelopes terminated by done/error"""
+        stream_id = request["stream_id"]
+        frames = 0
+        with tracing.span("ws.message", request.get("traceparent"), mode="framed", stream_id=stream_id) as span:
+            try:
+                async with aclosing(generate_reply(self.chat_handler, request, self.coalesce)) as events:
+                    async for event in events:
+                        if event["type"] in REPLY_FRAMES:
+                            frames = self._count_reply_frame(request, frames, "framed")
+                        await self.send_json(
+                            {"type": event["type"], "stream_id": stream_id, **event},
+                            droppable=event["type"] in REPLY_FRAMES
+                        )
+            finally:
+                frames_per_reply.observe(frames, mode="framed")
+                span.set_attribute("frames", frames)
+
+    @staticmethod
+    def _count_reply_frame(request: Dict[str, Any], frames: int, mode: str) -> int:
+        if frames == 0 and "received_at" in request:
+            first_frame_seconds.observe(time.perf_counter() - request["received_at"], mode=mode)
+        return frames + 1
@@ -1,19 +1,67 @@
 import os
+import asyncio
+import hashlib
+from contextlib import aclosing, nullcontext
 from app.utils import config
-from langchain_openai import ChatOpenAI
-from langgraph.graph import MessagesState, StateGraph, START, END
+from app.utils.ttl_cache import TTLCache
+from app.utils import metrics, tracing
+from app.services import app_planner, intent_router
+from app.services.admission import AdmissionController, ChatBusyError
+from app.services.chat_timing import TurnTimings, summarize_turns
+from app.services.record_index import record_index
 import json
-from typing import Dict, Any
-from pydantic import SecretStr
-
-# Set up the OpenAI LLM
-llm = ChatOpenAI(
-    model="gpt-3.5-turbo",  # You can change to gpt-4o or other model
-    api_key=SecretStr(config.get_openai_api_key()),
-    streaming=True,
-)
+from collections import deque
+from typing import Deque, Dict, Any, List, Optional
+
+# The chat models and graph are built on first use (or by init_chat() at startup)
+# so that importing this module does not pull in langchain/langgraph.
+llms: Dict[str, Any] = {}
+graph = None
+
+# The per-route chat timing metrics (see chat_timing), reported under "routes" by /chat/stats
+ROUTE_METRICS = ("chat_turns_total", "chat_turn_seconds", "chat_ttft_seconds", "chat_prompt_tokens",
+                 "chat_completion_tokens")
+
+def route_model_name(route: str) -> str:
+    """Configured model name for a route"""
+    if config.get_chat_model_backend() == "fake":
+        return f"fake-{route}"
+    if route == intent_router.FANOUT:
+        # Fan-out turns run on the strong model but produce differently shaped replies
+        return f"{config.get_chat_strong_model()}+fanout"
+    if route == intent_router.STRONG:
+        return config.get_chat_strong_model()
+    return config.get_chat_fast_model()
+
+def build_llm(route: str = intent_router.FAST):
+    """Create the chat model for a route, using the backend selected by CHAT_MODEL_BACKEND"""
+    if config.get_chat_model_backend() == "fake":
+        from app.services.fake_llm import FakeChatModel
+        settings = config.get_fake_llm_settings()
+        settings["model_name"] = route_model_name(route)
+        return FakeChatModel(**settings)
 
-graph_builder = StateGraph(MessagesState)
+    from langchain_openai import ChatOpenAI
+    from pydantic import SecretStr
+
+    # Set up the OpenAI LLM; stream_usage reports token counts at the end of the stream
+    return ChatOpenAI(
+        model=route_model_name(route),
+        api_key=SecretStr(config.get_openai_api_key()),
+        streaming=True,
+        stream_usage=True,
+    )
+
+def get_llm(route: str = intent_router.FAST):
+    if route not in llms:
+        llms[route] = build_llm(route)
+    return llms[route]
+
+def get_model_name(route: str = intent_router.FAST) -> str:
+    """Name of the model serving a route, without building the client"""
+    if route in llms:
+        return llms[route].model_name
+    return route_model_name(route)
 
 SYSTEM_PROMPT = (
     "You are an expert assistant for designing custom applications, objects, workflows, and helping users with workflow execution. "
@@ -30,6 +78,7 @@ SYSTEM_PROMPT = (
     "For APP creation: Start by asking what domain or industry they are focusing on (e.g., CRM, ERP, field service, e-commerce, project management, etc.). "
     "Ask clarifying questions until you are confident you have all the details. "
     "In user mode: Help users with workflow execution, record management, and provide context-aware assistance based on the current record and workflow state. "
+    "You can call read-only database tools to list objects, count or find records and get workflows; fetch only the fields and records you need. "
     "IMPORTANT: You must ALWAYS respond with valid JSON in this exact format:\n"
     "{\n"
     '  "reply": "Your response text here",\n'
@@ -66,9 +115,22 @@ class ChatContext:
         self.current_record: Dict[str, Any] = {}
         self.current_workflow: Dict[str, Any] = {}
         self.workflow_state: Dict[str, Any] = {}
+        # App and object the session is about; record retrieval is limited to them
+        self.app_id: Optional[int] = None
+        self.object_id: Optional[int] = None
+        self.cache_enabled = True
+        # Timing summaries of recent turns, for the per-session debug endpoint
+        self.timings: Deque[Dict[str, Any]] = deque(maxlen=config.get_chat_timing_history())
+        # Memoized results of the read-only DB tools the model calls
+        self.tool_cache = TTLCache(
+            max_entries=config.get_chat_tool_cache_max_entries(),
+            ttl_seconds=config.get_chat_tool_cache_ttl_seconds(),
+        )
     
-    def to_dict(self) -> Dict[str, Any]:
-        return {
+    def to_dict(self, include_record: bool = True) -> Dict[str, Any]:
+        """Session context for the system prompt; ``include_record=False`` when the
+        turn's workflow_execution messages already carry the record and form data"""
+        context = {
             "session": {
                 "id": self.session_id,
                 "message_count": self.message_count
@@ -76,11 +138,66 @@ class ChatContext:
             "memory": self.memory,
             "user": self.user,
             "nlp": self.nlp,
-            "current_record": self.current_record,
             "current_workflow": self.current_workflow,
-            "workflow_state": self.workflow_state
+            "workflow_state": self.workflow_state,
         }
-    
+        if include_record:
+            context["current_record"] = self.current_record
+        else:
+            context["workflow_state"] = {
+                key: value for key, value in self.workflow_state.items() if key != "formData"
+            }
+        return context
+
+    def workflow_prompt(self, message_data: Dict[str, Any], previous: Optional[Dict[str, Any]] = None) -> str:
+        """Prompt for a workflow_execution message: the full record, or only what changed
+        since ``previous``, the same record's preceding message in this turn's messages
+
+        Depends only on the two messages, so history turns render as the model first saw them.
+        """
+        workflow = message_data.get("workflow", {})
+        record = message_data.get("recordData", {})
+        form_data = message_data.get("formData", {})
+
+        # Update context with workflow and record data
+        if workflow.get("app_id") is not None:
+            self.app_id = workflow["app_id"]
+        record_object = message_data.get("objectId") or record_index.object_of(message_data.get("recordId"))
+        if record_object is not None:
+            self.object_id = record_object
+        self.current_workflow = workflow
+        self.current_record = record
+        self.workflow_state = {
+            "formData": form_data,
+            "currentStep": message_data.get("currentStep", 0),
+            "recordId": message_data.get("recordId")
+        }
+
+        header = f"""
+Current Workflow: {workflow.get('name', 'Unknown')}
+Current Step: {self.workflow_state.get('currentStep', 0) + 1}
+"""
+        if previous is not None:
+            body = (
+                describe_changes("Record", previous.get("recordData", {}), record)
+                + describe_changes("Form Data", previous.get("formData", {}), form_data)
+            )
+        else:
+            body = f"""Current Record: {json.dumps(record, indent=2)}
+Form Data: {json.dumps(form_data, indent=2)}
+"""
+        return header + body + "\nPlease provide context-aware assistance for this workflow execution.\n"
+
+    def record_timings(self, turn: Dict[str, Any]):
+        self.timings.append(turn)
+
+    def timings_summary(self) -> Dict[str, Any]:
+        return {
+            "session_id": self.session_id,
+            "summary": summarize_turns(self.timings),
+            "turns": list(self.timings),
+        }
+
     def update_memory(self, key: str, value: Any, lifespan: int = 1):
         """Update memory with lifespan (1=next message, 0=session, -1=current message)"""
         self.memory[key] = {"value": value, "lifespan": lifespan}
@@ -98,60 +215,361 @@ class ChatContext:
         for key in expired_keys:
             del self.memory[key]
 
+def diff_fields(old: Dict[str, Any], new: Dict[str, Any]):
+    """Top-level changes from ``old`` to ``new``: (changed or added fields, removed field names)"""
+    changed = {key: value for key, value in new.items() if key not in old or old[key] != value}
+    removed = [key for key in old if key not in new]
+    return changed, removed
+
+def describe_changes(label: str, old: Dict[str, Any], new: Dict[str, Any]) -> str:
+    changed, removed = diff_fields(old or {}, new or {})
+    if not changed and not removed:
+        return f"{label}: unchanged since the previous message\n"
+    text = ""
+    if changed:
+        text += f"{label} changes since the previous message: {json.dumps(changed, indent=2)}\n"
+    if removed:
+        text += f"{label} fields removed: {json.dumps(removed)}\n"
+    return text
+
 # Global context store (in production, use Redis/database)
 context_store: Dict[str, ChatContext] = {}
 
-def chatbot(state: MessagesState):
-    # This function is called by the graph to get a response from the LLM
-    return {"messages": [llm.invoke(state["messages"])]}
+# Cache of complete replies for deterministic turns (e.g. "create app" openers)
+response_cache = TTLCache(
+    max_entries=config.get_chat_cache_max_entries(),
+    ttl_seconds=config.get_chat_cache_ttl_seconds(),
+)
+
+# Admission control for upstream LLM calls (global limit + one turn per session)
+admission = AdmissionController(
+    max_concurrent=config.get_chat_max_concurrent(),
+    max_queue=config.get_chat_max_queue(),
+    queue_timeout=config.get_chat_queue_timeout_seconds(),
+)
+
+def normalize_prompt(text: str) -> str:
+    """Collapse whitespace and case so trivially different prompts share a cache entry"""
+    return " ".join(text.split()).lower()
+
+def make_cache_key(messages: List[Dict[str, Any]], model: str) -> str:
+    """Hash the model, system prompt and normalized conversation into a cache key"""
+    payload = {
+        "model": model,
+        "system": SYSTEM_PROMPT,
+        "messages": [
+            [m["role"], normalize_prompt(m["content"])]
+            for m in messages
+            if m.get("role") in ("user", "assistant")
+        ],
+    }
+    return hashlib.sha256(json.dumps(payload, sort_keys=True).encode("utf-8")).hexdigest()
+
+def is_cacheable(context: ChatContext) -> bool:
+    """Only turns that do not depend on per-session state can be served from the cache
+    (handle_chat also skips storing turns that called DB tools)"""
+    if not config.get_chat_cache_enabled() or not context.cache_enabled:
+        return False
+    return not (
+        context.memory
+        or context.user
+        or context.nlp
+        or context.current_record
+        or context.current_workflow
+        or context.workflow_state
+    )
+
+def format_records(hits, token_budget: int) -> str:
+    """Render retrieved records for the system prompt, best match first, within the budget"""
+    lines = []
+    used = 0
+    for _, record in hits:
+        label = record.get("object") or f"Object {record['object_id']}"
+        line = f"- {label} #{record['id']}: {json.dumps(record['data'], separators=(',', ':'), default=str)}"
+        cost = estimate_tokens(line)
+        if used + cost > token_budget:
+            break
+        lines.append(line)
+        used += cost
+    if not lines:
+        return ""
+    return "Records matching the user's question (search results, may be incomplete):\n" + "\n".join(lines)
+
+async def retrieve_records(question: str, app_id: Optional[int] = None, object_id: Optional[int] = None) -> str:
+    """Search the record index for a user-mode question, within the object (or app) when known"""
+    interval = config.get_chat_record_index_sync_seconds()
+    if record_index.needs_sync(interval):
+        # Pick up records written by other processes; blocking DB work stays off the loop
+        await asyncio.to_thread(record_index.maybe_sync, interval)
+    # Scoring is pure Python; keep large indexes from stalling other sockets
+    object_ids = [object_id] if object_id is not None else None
+    hits = await asyncio.to_thread(
+        record_index.search, question, config.get_chat_record_top_k(), object_ids, app_id)
+    return format_records(hits, config.get_chat_record_context_tokens())
+
+async def replay_cached_reply(reply: str):
+    """Yield a cached reply in small chunks so clients see the same streaming behaviour"""
+    chunk_size = max(1, config.get_chat_cache_chunk_size())
+    for start in range(0, len(reply), chunk_size):
+        yield reply[start:start + chunk_size]
+        # Let other sockets make progress between chunks
+        await asyncio.sleep(0)
+
+def estimate_tokens(text: str) -> int:
+    # Rough count for backends that do not report usage (about 4 chars per token)
+    return max(1, len(text) // 4) if text else 0
+
+def record_token_usage(timings: TurnTimings, llm_messages, reply_parts, usages=()):
+    """Record token counts for a completed turn (``usages`` has one entry per model call)"""
+    if usages:
+        prompt_tokens = sum(usage.get("input_tokens", 0) for usage in usages)
+        completion_tokens = sum(usage.get("output_tokens", 0) for usage in usages)
+    else:
+        prompt_tokens = sum(estimate_tokens(m["content"]) for m in llm_messages)
+        completion_tokens = estimate_tokens("".join(reply_parts))
+    timings.set_tokens(prompt_tokens, completion_tokens)
+
+def route_stats() -> Dict[str, Any]:
+    """Per-route metrics for /chat/stats"""
+    snapshot = metrics.registry.snapshot("chat_")
+    return {name: snapshot.get(name, []) for name in ROUTE_METRICS}
 
-graph_builder.add_node("chatbot", chatbot)
-graph_builder.add_edge(START, "chatbot")
-graph_builder.add_edge("chatbot", END)
-graph = graph_builder.compile()
+db_tools = None
+
+def get_db_tools():
+    global db_tools
+    if db_tools is None:
+        from app.services.db_tools import build_tools
+        db_tools = build_tools()
+    return db_tools
+
+def tool_rounds(messages) -> int:
+    """Tool calls made since the last user message"""
+    rounds = 0
+    for m in reversed(messages):
+        if m.type == "human":
+            break
+        if m.type == "ai" and getattr(m, "tool_calls", None):
+            rounds += 1
+    return rounds
+
+def make_chatbot(route: str):
+    async def chatbot(state):
+        # Called by the graph to get a response from the route's LLM.
+        # Async so in-flight turns do not each hold a worker thread while streaming.
+        llm = get_llm(route)
+        if config.get_chat_db_tools_enabled() and tool_rounds(state["messages"]) < config.get_chat_tool_max_rounds():
+            # Let the model look data up instead of having it pasted into the prompt;
+            # once the round limit is reached it has to answer with what it has
+            llm = llm.bind_tools(get_db_tools())
+        with tracing.span("llm.call", route=route, model=get_model_name(route)) as span:
+            reply = await llm.ainvoke(state["messages"])
+            span.set_attribute("tool_calls", len(getattr(reply, "tool_calls", None) or []))
+        return {"messages": [reply]}
+    return chatbot
+
+def route_turn(state, run_config: Optional[Dict[str, Any]] = None) -> str:
+    """Graph router: use the route chosen by handle_chat, else classify the turn"""
+    if run_config is None:
+        # LangGraph only injects a parameter named `config`, which would shadow app.utils.config
+        from langgraph.config import get_config
+        run_config = get_config()
+    route = ((run_config or {}).get("configurable") or {}).get("route")
+    if route:
+        return route
+    return intent_router.choose_route(conversation_messages(state), fanout=config.get_chat_fanout_enabled())
+
+def conversation_messages(state) -> List[Dict[str, Any]]:
+    # Graph state holds langchain messages; the planner works on role/content dicts
+    roles = {"human": "user", "ai": "assistant"}
+    return [
+        {"role": roles[m.type], "content": m.content}
+        for m in state["messages"]
+        if m.type in roles
+    ]
+
+# Custom graph events picked up by handle_chat
+PROGRESS_EVENT = "chat_progress"
+REPLY_EVENT = "chat_reply"
+# Nodes whose model tokens are internal and never streamed to the client
+INTERNAL_NODES = ("plan", "generate_part")
+
+async def plan_app(state):
+    """Fan-out step 1: list the objects and workflows of the app"""
+    from langchain_core.callbacks import adispatch_custom_event
+
+    await adispatch_custom_event(PROGRESS_EVENT, {"stage": "planning"})
+    prompt = [{"role": "system", "content": app_planner.PLAN_PROMPT}] + conversation_messages(state)
+    with tracing.span("llm.plan", model=get_model_name(intent_router.STRONG)):
+        reply = await get_llm(intent_router.STRONG).ainvoke(prompt)
+    plan = app_planner.parse_plan(reply.content, config.get_chat_fanout_max_parts())
+    if plan is not None:
+        await adispatch_custom_event(PROGRESS_EVENT, {
+            "stage": "planned",
+            "app": plan["app"],
+            "objects": [o["name"] for o in plan["objects"]],
+            "workflows": [w["name"] for w in plan["workflows"]],
+        })
+    return {"plan": plan}
+
+def fan_out(state):
+    """Fan-out step 2: one parallel branch per planned entity, or a single call if planning failed"""
+    from langgraph.types import Send
+
+    plan = state.get("plan")
+    if not plan:
+        return intent_router.STRONG
+    return [Send("generate_part", {"plan": plan, "part": part}) for part in app_planner.plan_parts(plan)]
+
+async def generate_part(state):
+    """Generate the config of one object or workflow"""
+    from langchain_core.callbacks import adispatch_custom_event
+
+    part = state["part"]
+    prompt = [
+        {"role": "system", "content": app_planner.part_prompt(state["plan"], part)},
+        {"role": "user", "content": f"Generate the {part['kind']} {part['name']}"},
+    ]
+    from langgraph.config import get_config
+
+    # Parts run in parallel but share the turn's admission slot and the global limit
+    upstream = (get_config().get("configurable") or {}).get("upstream")
+    async with upstream.call() if upstream is not None else nullcontext():
+        with tracing.span("llm.part", kind=part["kind"], part=part["name"]):
+            reply = await get_llm(intent_router.STRONG).ainvoke(prompt)
+    result = app_planner.parse_part(part, reply.content)
+    await adispatch_custom_event(PROGRESS_EVENT, {
+        "stage": "generated", "kind": part["kind"], "name": part["name"], "ok": result["config"] is not None
+    })
+    return {"parts": [result]}
+
+async def merge_app(state):
+    """Fan-out step 3: assemble the parts into the admin reply and stream it"""
+    from langchain_core.callbacks import adispatch_custom_event
+    from langchain_core.messages import AIMessage
+
+    reply = json.dumps(app_planner.merge_parts(state["plan"], state["parts"]), indent=2)
+    await adispatch_custom_event(REPLY_EVENT, reply)
+    return {"messages": [AIMessage(content=reply)]}
+
+def build_graph():
+    import operator
+    from typing import Annotated
+    from langgraph.graph import MessagesState, StateGraph, START, END
+    from langgraph.prebuilt import ToolNode, tools_condition
+
+    class ChatState(MessagesState):
+        plan: Optional[Dict[str, Any]]
+        parts: Annotated[List[Dict[str, Any]], operator.add]
+
+    graph_builder = StateGraph(ChatState)
+    for route in (intent_router.FAST, intent_router.STRONG):
+        # chatbot -> tools -> chatbot until the model answers without a tool call
+        graph_builder.add_node(route, make_chatbot(route))
+        graph_builder.add_node(f"{route}_tools", ToolNode(get_db_tools()))
+        graph_builder.add_conditional_edges(route, tools_condition, {"tools": f"{route}_tools", END: END})
+        graph_builder.add_edge(f"{route}_tools", route)
+    graph_builder.add_node("plan", plan_app)
+    graph_builder.add_node("generate_part", generate_part)
+    graph_builder.add_node("merge", merge_app)
+    graph_builder.add_conditional_edges(START, route_turn, {
+        intent_router.FAST: intent_router.FAST,
+        intent_router.STRONG: intent_router.STRONG,
+        intent_router.FANOUT: "plan",
+    })
+    graph_builder.add_conditional_edges("plan", fan_out, ["generate_part", intent_router.STRONG])
+    graph_builder.add_edge("generate_part", "merge")
+    graph_builder.add_edge("merge", END)
+    return graph_builder.compile()
+
+def get_graph():
+    global graph
+    if graph is None:
+        graph = build_graph()
+    return graph
+
+def init_chat():
+    """Build the chat model and graph now instead of on the first chat turn"""
+    get_llm(intent_router.FAST)
+    get_llm(intent_router.STRONG)
+    get_graph()
+
+def handle_chat(messages=None, session_id: str = "default", use_cache: Optional[bool] = None,
+                app_id: Optional[int] = None, object_id: Optional[int] = None):
+    """Stream the reply to one chat turn (text chunks and progress dicts)"""
+    turn = stream_turn(messages, session_id, use_cache, app_id, object_id)
+    if tracing.get_tracer() is None:
+        return turn
+    return traced_turn(turn, session_id)
+
+async def traced_turn(turn, session_id: str):
+    # Runs the turn inside a "chat.turn" span so the graph nodes, tool calls
+    # and DB statements it triggers become its children
+    with tracing.span("chat.turn", session_id=session_id):
+        async with aclosing(turn) as chunks:
+            async for chunk in chunks:
+                yield chunk
+
+async def stream_turn(messages=None, session_id: str = "default", use_cache: Optional[bool] = None,
+                      app_id: Optional[int] = None, object_id: Optional[int] = None):
+    # Accept a bare prompt string as a single user message
+    if isinstance(messages, str):
+        messages = [{"role": "user", "content": messages}]
+
+    timings = TurnTimings(session_id)
 
-async def handle_chat(messages=None, session_id: str = "default"):
     # Get or create context for this session
     if session_id not in context_store:
         context_store[session_id] = ChatContext(session_id)
     
     context = context_store[session_id]
+    if use_cache is not None:
+        context.cache_enabled = use_cache
+    # Like the cache opt-out, the app and object stick to the session until changed
+    if app_id is not None:
+        context.app_id = app_id
+    if object_id is not None:
+        context.object_id = object_id
     context.message_count += 1
     context.cleanup_expired_memory()
     
-    # Check for workflow execution messages
-    if messages and len(messages) > 0:
-        last_message = messages[-1]
-        if last_message.get("role") == "user" and last_message.get("content"):
-            try:
-                # Try to parse as JSON for workflow execution
-                message_data = json.loads(last_message["content"])
-                if message_data.get("type") == "workflow_execution":
-                    # Update context with workflow and record data
-                    context.current_workflow = message_data.get("workflow", {})
-                    context.current_record = message_data.get("recordData", {})
-                    context.workflow_state = {
-                        "formData": message_data.get("formData", {}),
-                        "currentStep": message_data.get("currentStep", 0),
-                        "recordId": message_data.get("recordId")
-                    }
-                    
-                    # Create a context-aware prompt for workflow assistance
-                    workflow_prompt = f"""
-Current Workflow: {context.current_workflow.get('name', 'Unknown')}
-Current Step: {context.workflow_state.get('currentStep', 0) + 1}
-Current Record: {json.dumps(context.current_record, indent=2)}
-Form Data: {json.dumps(context.workflow_state.get('formData', {}), indent=2)}
-
-Please provide context-aware assistance for this workflow execution.
-"""
-                    last_message["content"] = workflow_prompt
-            except (json.JSONDecodeError, KeyError):
-                # Not a workflow execution message, proceed normally
-                pass
+    # Replace workflow execution messages with prompts: the full record, then only
+    # the fields that changed while later messages are about the same record.
+    # Clients that do not resend history get the full record every turn.
+    workflow_turn = False
+    previous_workflow: Optional[Dict[str, Any]] = None
+    # What the user typed, for routing: workflow executions carry record JSON, not a request
+    typed_messages: List[Dict[str, Any]] = []
+    if messages:
+        rendered = []
+        for m in messages:
+            workflow_turn = False
+            typed = m
+            if m.get("role") == "user" and m.get("content"):
+                try:
+                    message_data = json.loads(m["content"])
+                    if isinstance(message_data, dict) and message_data.get("type") == "workflow_execution":
+                        same_record = previous_workflow is not None and (
+                            previous_workflow.get("recordId") == message_data.get("recordId")
+                            and previous_workflow.get("workflow", {}).get("name")
+                            == message_data.get("workflow", {}).get("name")
+                        )
+                        prompt = context.workflow_prompt(message_data, previous_workflow if same_record else None)
+                        m = {**m, "content": prompt}
+                        previous_workflow = message_data
+                        typed = {**m, "content": ""}
+                        workflow_turn = True
+                except (json.JSONDecodeError, TypeError):
+                    # Not a workflow execution message, proceed normally
+                    pass
+            rendered.append(m)
+            if typed.get("role") in ("user", "assistant"):
+                typed_messages.append(typed)
+        messages = rendered
     
     # Prepare the input for the graph with context
-    context_data = context.to_dict()
+    # Without a workflow_execution message in this turn, the record only reaches the model here
+    context_data = context.to_dict(include_record=previous_workflow is None)
     context_prompt = f"Context: {json.dumps(context_data, indent=2)}\n\n"
 
     # Compose the full message history for the LLM
@@ -170,12 +588,120 @@ Please provide context-aware assistance for this workflow execution.
     input_state = {
         "messages": llm_messages
     }
-    
-    # Stream events from the graph (OpenAI streaming)
-    async for event in graph.astream_events(input_state, version="v2"):
-        if event["event"] == "on_chat_model_stream":
-            # Yield each chunk of the response as it arrives
-            chunk_data = event.get("data", {})
-            chunk = chunk_data.get("chunk")
-            if chunk and hasattr(chunk, 'content'):
-                yield chunk.content 
\ No newline at end of file
+
+    # Send short clarifying turns to the fast model and config generation to the strong one;
+    # turns about a record are never answered with a generated app
+    record_bound = workflow_turn or bool(context.current_record)
+    route = intent_router.choose_route(
+        typed_messages, fanout=config.get_chat_fanout_enabled() and not record_bound)
+
+    # Ground user-mode questions in matching records (not workflow or design turns)
+    records_prompt = ""
+    question = llm_messages[-1]
+    if (
+        config.get_chat_record_retrieval_enabled()
+        and not workflow_turn
+        and question["role"] == "user"
+        and question["content"]
+        and not intent_router.is_design_conversation(llm_messages)
+    ):
+        with tracing.span("chat.retrieval"):
+            records_prompt = await retrieve_records(question["content"], context.app_id, context.object_id)
+        if records_prompt:
+            llm_messages[0]["content"] += "\n\n" + records_prompt
+
+    timings.mark_prompt_ready(route, get_model_name(route))
+    tracing.record_span("chat.prompt", timings.prompt_ready - timings.received, route=route)
+    outcome = "cancelled"
+    try:
+        # Serve deterministic turns from the response cache without calling the LLM
+        cache_key = None
+        if is_cacheable(context) and not records_prompt:
+            cache_key = make_cache_key(llm_messages, get_model_name(route))
+            cached_reply = response_cache.get(cache_key)
+            if cached_reply is not None:
+                timings.cached = True
+                async for chunk in replay_cached_reply(cached_reply):
+                    timings.before_yield()
+                    yield chunk
+                    timings.after_yield()
+                outcome = "ok"
+                return
+
+        reply_parts = []
+        usages = []
+        # Replies built from live tool queries depend on the data, so they are not cached
+        used_tools = False
+
+        # Wait for a free LLM slot; raises ChatBusyError when the queue is full
+        async with admission.slot(session_id):
+            timings.mark_admitted()
+            tracing.record_span("chat.admission", timings.queue_wait)
+            parts_total = parts_done = 0
+            # Stream events from the graph (OpenAI streaming). aclosing() shuts the
+            # upstream stream down as soon as this generator is cancelled or closed.
+            events_stream = get_graph().astream_events(
+                input_state,
+                config={"configurable": {"route": route, "tool_cache": context.tool_cache,
+                                         "app_id": context.app_id, "object_id": context.object_id,
+                                         "upstream": admission.turn_calls()}},
+                version="v2",
+            )
+            async with aclosing(events_stream) as events:
+                async for event in events:
+                    kind = event["event"]
+                    if kind == "on_chat_model_stream":
+                        if event.get("metadata", {}).get("langgraph_node") in INTERNAL_NODES:
+                            continue
+                        # Yield each chunk of the response as it arrives
+                        chunk_data = event.get("data", {})
+                        content = getattr(chunk_data.get("chunk"), "content", None)
+                        # Tool-call chunks carry no text
+                        if content and isinstance(content, str):
+                            reply_parts.append(content)
+                            timings.before_yield()
+                            yield content
+                            timings.after_yield()
+                    elif kind == "on_tool_start":
+                        used_tools = True
+                    elif kind == "on_chat_model_end":
+                        output = event.get("data", {}).get("output")
+                        usage = getattr(output, "usage_metadata", None)
+                        if usage:
+                            usages.append(usage)
+                    elif kind == "on_custom_event" and event.get("name") == REPLY_EVENT:
+                        # The fan-out merge node emits the assembled reply in one piece
+                        reply_parts.append(event["data"])
+                        timings.before_yield()
+                        yield event["data"]
+                        timings.after_yield()
+                    elif kind == "on_custom_event" and event.get("name") == PROGRESS_EVENT:
+                        # Progress events are dicts; everything else this generator yields is reply text
+                        progress = {"type": "progress", **event["data"]}
+                        if progress["stage"] == "planned":
+                            parts_total = len(progress["objects"]) + len(progress["workflows"])
+                        elif progress["stage"] == "generated":
+                            parts_done += 1
+                            progress.update(completed=parts_done, total=parts_total)
+                        yield progress
+
+            record_token_usage(timings, llm_messages, reply_parts, usages)
+
+        # Only complete replies are cached; an aborted stream never reaches this point
+        if cache_key is not None and reply_parts and not used_tools:
+            response_cache.set(cache_key, "".join(reply_parts))
+        outcome = "ok"
+    except ChatBusyError:
+        outcome = "busy"
+        raise
+    except Exception:
+        outcome = "error"
+        raise
+    finally:
+        # Cancellation (GeneratorExit/CancelledError) falls through as "cancelled"
+        turn = timings.finish(outcome)
+        context.record_timings(turn)
+        span = tracing.current_span()
+        if span is not None:
+            for key in ("route", "outcome", "cached", "ttft_ms", "chunks", "prompt_tokens", "completion_tokens"):
+                span.set_attribute(key, turn[key])
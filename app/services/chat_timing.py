@@ -0,0 +1,201 @@
+"""
+Per-turn chat timings.
+
+A TurnTimings follows one handle_chat turn through its phases:
+
+    received -> prompt ready -> admitted (LLM slot) -> first chunk -> finished
+
+It counts chunks and inter-chunk gaps, tracks how long the generator sat
+suspended at ``yield`` while the transport sent the previous chunk, and
+records prompt/completion tokens. finish() feeds the histograms below and
+returns a summary dict that is kept in the session's debug history.
+"""
+import time
+from typing import Any, Dict, Iterable, List, Optional
+
+from app.utils import metrics
+
+TOKEN_BUCKETS = (16, 64, 256, 512, 1024, 2048, 4096, 8192, 16384, 32768)
+RATE_BUCKETS = (1, 5, 10, 20, 35, 50, 75, 100, 150, 250, 500)
+COUNT_BUCKETS = (1, 5, 10, 25, 50, 100, 250, 500, 1000, 2500)
+GAP_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+turns_total = metrics.registry.counter(
+    "chat_turns_total", "Chat turns by route, model and outcome", ("route", "model", "outcome"))
+turn_seconds = metrics.registry.histogram(
+    "chat_turn_seconds", "Time from receiving the turn to the end of the reply", ("route",))
+prompt_assembly_seconds = metrics.registry.histogram(
+    "chat_prompt_assembly_seconds", "Time to build the prompt (context, history, retrieval)", ("route",))
+queue_wait_seconds = metrics.registry.histogram(
+    "chat_queue_wait_seconds", "Time waiting for an LLM admission slot", ("route",))
+ttft_seconds = metrics.registry.histogram(
+    "chat_ttft_seconds", "Time from receiving the turn to the first reply chunk", ("route",))
+stream_seconds = metrics.registry.histogram(
+    "chat_stream_seconds", "Time from the first to the last reply chunk", ("route",))
+inter_chunk_gap_seconds = metrics.registry.histogram(
+    "chat_inter_chunk_gap_seconds", "Gap between consecutive reply chunks", ("route",), buckets=GAP_BUCKETS)
+consumer_wait_seconds = metrics.registry.histogram(
+    "chat_consumer_wait_seconds", "Time per turn spent waiting on the transport to take chunks", ("route",))
+tokens_per_second = metrics.registry.histogram(
+    "chat_tokens_per_second", "Completion tokens per second while streaming", ("route",), buckets=RATE_BUCKETS)
+chunks_per_turn = metrics.registry.histogram(
+    "chat_chunks_per_turn", "Reply chunks per turn", ("route",), buckets=COUNT_BUCKETS)
+prompt_tokens_per_turn = metrics.registry.histogram(
+    "chat_prompt_tokens", "Prompt tokens per turn", ("route",), buckets=TOKEN_BUCKETS)
+completion_tokens_per_turn = metrics.registry.histogram(
+    "chat_completion_tokens", "Completion tokens per turn", ("route",), buckets=TOKEN_BUCKETS)
+
+
+def _ms(seconds: Optional[float]) -> Optional[float]:
+    return None if seconds is None else round(seconds * 1000, 2)
+
+
+class TurnTimings:
+    def __init__(self, session_id: str):
+        self.session_id = session_id
+        self.route = "unknown"
+        self.model = ""
+        self.started_at = time.time()
+        self.received = time.perf_counter()
+        self.prompt_ready: Optional[float] = None
+        self.admitted: Optional[float] = None
+        self.first_chunk: Optional[float] = None
+        self.last_chunk: Optional[float] = None
+        self.finished: Optional[float] = None
+        self.chunks = 0
+        self.max_gap = 0.0
+        self.consumer_wait = 0.0
+        self._yielded_at: Optional[float] = None
+        self.cached = False
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+        self.outcome: Optional[str] = None
+
+    def mark_prompt_ready(self, route: str, model: str = ""):
+        self.route = route
+        self.model = model
+        self.prompt_ready = time.perf_counter()
+
+    def mark_admitted(self):
+        self.admitted = time.perf_counter()
+
+    def before_yield(self):
+        """Call right before yielding a reply chunk"""
+        now = time.perf_counter()
+        if self.first_chunk is None:
+            self.first_chunk = now
+        else:
+            gap = now - self.last_chunk
+            self.max_gap = max(self.max_gap, gap)
+            inter_chunk_gap_seconds.observe(gap, route=self.route)
+        self.last_chunk = now
+        self.chunks += 1
+        self._yielded_at = now
+
+    def after_yield(self):
+        """Call when the consumer asks for the next chunk"""
+        if self._yielded_at is not None:
+            self.consumer_wait += time.perf_counter() - self._yielded_at
+            self._yielded_at = None
+
+    def set_tokens(self, prompt_tokens: int, completion_tokens: int):
+        self.prompt_tokens = prompt_tokens
+        self.completion_tokens = completion_tokens
+
+    @property
+    def queue_wait(self) -> Optional[float]:
+        if self.admitted is None or self.prompt_ready is None:
+            return None
+        return self.admitted - self.prompt_ready
+
+    @property
+    def stream_time(self) -> Optional[float]:
+        if self.first_chunk is None or self.last_chunk is None:
+            return None
+        return self.last_chunk - self.first_chunk
+
+    @property
+    def tokens_per_second(self) -> Optional[float]:
+        stream_time = self.stream_time
+        if not stream_time or not self.completion_tokens:
+            return None
+        return self.completion_tokens / stream_time
+
+    def finish(self, outcome: str) -> Dict[str, Any]:
+        """Record the turn in the histograms (once) and return its summary"""
+        if self.finished is None:
+            self.finished = time.perf_counter()
+            self.outcome = outcome
+            self._observe()
+        return self.to_dict()
+
+    def _observe(self):
+        route = self.route
+        turns_total.inc(route=route, model=self.model, outcome=self.outcome)
+        turn_seconds.observe(self.finished - self.received, route=route)
+        if self.prompt_ready is not None:
+            prompt_assembly_seconds.observe(self.prompt_ready - self.received, route=route)
+        if self.queue_wait is not None:
+            queue_wait_seconds.observe(self.queue_wait, route=route)
+        if self.first_chunk is not None:
+            ttft_seconds.observe(self.first_chunk - self.received, route=route)
+            stream_seconds.observe(self.stream_time, route=route)
+            chunks_per_turn.observe(self.chunks, route=route)
+            consumer_wait_seconds.observe(self.consumer_wait, route=route)
+        if self.outcome == "ok" and not self.cached:
+            prompt_tokens_per_turn.observe(self.prompt_tokens, route=route)
+            completion_tokens_per_turn.observe(self.completion_tokens, route=route)
+            if self.tokens_per_second is not None:
+                tokens_per_second.observe(self.tokens_per_second, route=route)
+
+    def to_dict(self) -> Dict[str, Any]:
+        end = self.finished if self.finished is not None else time.perf_counter()
+        return {
+            "started_at": self.started_at,
+            "route": self.route,
+            "model": self.model,
+            "outcome": self.outcome,
+            "cached": self.cached,
+            "prompt_ms": _ms(self.prompt_ready - self.received if self.prompt_ready is not None else None),
+            "queue_wait_ms": _ms(self.queue_wait),
+            "ttft_ms": _ms(self.first_chunk - self.received if self.first_chunk is not None else None),
+            "stream_ms": _ms(self.stream_time),
+            "total_ms": _ms(end - self.received),
+            "chunks": self.chunks,
+            "max_gap_ms": _ms(self.max_gap),
+            "consumer_wait_ms": _ms(self.consumer_wait),
+            "prompt_tokens": self.prompt_tokens,
+            "completion_tokens": self.completion_tokens,
+            "tokens_per_second": round(self.tokens_per_second, 1) if self.tokens_per_second else None,
+        }
+
+
+def summarize_turns(turns: Iterable[Dict[str, Any]]) -> Dict[str, Any]:
+    """Aggregate a session's recent turn summaries for the debug endpoint"""
+    turns = list(turns)
+
+    def values(key: str) -> List[float]:
+        return [turn[key] for turn in turns if turn.get(key) is not None]
+
+    def avg(key: str) -> Optional[float]:
+        items = values(key)
+        return round(sum(items) / len(items), 2) if items else None
+
+    def peak(key: str) -> Optional[float]:
+        items = values(key)
+        return max(items) if items else None
+
+    outcomes: Dict[str, int] = {}
+    for turn in turns:
+        outcomes[turn["outcome"]] = outcomes.get(turn["outcome"], 0) + 1
+    return {
+        "turns": len(turns),
+        "outcomes": outcomes,
+        "avg_ttft_ms": avg("ttft_ms"),
+        "max_ttft_ms": peak("ttft_ms"),
+        "avg_queue_wait_ms": avg("queue_wait_ms"),
+        "avg_tokens_per_second": avg("tokens_per_second"),
+        "max_gap_ms": peak("max_gap_ms"),
+        "prompt_tokens": sum(values("prompt_tokens")),
+        "completion_tokens": sum(values("completion_tokens")),
+    }
@@ -0,0 +1,121 @@
+import asyncio
+from collections import deque
+from contextlib import suppress
+from typing import Any, AsyncIterator, Deque, Optional, Tuple
+
+
+class CoalesceSettings:
+    """Per-connection chunk coalescing limits.
+
+    Buffered chunks are flushed once they reach ``max_bytes`` or ``max_delay_ms``
+    after the first buffered chunk, whichever comes first. A delay of 0 disables
+    coalescing and every upstream chunk is sent as its own frame.
+    """
+
+    def __init__(self, max_bytes: int = 256, max_delay_ms: float = 0):
+        self.max_bytes = max(1, max_bytes)
+        self.max_delay_ms = max(0.0, max_delay_ms)
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_delay_ms > 0
+
+    def to_dict(self):
+        return {"max_bytes": self.max_bytes, "max_delay_ms": self.max_delay_ms}
+
+
+async def coalesce_chunks(chunks: AsyncIterator[Any], settings: CoalesceSettings) -> AsyncIterator[Any]:
+    """Merge small text chunks into larger frames according to ``settings``.
+
+    Non-text items (progress events) are never merged: they flush the text
+    buffered before them and are passed through in order.
+    """
+    if not settings.enabled:
+        async for chunk in chunks:
+            yield chunk
+        return
+
+    loop = asyncio.get_running_loop()
+    max_delay = settings.max_delay_ms / 1000
+    # (chunk, size) pairs; size is None for pass-through items
+    buffer: Deque[Tuple[Any, Optional[int]]] = deque()
+    buffered_bytes = 0
+    pending_items = 0
+    finished = False
+    error: Optional[BaseException] = None
+    # "ready" fires when the buffer stops being empty, "full" when it must be flushed now
+    ready = asyncio.Event()
+    full = asyncio.Event()
+
+    async def pump():
+        # A single reader task keeps the per-chunk cost to a list append
+        nonlocal buffered_bytes, pending_items, finished, error
+        try:
+            async for chunk in chunks:
+                if not isinstance(chunk, str):
+                    buffer.append((chunk, None))
+                    pending_items += 1
+                    ready.set()
+                    full.set()
+                    continue
+                size = len(chunk.encode("utf-8"))
+                buffer.append((chunk, size))
+                buffered_bytes += size
+                ready.set()
+                if buffered_bytes >= settings.max_bytes:
+                    full.set()
+        except Exception as e:
+            error = e
+        finally:
+            finished = True
+            ready.set()
+            full.set()
+
+    reader = asyncio.create_task(pump())
+    try:
+        while True:
+            await ready.wait()
+            if not full.is_set():
+                # Give the stream a few milliseconds to fill the frame; a plain
+                # timer is much cheaper per frame than wait_for()
+                timer = loop.call_later(max_delay, full.set)
+                try:
+                    await full.wait()
+                finally:
+                    timer.cancel()
+
+            if buffer:
+                if buffer[0][1] is None:
+                    frame = buffer.popleft()[0]
+                    pending_items -= 1
+                else:
+                    # Take whole chunks up to the byte limit; the rest waits for the next frame
+                    parts = []
+                    frame_bytes = 0
+                    while buffer and buffer[0][1] is not None and frame_bytes < settings.max_bytes:
+                        chunk, size = buffer.popleft()
+                        parts.append(chunk)
+                        frame_bytes += size
+                    buffered_bytes -= frame_bytes
+                    frame = "".join(parts)
+                if not finished:
+                    if not buffer:
+                        ready.clear()
+                    if buffered_bytes < settings.max_bytes and not pending_items:
+                        full.clear()
+                yield frame
+
+            if finished and not buffer:
+                break
+
+        if error is not None:
+            raise error
+    finally:
+        # Stop reading from the source (closing the upstream stream) if we exit early
+        if not reader.done():
+            reader.cancel()
+        with suppress(asyncio.CancelledError):
+            await reader
+        aclose = getattr(chunks, "aclose", None)
+        if aclose is not None:
+            await aclose()
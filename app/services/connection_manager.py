@@ -0,0 +1,244 @@
+import asyncio
+import itertools
+import json
+import logging
+import time
+from contextlib import suppress
+from typing import Callable, Dict, Optional
+
+from fastapi import WebSocket
+
+from app.utils import metrics
+
+logger = logging.getLogger(__name__)
+
+send_queue_delay_seconds = metrics.registry.histogram(
+    "chat_ws_queue_delay_seconds", "Time a frame waits in a socket's send queue")
+send_seconds = metrics.registry.histogram(
+    "chat_ws_send_seconds", "Time to hand one frame to the socket")
+
+DROP = "drop"
+DISCONNECT = "disconnect"
+
+# Close code 1013 is "try again later"; used when we give up on a slow reader
+SLOW_CONSUMER_CLOSE_CODE = 1013
+IDLE_CLOSE_CODE = 1000
+
+
+class ConnectionClosed(Exception):
+    """Raised to the socket handler once the manager has closed the connection"""
+
+    def __init__(self, reason: str):
+        super().__init__(f"Connection closed ({reason})")
+        self.reason = reason
+
+
+class ConnectionSettings:
+    """Outbound queue and liveness settings for one socket"""
+
+    def __init__(
+        self,
+        max_queue: int = 256,
+        policy: str = DISCONNECT,
+        send_timeout: float = 5.0,
+        heartbeat_interval: float = 0,
+        idle_timeout: float = 300.0,
+    ):
+        if policy not in (DROP, DISCONNECT):
+            raise ValueError(f"Unknown slow consumer policy: {policy}")
+        self.max_queue = max(1, max_queue)
+        self.policy = policy
+        self.send_timeout = send_timeout
+        self.heartbeat_interval = heartbeat_interval
+        self.idle_timeout = idle_timeout
+
+
+class ManagedConnection:
+    """A socket with a bounded outbound queue drained by its own writer task.
+
+    Producers (the LLM stream loops) only enqueue, so a slow reader cannot stall
+    them. When the queue is full, droppable frames are discarded under the
+    "drop" policy; otherwise the producer waits up to ``send_timeout`` for room
+    and the connection is closed if the client still has not caught up.
+    """
+
+    def __init__(self, connection_id: str, websocket: WebSocket, settings: ConnectionSettings):
+        self.id = connection_id
+        self.websocket = websocket
+        self.settings = settings
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=settings.max_queue)
+        self.is_busy: Callable[[], bool] = lambda: False
+        self.close_reason: Optional[str] = None
+        self._closed = asyncio.Event()
+        self._writer: Optional[asyncio.Task] = None
+        self._keepalive: Optional[asyncio.Task] = None
+
+        client = websocket.client
+        self.client = f"{client.host}:{client.port}" if client else None
+        self.connected_at = time.time()
+        self.last_sent = self.last_received = time.monotonic()
+        self.frames_sent = 0
+        self.bytes_sent = 0
+        self.frames_received = 0
+        self.bytes_received = 0
+        self.frames_dropped = 0
+        self.max_queue_depth = 0
+
+    @property
+    def closed(self) -> bool:
+        return self._closed.is_set()
+
+    def start(self):
+        self._writer = asyncio.create_task(self._write_loop())
+        if self.settings.heartbeat_interval > 0:
+            self._keepalive = asyncio.create_task(self._heartbeat_loop())
+
+    async def send(self, text: str, droppable: bool = True) -> bool:
+        """Queue a frame for the client; returns False if it was dropped"""
+        if self.closed:
+            raise ConnectionClosed(self.close_reason or "closed")
+
+        # Frames carry their enqueue time so the writer can measure queueing delay
+        item = (text, time.perf_counter())
+        try:
+            self.queue.put_nowait(item)
+        except asyncio.QueueFull:
+            if droppable and self.settings.policy == DROP:
+                self.frames_dropped += 1
+                return False
+            try:
+                await asyncio.wait_for(self.queue.put(item), self.settings.send_timeout)
+            except asyncio.TimeoutError:
+                logger.warning("Closing slow chat consumer %s (%d frames queued)", self.id, self.queue.qsize())
+                await self.close("slow_consumer", SLOW_CONSUMER_CLOSE_CODE)
+                raise ConnectionClosed("slow_consumer")
+
+        self.max_queue_depth = max(self.max_queue_depth, self.queue.qsize())
+        return True
+
+    async def send_json(self, frame: Dict[str, object], droppable: bool = True) -> bool:
+        return await self.send(json.dumps(frame), droppable)
+
+    async def receive_text(self) -> str:
+        """Wait for the next client frame, enforcing the idle timeout"""
+        receive = asyncio.ensure_future(self.websocket.receive_text())
+        closed = asyncio.ensure_future(self._closed.wait())
+        idle_timeout = self.settings.idle_timeout or None
+        try:
+            while True:
+                done, _ = await asyncio.wait({receive, closed}, timeout=idle_timeout, return_when=asyncio.FIRST_COMPLETED)
+                if receive in done:
+                    data = receive.result()
+                    self.last_received = time.monotonic()
+                    self.frames_received += 1
+                    self.bytes_received += len(data)
+                    return data
+                if closed in done:
+                    raise ConnectionClosed(self.close_reason or "closed")
+                # Idle timeout expired; keep waiting while replies are still streaming
+                if not self.is_busy():
+                    await self.close("idle", IDLE_CLOSE_CODE)
+                    raise ConnectionClosed("idle")
+        finally:
+            for future in (receive, closed):
+                if not future.done():
+                    future.cancel()
+
+    async def close(self, reason: str, code: int = 1000):
+        already_closed = self.closed
+        if not already_closed:
+            self.close_reason = reason
+            self._closed.set()
+        current = asyncio.current_task()
+        for task in (self._writer, self._keepalive):
+            if task is not None and task is not current and not task.done():
+                task.cancel()
+        if not already_closed:
+            with suppress(Exception):
+                await asyncio.wait_for(self.websocket.close(code=code), self.settings.send_timeout)
+
+    async def _write_loop(self):
+        try:
+            while True:
+                text, enqueued_at = await self.queue.get()
+                started = time.perf_counter()
+                send_queue_delay_seconds.observe(started - enqueued_at)
+                await self.websocket.send_text(text)
+                send_seconds.observe(time.perf_counter() - started)
+                self.frames_sent += 1
+                self.bytes_sent += len(text)
+                self.last_sent = time.monotonic()
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            # The client went away; let the receive side wind the connection down
+            self.close_reason = self.close_reason or "send_failed"
+            self._closed.set()
+
+    async def _heartbeat_loop(self):
+        interval = self.settings.heartbeat_interval
+        while not self.closed:
+            await asyncio.sleep(interval)
+            if time.monotonic() - self.last_sent >= interval:
+                with suppress(ConnectionClosed):
+                    await self.send_json({"type": "ping", "ts": time.time()})
+
+    def stats(self) -> Dict[str, object]:
+        elapsed = max(time.time() - self.connected_at, 1e-6)
+        return {
+            "id": self.id,
+            "client": self.client,
+            "connected_at": self.connected_at,
+            "policy": self.settings.policy,
+            "busy": self.is_busy(),
+            "queue_depth": self.queue.qsize(),
+            "max_queue_depth": self.max_queue_depth,
+            "frames_sent": self.frames_sent,
+            "bytes_sent": self.bytes_sent,
+            "frames_received": self.frames_received,
+            "bytes_received": self.bytes_received,
+            "frames_dropped": self.frames_dropped,
+            "send_bytes_per_s": round(self.bytes_sent / elapsed, 1),
+            "send_frames_per_s": round(self.frames_sent / elapsed, 2),
+        }
+
+
+class ConnectionManager:
+    """Registry of live chat sockets"""
+
+    def __init__(self):
+        self.connections: Dict[str, ManagedConnection] = {}
+        self._ids = itertools.count(1)
+        self.total_connections = 0
+        self.closed_slow = 0
+        self.closed_idle = 0
+
+    def connect(self, websocket: WebSocket, settings: ConnectionSettings) -> ManagedConnection:
+        connection = ManagedConnection(f"ws-{next(self._ids)}", websocket, settings)
+        self.connections[connection.id] = connection
+        self.total_connections += 1
+        connection.start()
+        return connection
+
+    async def disconnect(self, connection: ManagedConnection):
+        self.connections.pop(connection.id, None)
+        if connection.close_reason == "slow_consumer":
+            self.closed_slow += 1
+        elif connection.close_reason == "idle":
+            self.closed_idle += 1
+        await connection.close(connection.close_reason or "disconnected")
+
+    def snapshot(self):
+        return [connection.stats() for connection in self.connections.values()]
+
+    def summary(self) -> Dict[str, object]:
+        return {
+            "live": len(self.connections),
+            "total": self.total_connections,
+            "closed_slow_consumer": self.closed_slow,
+            "closed_idle": self.closed_idle,
+        }
+
+
+# Registry of every /ws/chat socket served by this process
+manager = ConnectionManager()
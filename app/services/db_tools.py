@@ -0,0 +1,179 @@
+"""
+Read-only database tools the chat model can call.
+
+The query functions are plain synchronous SQLAlchemy code that returns small,
+JSON-ready results with capped row counts. build_tools() wraps them as
+LangChain tools that run in a worker thread. Results are memoized in the
+per-session TTLCache passed through the graph config as "tool_cache".
+
+The session's app and object ("app_id" and "object_id" in the same config)
+scope every query: objects, records and workflows outside them are reported
+as errors, as if they did not exist.
+"""
+import asyncio
+import json
+from typing import Any, Callable, Dict, List, Optional
+
+from app.models import SchemaObject, SchemaRecord, SchemaWorkflow
+from app.utils import tracing
+
+# Hard cap on records returned by one find_records call
+MAX_RECORDS = 25
+
+
+def _session(session_factory=None):
+    from app.database import SessionLocal
+    return (session_factory or SessionLocal)()
+
+
+def _scope_app(db, scope_app_id: Optional[int], scope_object_id: Optional[int]) -> Optional[int]:
+    # An object scope implies its app
+    if scope_app_id is None and scope_object_id is not None:
+        return db.query(SchemaObject.app_id).filter(SchemaObject.id == scope_object_id).scalar()
+    return scope_app_id
+
+
+def _in_scope(db, object_id: int, scope_app_id: Optional[int], scope_object_id: Optional[int]) -> bool:
+    if scope_object_id is not None:
+        return object_id == scope_object_id
+    if scope_app_id is not None:
+        return db.query(SchemaObject.id).filter(
+            SchemaObject.id == object_id, SchemaObject.app_id == scope_app_id).first() is not None
+    return True
+
+
+def _filter_records(query, filters: Optional[Dict[str, Any]]):
+    # Exact matches on top-level data fields, compared as text
+    for key, value in (filters or {}).items():
+        query = query.filter(SchemaRecord.data[key].as_string() == str(value))
+    return query
+
+
+def list_objects(app_id: Optional[int] = None, session_factory=None, scope_app_id: Optional[int] = None,
+                 scope_object_id: Optional[int] = None) -> List[Dict[str, Any]]:
+    db = _session(session_factory)
+    try:
+        query = db.query(SchemaObject)
+        if app_id is not None:
+            query = query.filter(SchemaObject.app_id == app_id)
+        if scope_object_id is not None:
+            query = query.filter(SchemaObject.id == scope_object_id)
+        elif scope_app_id is not None:
+            query = query.filter(SchemaObject.app_id == scope_app_id)
+        return [
+            {
+                "id": obj.id,
+                "name": obj.name,
+                "app_id": obj.app_id,
+                "fields": list(obj.fields) if isinstance(obj.fields, dict) else obj.fields,
+            }
+            for obj in query.order_by(SchemaObject.id)
+        ]
+    finally:
+        db.close()
+
+
+def count_records(object_id: int, filters: Optional[Dict[str, Any]] = None, session_factory=None,
+                  scope_app_id: Optional[int] = None, scope_object_id: Optional[int] = None) -> Dict[str, Any]:
+    db = _session(session_factory)
+    try:
+        if not _in_scope(db, object_id, scope_app_id, scope_object_id):
+            return {"error": "object not found"}
+        query = _filter_records(db.query(SchemaRecord).filter(SchemaRecord.object_id == object_id), filters)
+        return {"object_id": object_id, "filters": filters or {}, "count": query.count()}
+    finally:
+        db.close()
+
+
+def find_records(object_id: int, filters: Optional[Dict[str, Any]] = None, fields: Optional[List[str]] = None,
+                 limit: int = 10, session_factory=None, scope_app_id: Optional[int] = None,
+                 scope_object_id: Optional[int] = None) -> Dict[str, Any]:
+    limit = max(1, min(limit, MAX_RECORDS))
+    db = _session(session_factory)
+    try:
+        if not _in_scope(db, object_id, scope_app_id, scope_object_id):
+            return {"error": "object not found"}
+        query = _filter_records(db.query(SchemaRecord).filter(SchemaRecord.object_id == object_id), filters)
+        # Fetch one extra row to report truncation without a second count query
+        rows = query.order_by(SchemaRecord.id).limit(limit + 1).all()
+        records = []
+        for record in rows[:limit]:
+            data = record.data or {}
+            if fields:
+                data = {key: data[key] for key in fields if key in data}
+            records.append({"id": record.id, "data": data})
+        return {"object_id": object_id, "records": records, "truncated": len(rows) > limit}
+    finally:
+        db.close()
+
+
+def get_workflow(workflow_id: Optional[int] = None, name: Optional[str] = None, session_factory=None,
+                 scope_app_id: Optional[int] = None, scope_object_id: Optional[int] = None) -> Dict[str, Any]:
+    db = _session(session_factory)
+    try:
+        query = db.query(SchemaWorkflow)
+        if scope_app_id is not None or scope_object_id is not None:
+            query = query.filter(SchemaWorkflow.app_id == _scope_app(db, scope_app_id, scope_object_id))
+        if workflow_id is not None:
+            workflow = query.filter(SchemaWorkflow.id == workflow_id).first()
+        elif name:
+            workflow = query.filter(SchemaWorkflow.name == name).first()
+        else:
+            return {"error": "pass workflow_id or name"}
+        if workflow is None:
+            return {"error": "workflow not found"}
+        return {"id": workflow.id, "name": workflow.name, "app_id": workflow.app_id, "steps": workflow.steps}
+    finally:
+        db.close()
+
+
+async def call_cached(config: Optional[Dict[str, Any]], name: str, fn: Callable, /, **kwargs) -> str:
+    """Run a query function off the event loop within the session's scope, memoized in its tool cache"""
+    configurable = (config or {}).get("configurable") or {}
+    cache = configurable.get("tool_cache")
+    kwargs.update(scope_app_id=configurable.get("app_id"), scope_object_id=configurable.get("object_id"))
+    key = f"{name}:{json.dumps(kwargs, sort_keys=True, default=str)}"
+    with tracing.span(f"tool.{name}") as span:
+        if cache is not None:
+            cached = cache.get(key)
+            if cached is not None:
+                span.set_attribute("cached", True)
+                return cached
+        result = json.dumps(await asyncio.to_thread(fn, **kwargs), default=str)
+        if cache is not None:
+            cache.set(key, result)
+        return result
+
+
+def build_tools():
+    """LangChain tool wrappers for the query functions"""
+    from langchain_core.runnables import RunnableConfig
+    from langchain_core.tools import tool
+
+    @tool("list_objects")
+    async def list_objects_tool(app_id: Optional[int] = None, config: RunnableConfig = None) -> str:
+        """List data objects (id, name, app_id, field names), optionally only those of one app."""
+        return await call_cached(config, "list_objects", list_objects, app_id=app_id)
+
+    @tool("count_records")
+    async def count_records_tool(object_id: int, filters: Optional[Dict[str, str]] = None,
+                                 config: RunnableConfig = None) -> str:
+        """Count records of an object, optionally only those whose fields exactly match `filters`."""
+        return await call_cached(config, "count_records", count_records, object_id=object_id, filters=filters)
+
+    @tool("find_records")
+    async def find_records_tool(object_id: int, filters: Optional[Dict[str, str]] = None,
+                                fields: Optional[List[str]] = None, limit: int = 10,
+                                config: RunnableConfig = None) -> str:
+        """Fetch up to `limit` (max 25) records of an object whose fields exactly match `filters`.
+        Pass `fields` to return only those fields."""
+        return await call_cached(config, "find_records", find_records, object_id=object_id,
+                                 filters=filters, fields=fields, limit=limit)
+
+    @tool("get_workflow")
+    async def get_workflow_tool(workflow_id: Optional[int] = None, name: Optional[str] = None,
+                                config: RunnableConfig = None) -> str:
+        """Get a workflow and its steps by id or exact name."""
+        return await call_cached(config, "get_workflow", get_workflow, workflow_id=workflow_id, name=name)
+
+    return [list_objects_tool, count_records_tool, find_records_tool, get_workflow_tool]
@@ -0,0 +1,162 @@
+"""
+Local stand-in for ChatOpenAI used for load tests and offline development.
+
+Select it with CHAT_MODEL_BACKEND=fake. Replies follow the same
+{"reply", "type", "config"} envelope the system prompt asks for and are
+streamed token by token with a configurable time-to-first-token distribution
+and token rate, so the whole /ws/chat pipeline can be exercised without
+calling OpenAI.
+"""
+import asyncio
+import json
+import random
+import time
+from typing import Any, AsyncIterator, Dict, Iterator, List, Optional
+
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk, BaseMessage, message_chunk_to_message
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+from langchain_core.utils.function_calling import convert_to_openai_tool
+
+from app.services import intent_router
+from app.services.app_planner import PART_MARKER, PLAN_MARKER
+
+WORDS = (
+    "record workflow object field status customer order technician dispatcher "
+    "schedule approval step form update assign review priority invoice task "
+    "location manager request service team report the a to for with and of"
+).split()
+
+# Reply to the fan-out planner prompt (see app_planner)
+FAKE_PLAN = {
+    "app": "Field Service",
+    "objects": [{"name": "WorkOrder", "description": "a job"}, {"name": "Technician", "description": "a worker"}],
+    "workflows": [{"name": "Dispatch", "description": "assign work orders"}],
+}
+
+class FakeChatModel(BaseChatModel):
+    """Chat model that streams synthetic JSON replies with realistic timing"""
+
+    model_name: str = "fake-chat"
+    tokens_per_second: float = 50.0
+    # Time to first token is log-normally distributed around the median
+    ttft_median_ms: float = 300.0
+    ttft_sigma: float = 0.5
+    reply_words: int = 40
+    chars_per_token: int = 4
+    seed: Optional[int] = None
+
+    @property
+    def _llm_type(self) -> str:
+        return "fake-chat"
+
+    def _rng(self, messages: List[BaseMessage]) -> random.Random:
+        if self.seed is None:
+            return random.Random()
+        return random.Random(f"{self.seed}:{len(messages)}:{messages[-1].content if messages else ''}")
+
+    def _reply_text(self, messages: List[BaseMessage], rng: random.Random) -> str:
+        prompt = str(messages[-1].content).lower() if messages else ""
+        instructions = str(messages[0].content) if messages else ""
+        if instructions.startswith(PLAN_MARKER):
+            return json.dumps(FAKE_PLAN, indent=2)
+        if instructions.startswith(PART_MARKER):
+            if "data object" in instructions:
+                return json.dumps({"fields": {"name": {"type": "text"}, "status": {"type": "select"}}}, indent=2)
+            return json.dumps({"steps": [{"name": "Create"}, {"name": "Review"}, {"name": "Complete"}]}, indent=2)
+        words = " ".join(rng.choice(WORDS) for _ in range(self.reply_words))
+        # Answer with a config where the router would send the turn to the strong model
+        if intent_router.classify_intent(prompt) in ("app", "decide"):
+            reply: Dict[str, Any] = {
+                "reply": f"- Designing a field service app\n- {words}",
+                "type": "admin",
+                "config": {
+                    "objects": {
+                        "WorkOrder": {"fields": {"title": {"type": "text"}, "status": {"type": "select"}}},
+                        "Technician": {"fields": {"name": {"type": "text"}, "email": {"type": "email"}}},
+                    },
+                    "workflows": {
+                        "Dispatch": {"steps": [{"name": "Create"}, {"name": "Assign"}, {"name": "Complete"}]},
+                    },
+                },
+            }
+        else:
+            reply = {"reply": f"{words}?", "type": "continue", "config": {}}
+        return json.dumps(reply, indent=2)
+
+    def _tokens(self, text: str) -> List[str]:
+        size = max(1, self.chars_per_token)
+        return [text[i:i + size] for i in range(0, len(text), size)]
+
+    def _first_token_delay(self, rng: random.Random) -> float:
+        if self.ttft_median_ms <= 0:
+            return 0.0
+        return rng.lognormvariate(0, self.ttft_sigma) * self.ttft_median_ms / 1000
+
+    def _token_delay(self, rng: random.Random) -> float:
+        if self.tokens_per_second <= 0:
+            return 0.0
+        # Exponential jitter around the mean token rate
+        return rng.expovariate(self.tokens_per_second)
+
+    def bind_tools(self, tools: List[Any], **kwargs: Any):
+        names = [convert_to_openai_tool(t)["function"]["name"] for t in tools]
+        return self.bind(tools=names, **kwargs)
+
+    def _tool_call(self, messages: List[BaseMessage], tools: Optional[List[str]]) -> Optional[AIMessageChunk]:
+        # Questions about "objects" make one list_objects call, like a real model would
+        if not tools or "list_objects" not in tools or not messages or messages[-1].type != "human":
+            return None
+        if "objects" not in str(messages[-1].content).lower():
+            return None
+        return AIMessageChunk(content="", tool_call_chunks=[
+            {"name": "list_objects", "args": "{}", "id": f"call_fake_{len(messages)}", "index": 0}
+        ])
+
+    def _tool_answer(self, messages: List[BaseMessage]) -> Optional[str]:
+        if not messages or messages[-1].type != "tool":
+            return None
+        reply = {"reply": f"Here is what I found: {messages[-1].content}", "type": "user", "config": {}}
+        return json.dumps(reply, indent=2)
+
+    def _generate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                  run_manager=None, **kwargs: Any) -> ChatResult:
+        merged = None
+        for chunk in self._stream(messages, stop, run_manager, **kwargs):
+            merged = chunk.message if merged is None else merged + chunk.message
+        message = message_chunk_to_message(merged) if merged is not None else AIMessage(content="")
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+    def _stream(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                run_manager=None, **kwargs: Any) -> Iterator[ChatGenerationChunk]:
+        rng = self._rng(messages)
+        time.sleep(self._first_token_delay(rng))
+        tool_call = self._tool_call(messages, kwargs.get("tools"))
+        if tool_call is not None:
+            yield ChatGenerationChunk(message=tool_call)
+            return
+        text = self._tool_answer(messages) or self._reply_text(messages, rng)
+        for i, token in enumerate(self._tokens(text)):
+            if i:
+                time.sleep(self._token_delay(rng))
+            chunk = ChatGenerationChunk(message=AIMessageChunk(content=token))
+            if run_manager:
+                run_manager.on_llm_new_token(token, chunk=chunk)
+            yield chunk
+
+    async def _astream(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                       run_manager=None, **kwargs: Any) -> AsyncIterator[ChatGenerationChunk]:
+        rng = self._rng(messages)
+        await asyncio.sleep(self._first_token_delay(rng))
+        tool_call = self._tool_call(messages, kwargs.get("tools"))
+        if tool_call is not None:
+            yield ChatGenerationChunk(message=tool_call)
+            return
+        text = self._tool_answer(messages) or self._reply_text(messages, rng)
+        for i, token in enumerate(self._tokens(text)):
+            if i:
+                await asyncio.sleep(self._token_delay(rng))
+            chunk = ChatGenerationChunk(message=AIMessageChunk(content=token))
+            if run_manager:
+                await run_manager.on_llm_new_token(token, chunk=chunk)
+            yield chunk
@@ -0,0 +1,90 @@
+"""
+Cheap local intent classification used to route chat turns to a model.
+
+The keyword rules are the ones SYSTEM_PROMPT gives the model for telling
+object, workflow and app requests apart, plus its "decide by yourself"
+rule. Turns that are likely to produce a full config go to the strong model,
+or to the fan-out planner when they generate a complete app. Clarifying
+back-and-forth goes to the fast one.
+"""
+import re
+from typing import Any, Dict, List, Optional
+
+FAST = "fast"
+STRONG = "strong"
+FANOUT = "fanout"
+
+OBJECT_KEYWORDS = ("create object", "add object", "new object", "object for")
+WORKFLOW_KEYWORDS = ("create workflow", "add workflow", "new workflow")
+APP_KEYWORDS = ("create app", "build app", "new application")
+DECIDE_KEYWORDS = ("decide by yourself", "you decide", "no specifics", "default")
+# 'default' only counts as a request: the whole reply ("defaults please"), or asking to use or
+# keep them. Matching the bare word would also catch "what is the default priority?"
+_DEFAULT_REQUEST = (
+    r"^(?:just |the )*defaults?(?: please)?[.!]*$"
+    r"|\b(?:use|go with|keep|stick with|pick) (?:the |all )?defaults?\b"
+    r"|\bdefaults? (?:is|are) (?:fine|ok|okay|good)\b"
+)
+_DECIDE_PATTERN = re.compile(
+    r"\b(?:" + "|".join(re.escape(k) for k in DECIDE_KEYWORDS if k != "default") + r")\b|" + _DEFAULT_REQUEST)
+
+# SYSTEM_PROMPT tells the model to generate a default schema after 2 clarifying questions
+MAX_CLARIFYING_TURNS = 2
+# A user turn this long usually carries enough detail to generate a config
+LONG_TURN_WORDS = 25
+
+
+def _normalize(text: str) -> str:
+    return " ".join(text.lower().split())
+
+
+def subject_intent(text: str) -> Optional[str]:
+    """Return what a user message asks to create: "app", "object", "workflow" or None"""
+    text = _normalize(text)
+    if any(keyword in text for keyword in APP_KEYWORDS):
+        return "app"
+    if any(keyword in text for keyword in OBJECT_KEYWORDS):
+        return "object"
+    if any(keyword in text for keyword in WORKFLOW_KEYWORDS):
+        return "workflow"
+    return None
+
+
+def classify_intent(text: str) -> Optional[str]:
+    """Return "decide" for the SYSTEM_PROMPT default-schema rule, else the subject_intent()"""
+    if _DECIDE_PATTERN.search(_normalize(text)):
+        return "decide"
+    return subject_intent(text)
+
+
+def is_design_conversation(messages: List[Dict[str, Any]]) -> bool:
+    """True when the user is creating an app, object or workflow rather than working with records"""
+    return any(classify_intent(str(m.get("content", ""))) for m in messages if m.get("role") == "user")
+
+
+def choose_route(messages: List[Dict[str, Any]], fanout: bool = False) -> str:
+    """Pick FAST, STRONG or (when ``fanout`` is allowed) FANOUT for the turn
+    ending with the last user message
+
+    ``messages`` should hold what the user typed, not prompts rendered from
+    records; callers disable ``fanout`` for turns bound to a record.
+    """
+    user_texts = [str(m.get("content", "")) for m in messages if m.get("role") == "user"]
+    if not user_texts:
+        return FAST
+
+    # Follow-up turns inherit the intent that started the conversation
+    conversation_intent = next((intent for intent in map(subject_intent, user_texts) if intent), None)
+    # Complete apps (or "decide by yourself" defaults) can be generated by the fan-out planner
+    generation_route = FANOUT if fanout and conversation_intent in (None, "app") else STRONG
+
+    last = user_texts[-1]
+    if classify_intent(last) == "decide":
+        return generation_route
+    if conversation_intent is None:
+        return FAST
+
+    assistant_turns = sum(1 for m in messages if m.get("role") == "assistant")
+    if assistant_turns >= MAX_CLARIFYING_TURNS or len(last.split()) >= LONG_TURN_WORDS:
+        return generation_route
+    return FAST
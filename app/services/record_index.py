@@ -0,0 +1,203 @@
+"""
+In-process BM25 index over SchemaRecord.data for user-mode chat retrieval.
+
+Each record is indexed as the text of its object name, field names and
+values. The CRUD endpoints upsert records as they are created or updated.
+The chat process also syncs records changed since its last sync (by
+updated_at) from the database, which covers chat running in its own process.
+Deleted records leave no trace to sync from, so each sync also compares the
+indexed ids with the table and drops those that are gone.
+Searches can be limited to one object or to the objects of one app, so a chat
+about one app is not grounded in another app's records.
+"""
+import heapq
+import logging
+import math
+import re
+import threading
+import time
+from collections import Counter
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# BM25 parameters (standard defaults)
+K1 = 1.2
+B = 0.75
+# Query terms found in nearly every record (e.g. the object name) barely move
+# scores but dominate search time, so they are skipped
+MIN_IDF = 0.01
+
+_CAMEL = re.compile(r"([a-z0-9])([A-Z])")
+_WORD = re.compile(r"[a-z0-9]+")
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercase words, with camelCase and snake_case split and a naive plural strip"""
+    words = _WORD.findall(_CAMEL.sub(r"\1 \2", text).lower())
+    return [w[:-1] if len(w) > 3 and w.endswith("s") and not w.endswith("ss") else w for w in words]
+
+
+def _flatten(value: Any, out: List[str]):
+    if isinstance(value, dict):
+        for key, item in value.items():
+            out.append(str(key))
+            _flatten(item, out)
+    elif isinstance(value, (list, tuple)):
+        for item in value:
+            _flatten(item, out)
+    elif value is not None:
+        out.append(str(value))
+
+
+def record_text(data: Dict[str, Any], object_name: Optional[str] = None) -> str:
+    parts: List[str] = [object_name] if object_name else []
+    _flatten(data, parts)
+    return " ".join(parts)
+
+
+class RecordIndex:
+    """Incrementally updated BM25 index keyed by record id"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        # term -> {record_id: term frequency}
+        self.postings: Dict[str, Dict[int, int]] = {}
+        self.doc_terms: Dict[int, Counter] = {}
+        self.doc_lengths: Dict[int, int] = {}
+        self.total_length = 0
+        self.records: Dict[int, Dict[str, Any]] = {}
+        self.object_names: Dict[int, str] = {}
+        self.object_apps: Dict[int, Optional[int]] = {}
+        # Database sync state; one sync at a time
+        self._sync_lock = threading.Lock()
+        self.watermark = None
+        self.last_sync = 0.0
+
+    def __len__(self):
+        return len(self.records)
+
+    def upsert(self, record_id: int, object_id: int, data: Dict[str, Any], object_name: Optional[str] = None,
+               app_id: Optional[int] = None):
+        """Add or replace a record"""
+        with self._lock:
+            if object_name:
+                self.object_names[object_id] = object_name
+            if app_id is not None:
+                self.object_apps[object_id] = app_id
+            self._remove(record_id)
+            terms = Counter(tokenize(record_text(data, self.object_names.get(object_id))))
+            for term, count in terms.items():
+                self.postings.setdefault(term, {})[record_id] = count
+            length = sum(terms.values())
+            self.doc_terms[record_id] = terms
+            self.doc_lengths[record_id] = length
+            self.total_length += length
+            self.records[record_id] = {"id": record_id, "object_id": object_id, "data": data}
+
+    def remove(self, record_id: int):
+        with self._lock:
+            self._remove(record_id)
+
+    def _remove(self, record_id: int):
+        terms = self.doc_terms.pop(record_id, None)
+        if terms is None:
+            return
+        for term in terms:
+            docs = self.postings.get(term)
+            if docs is not None:
+                docs.pop(record_id, None)
+                if not docs:
+                    del self.postings[term]
+        self.total_length -= self.doc_lengths.pop(record_id)
+        del self.records[record_id]
+
+    def object_of(self, record_id: int) -> Optional[int]:
+        record = self.records.get(record_id)
+        return record["object_id"] if record else None
+
+    def search(self, query: str, k: int = 5, object_ids: Optional[Iterable[int]] = None,
+               app_id: Optional[int] = None) -> List[Tuple[float, Dict[str, Any]]]:
+        """Top-k (score, record) pairs for ``query``, optionally only from ``object_ids``
+        and the objects of ``app_id``; records without a matching term are skipped"""
+        allowed = set(object_ids) if object_ids is not None else None
+        with self._lock:
+            if app_id is not None:
+                in_app = {object_id for object_id, object_app in self.object_apps.items() if object_app == app_id}
+                allowed = in_app if allowed is None else allowed & in_app
+            count = len(self.records)
+            if not count:
+                return []
+            average_length = self.total_length / count
+            scores: Dict[int, float] = {}
+            for term in set(tokenize(query)):
+                docs = self.postings.get(term)
+                if not docs:
+                    continue
+                idf = math.log(1 + (count - len(docs) + 0.5) / (len(docs) + 0.5))
+                if idf < MIN_IDF:
+                    continue
+                for record_id, tf in docs.items():
+                    norm = K1 * (1 - B + B * self.doc_lengths[record_id] / average_length)
+                    scores[record_id] = scores.get(record_id, 0.0) + idf * tf * (K1 + 1) / (tf + norm)
+            candidates = scores.items()
+            if allowed is not None:
+                candidates = [(rid, score) for rid, score in candidates if self.records[rid]["object_id"] in allowed]
+            ranked = heapq.nsmallest(k, candidates, key=lambda item: (-item[1], item[0]))
+            return [
+                (score, {**self.records[rid], "object": self.object_names.get(self.records[rid]["object_id"])})
+                for rid, score in ranked
+            ]
+
+    def sync_from_db(self, session_factory=None):
+        """Index records created or updated since the last sync and drop deleted ones"""
+        with self._sync_lock:
+            self._sync(session_factory)
+
+    def _sync(self, session_factory=None):
+        from app.database import SessionLocal
+        from app.models import SchemaObject, SchemaRecord
+
+        session = (session_factory or SessionLocal)()
+        try:
+            for object_id, name, app_id in session.query(SchemaObject.id, SchemaObject.name, SchemaObject.app_id):
+                self.object_names[object_id] = name
+                self.object_apps[object_id] = app_id
+            query = session.query(SchemaRecord)
+            if self.watermark is not None:
+                query = query.filter(SchemaRecord.updated_at >= self.watermark)
+            for record in query.yield_per(500):
+                self.upsert(record.id, record.object_id, record.data or {})
+                if record.updated_at and (self.watermark is None or record.updated_at > self.watermark):
+                    self.watermark = record.updated_at
+            # Only ids indexed before the scan: records upserted meanwhile may be newer than it
+            with self._lock:
+                indexed = set(self.records)
+            if indexed:
+                live = {record_id for (record_id,) in session.query(SchemaRecord.id).yield_per(5000)}
+                for record_id in indexed - live:
+                    self.remove(record_id)
+        finally:
+            session.close()
+
+    def needs_sync(self, interval: float) -> bool:
+        return not self.last_sync or time.monotonic() - self.last_sync >= interval
+
+    def maybe_sync(self, interval: float, session_factory=None):
+        """Sync from the database at most once per ``interval`` seconds; errors are logged.
+        Skipped while another sync is running, so concurrent turns do not repeat the scan."""
+        if not self.needs_sync(interval) or not self._sync_lock.acquire(blocking=False):
+            return
+        try:
+            if not self.needs_sync(interval):
+                return
+            self.last_sync = time.monotonic()
+            self._sync(session_factory)
+        except Exception as e:
+            logger.warning("Record index sync failed: %s", e)
+        finally:
+            self._sync_lock.release()
+
+
+# Process-wide index shared by the CRUD endpoints and the chat service
+record_index = RecordIndex()
@@ -0,0 +1,202 @@
+"""
+Incremental parser for the assistant's {"reply", "type", "config"} envelope.
+
+The system prompt makes the model answer with a JSON object. Instead of
+waiting for the whole object, ReplyStreamParser scans the streamed text as it
+arrives and emits:
+
+    {"type": "reply_delta", "data": "..."}     decoded text of "reply" so far
+    {"type": "reply_type", "value": "admin"}   as soon as "type" is complete
+    {"type": "config", "config": {...}}        validated config, on finish()
+    {"type": "parse_error", "error": "...", "raw": "..."}
+                                               if the reply was not a valid envelope
+"""
+import json
+from typing import Any, Dict, List, Optional
+
+REPLY_TYPES = ("continue", "admin", "user", "workflow")
+
+_ESCAPES = {'"': '"', "\\": "\\", "/": "/", "b": "\b", "f": "\f", "n": "\n", "r": "\r", "t": "\t"}
+_WHITESPACE = " \t\r\n"
+
+
+class ReplyStreamParser:
+    """Feed streamed text with feed(); call finish() once the stream has ended"""
+
+    def __init__(self):
+        self._raw: List[str] = []
+        # start -> key -> key_string -> colon -> value -> (capture | skip | literal) -> after_value -> ... -> done
+        self._state = "start"
+        self._key: List[str] = []
+        self._capture: Optional[str] = None
+        self._captured: List[str] = []
+        # String decoding state, shared by keys, captured values and skipped values
+        self._escape = False
+        self._unicode: Optional[str] = None
+        self._high_surrogate: Optional[int] = None
+        self._closed = False
+        # Nesting of a skipped object/array value
+        self._depth = 0
+        self._in_string = False
+        self.reply_type: Optional[str] = None
+        self._type_sent = False
+
+    def _decode(self, ch: str) -> str:
+        """Decode one character of a JSON string body; sets _closed on the closing quote"""
+        if self._unicode is not None:
+            self._unicode += ch
+            if len(self._unicode) < 4:
+                return ""
+            try:
+                code = int(self._unicode, 16)
+            except ValueError:
+                code = 0xFFFD
+            self._unicode = None
+            if 0xD800 <= code < 0xDC00:
+                self._high_surrogate = code
+                return ""
+            if 0xDC00 <= code < 0xE000 and self._high_surrogate is not None:
+                code = 0x10000 + ((self._high_surrogate - 0xD800) << 10) + (code - 0xDC00)
+            self._high_surrogate = None
+            return chr(code)
+        if self._escape:
+            self._escape = False
+            if ch == "u":
+                self._unicode = ""
+                return ""
+            return _ESCAPES.get(ch, ch)
+        if ch == "\\":
+            self._escape = True
+            return ""
+        if ch == '"':
+            self._closed = True
+            return ""
+        return ch
+
+    def _skip(self, ch: str) -> bool:
+        """Track a skipped value; returns True when it has ended"""
+        if self._in_string:
+            self._decode(ch)
+            if self._closed:
+                self._closed = False
+                self._in_string = False
+                return self._depth == 0
+            return False
+        if ch == '"':
+            self._in_string = True
+        elif ch in "{[":
+            self._depth += 1
+        elif ch in "}]":
+            self._depth -= 1
+            return self._depth == 0
+        return False
+
+    def feed(self, text: str) -> List[Dict[str, Any]]:
+        self._raw.append(text)
+        events: List[Dict[str, Any]] = []
+        delta: List[str] = []
+
+        for ch in text:
+            state = self._state
+            if state == "start":
+                if ch == "{":
+                    self._state = "key"
+            elif state == "key":
+                if ch == '"':
+                    self._key = []
+                    self._state = "key_string"
+                elif ch == "}":
+                    self._state = "done"
+            elif state == "key_string":
+                decoded = self._decode(ch)
+                if self._closed:
+                    self._closed = False
+                    self._state = "colon"
+                else:
+                    self._key.append(decoded)
+            elif state == "colon":
+                if ch == ":":
+                    self._state = "value"
+            elif state == "value":
+                if ch in _WHITESPACE:
+                    continue
+                key = "".join(self._key)
+                if ch == '"' and key in ("reply", "type"):
+                    self._capture = key
+                    self._captured = []
+                    self._state = "capture"
+                elif ch == '"' or ch in "{[":
+                    self._depth = 0
+                    self._in_string = False
+                    self._skip(ch)
+                    self._state = "skip"
+                else:
+                    self._state = "literal"
+            elif state == "capture":
+                decoded = self._decode(ch)
+                if self._closed:
+                    self._closed = False
+                    if self._capture == "type":
+                        self.reply_type = "".join(self._captured)
+                        if not self._type_sent:
+                            self._type_sent = True
+                            # Keep events in stream order
+                            if delta:
+                                events.append({"type": "reply_delta", "data": "".join(delta)})
+                                delta = []
+                            events.append({"type": "reply_type", "value": self.reply_type})
+                    self._capture = None
+                    self._state = "after_value"
+                elif decoded:
+                    if self._capture == "reply":
+                        delta.append(decoded)
+                    else:
+                        self._captured.append(decoded)
+            elif state == "skip":
+                if self._skip(ch):
+                    self._state = "after_value"
+            elif state in ("literal", "after_value"):
+                if ch == ",":
+                    self._state = "key"
+                elif ch == "}":
+                    self._state = "done"
+
+        if delta:
+            events.append({"type": "reply_delta", "data": "".join(delta)})
+        return events
+
+    def finish(self) -> List[Dict[str, Any]]:
+        """Validate the complete reply and return the closing events"""
+        raw = "".join(self._raw)
+        start, end = raw.find("{"), raw.rfind("}")
+        try:
+            if start < 0 or end < start:
+                raise ValueError("reply is not a JSON object")
+            envelope = json.loads(raw[start:end + 1])
+            if not isinstance(envelope, dict):
+                raise ValueError("reply is not a JSON object")
+            reply_type = envelope.get("type")
+            if reply_type not in REPLY_TYPES:
+                raise ValueError(f"unknown reply type: {reply_type!r}")
+            config = envelope.get("config")
+            if config is None:
+                config = {}
+            if not isinstance(config, dict):
+                raise ValueError("config must be an object")
+            for section in ("objects", "workflows"):
+                if section in config and not isinstance(config[section], dict):
+                    raise ValueError(f"config.{section} must be an object")
+        except ValueError as e:
+            events: List[Dict[str, Any]] = []
+            if self._state == "start":
+                # No envelope at all: pass the text through as the reply
+                events.append({"type": "reply_delta", "data": raw})
+            events.append({"type": "parse_error", "error": str(e), "raw": raw})
+            return events
+
+        events = []
+        if not self._type_sent:
+            self._type_sent = True
+            events.append({"type": "reply_type", "value": reply_type})
+        events.append({"type": "config", "config": config})
+        return events
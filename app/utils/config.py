@@ -1,7 +1,187 @@
 import os
+import tempfile
 from dotenv import load_dotenv
 
 load_dotenv()
 
 def get_openai_api_key():
-    return os.environ.get("OPENAI_API_KEY", "") 
\ No newline at end of file
+    return os.environ.get("OPENAI_API_KEY", "") 
+
+def _get_bool(name, default):
+    value = os.environ.get(name)
+    if value is None:
+        return default
+    return value.strip().lower() in ("1", "true", "yes", "on")
+
+def get_chat_cache_enabled():
+    return _get_bool("CHAT_CACHE_ENABLED", True)
+
+def get_chat_cache_ttl_seconds():
+    return float(os.environ.get("CHAT_CACHE_TTL_SECONDS", "600"))
+
+def get_chat_cache_max_entries():
+    return int(os.environ.get("CHAT_CACHE_MAX_ENTRIES", "256"))
+
+def get_chat_cache_chunk_size():
+    return int(os.environ.get("CHAT_CACHE_CHUNK_SIZE", "16"))
+
+def get_chat_max_concurrent():
+    return int(os.environ.get("CHAT_MAX_CONCURRENT", "8"))
+
+def get_chat_max_queue():
+    return int(os.environ.get("CHAT_MAX_QUEUE", "32"))
+
+def get_chat_queue_timeout_seconds():
+    return float(os.environ.get("CHAT_QUEUE_TIMEOUT_SECONDS", "30"))
+
+def get_chat_coalesce_bytes():
+    return int(os.environ.get("CHAT_COALESCE_BYTES", "256"))
+
+def get_chat_coalesce_ms():
+    # 0 sends every token chunk as its own frame
+    return float(os.environ.get("CHAT_COALESCE_MS", "0"))
+
+def get_chat_send_queue_size():
+    return int(os.environ.get("CHAT_SEND_QUEUE_SIZE", "256"))
+
+def get_chat_slow_consumer_policy():
+    # "disconnect" or "drop"
+    return os.environ.get("CHAT_SLOW_CONSUMER_POLICY", "disconnect")
+
+def get_chat_send_timeout_seconds():
+    return float(os.environ.get("CHAT_SEND_TIMEOUT_SECONDS", "5"))
+
+def get_chat_heartbeat_seconds():
+    # 0 disables heartbeat pings
+    return float(os.environ.get("CHAT_HEARTBEAT_SECONDS", "0"))
+
+def get_chat_idle_timeout_seconds():
+    # 0 disables the idle timeout
+    return float(os.environ.get("CHAT_IDLE_TIMEOUT_SECONDS", "300"))
+
+def get_chat_sse_resume_ttl_seconds():
+    return float(os.environ.get("CHAT_SSE_RESUME_TTL_SECONDS", "300"))
+
+def get_chat_sse_orphan_grace_seconds():
+    return float(os.environ.get("CHAT_SSE_ORPHAN_GRACE_SECONDS", "15"))
+
+def get_chat_model_backend():
+    # "openai" or "fake" (local stand-in for load tests, see app/services/fake_llm.py)
+    return os.environ.get("CHAT_MODEL_BACKEND", "openai").lower()
+
+def get_fake_llm_settings():
+    seed = os.environ.get("FAKE_LLM_SEED")
+    return {
+        "tokens_per_second": float(os.environ.get("FAKE_LLM_TOKENS_PER_SECOND", "50")),
+        "ttft_median_ms": float(os.environ.get("FAKE_LLM_TTFT_MS", "300")),
+        "ttft_sigma": float(os.environ.get("FAKE_LLM_TTFT_SIGMA", "0.5")),
+        "reply_words": int(os.environ.get("FAKE_LLM_REPLY_WORDS", "40")),
+        "seed": int(seed) if seed else None,
+    }
+
+def get_openai_chat_model():
+    return os.environ.get("CHAT_OPENAI_MODEL", "gpt-3.5-turbo")
+
+def get_chat_enabled():
+    # Set to false for CRUD-only workers; serve chat from app.chat_app instead
+    return _get_bool("CHAT_ENABLED", True)
+
+def get_chat_eager_init():
+    # Build the LLM client and graph at startup rather than on the first chat turn
+    return _get_bool("CHAT_EAGER_INIT", False)
+
+def get_chat_fast_model():
+    # Model for short clarifying turns; defaults to CHAT_OPENAI_MODEL
+    return os.environ.get("CHAT_FAST_MODEL", get_openai_chat_model())
+
+def get_chat_strong_model():
+    # Model for config generation turns; defaults to CHAT_OPENAI_MODEL
+    return os.environ.get("CHAT_STRONG_MODEL", get_openai_chat_model())
+
+def get_chat_fanout_enabled():
+    # Generate complete apps with a planning call plus one parallel call per object/workflow
+    return _get_bool("CHAT_FANOUT_ENABLED", True)
+
+def get_chat_fanout_max_parts():
+    # Upper bound on parallel object/workflow generation calls per app
+    return int(os.environ.get("CHAT_FANOUT_MAX_PARTS", "12"))
+
+def get_chat_record_retrieval_enabled():
+    # Inject records matching the user's question into user-mode chat turns
+    return _get_bool("CHAT_RECORD_RETRIEVAL_ENABLED", True)
+
+def get_chat_record_top_k():
+    return int(os.environ.get("CHAT_RECORD_TOP_K", "5"))
+
+def get_chat_record_context_tokens():
+    # Approximate token budget for injected records
+    return int(os.environ.get("CHAT_RECORD_CONTEXT_TOKENS", "800"))
+
+def get_chat_record_index_sync_seconds():
+    # How often the chat process picks up records changed in the database
+    return float(os.environ.get("CHAT_RECORD_INDEX_SYNC_SECONDS", "30"))
+
+def get_chat_db_tools_enabled():
+    # Give the chat model read-only database tools (list objects, count/find records, get workflow)
+    return _get_bool("CHAT_DB_TOOLS_ENABLED", True)
+
+def get_chat_tool_max_rounds():
+    # Tool-call rounds allowed per turn before the model must answer
+    return int(os.environ.get("CHAT_TOOL_MAX_ROUNDS", "4"))
+
+def get_chat_tool_cache_ttl_seconds():
+    return float(os.environ.get("CHAT_TOOL_CACHE_TTL_SECONDS", "30"))
+
+def get_chat_tool_cache_max_entries():
+    return int(os.environ.get("CHAT_TOOL_CACHE_MAX_ENTRIES", "64"))
+
+def get_chat_timing_history():
+    # Recent turn timings kept per session for /chat/sessions/{id}/timings
+    return int(os.environ.get("CHAT_TIMING_HISTORY", "20"))
+
+def get_metrics_enabled():
+    # Per-endpoint HTTP metrics middleware and the Prometheus /metrics endpoint
+    return _get_bool("METRICS_ENABLED", True)
+
+def get_debug_enabled():
+    # Debug-only response headers (X-DB-*, Server-Timing)
+    return _get_bool("DEBUG", False)
+
+def get_db_query_stats_enabled():
+    # Per-request SQL statement counts/timing and the slow-query log
+    return _get_bool("DB_QUERY_STATS_ENABLED", True)
+
+def get_db_slow_query_ms():
+    return float(os.environ.get("DB_SLOW_QUERY_MS", "200"))
+
+def get_profiling_secret():
+    # HMAC key for X-Profile signatures; empty disables request profiling
+    return os.environ.get("PROFILING_SECRET", "")
+
+def get_profile_dir():
+    return os.environ.get("PROFILE_DIR", os.path.join(tempfile.gettempdir(), "stream-profiles"))
+
+def get_profile_max_files():
+    return int(os.environ.get("PROFILE_MAX_FILES", "20"))
+
+def get_tracing_enabled():
+    return _get_bool("TRACING_ENABLED", False)
+
+def get_trace_file():
+    # JSON-lines span file, used unless TRACE_COLLECTOR_URL is set
+    return os.environ.get("TRACE_FILE", os.path.join(tempfile.gettempdir(), "stream-traces.jsonl"))
+
+def get_trace_collector_url():
+    return os.environ.get("TRACE_COLLECTOR_URL", "")
+
+def get_trace_sample_rate():
+    # Fraction of new traces recorded; incoming traceparent flags are respected
+    return float(os.environ.get("TRACE_SAMPLE_RATE", "1.0"))
+
+def get_db_auto_migrate():
+    # Apply pending migrations on startup (dev); otherwise startup only warns
+    return _get_bool("DB_AUTO_MIGRATE", False)
+
+def get_migration_lock_timeout_ms():
+    # DDL gives up instead of queueing writes behind it while waiting for a lock
+    return int(os.environ.get("MIGRATION_LOCK_TIMEOUT_MS", "5000"))
@@ -0,0 +1,489 @@
+"""
+Synthetic records for scale testing.
+
+Records are generated from each object's ``fields`` definition. The field
+type picks the generator: the types in seed_field_types.py, with options and
+limits taken from ``field_types`` metadata when it exists. Field names such as
+email, status or city make the values look real. Each object is topped up to
+a target row count. The work is split into chunks, which worker processes
+generate and load in parallel: with COPY on Postgres, batched inserts
+elsewhere.
+
+Each chunk is seeded from --seed, the object id and the chunk number, and
+record ids are reserved before loading starts. A run on the same database
+therefore produces the same rows whatever the number of workers.
+
+    python -m app.utils.datagen --rows 1000000 --workers 8
+    python -m app.utils.datagen --rows 50000 --target WorkOrder=2000000 --app 2
+"""
+import argparse
+import io
+import json
+import multiprocessing
+import os
+import random
+import sys
+import time
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, List, Optional
+
+from sqlalchemy import create_engine, func, select, text
+from sqlalchemy.pool import NullPool
+
+from app.models import Metadata, SchemaObject, SchemaRecord
+
+CHUNK_SIZE = 50_000
+INSERT_BATCH = 1000
+# Share of optional fields left out of a record
+OPTIONAL_MISSING = 0.1
+# Timestamps and dates fall in a fixed window so runs are reproducible
+START = datetime(2022, 1, 1)
+SPAN_SECONDS = 3 * 365 * 24 * 3600
+
+FIRST_NAMES = ["James", "Mary", "Robert", "Patricia", "John", "Jennifer", "Michael", "Linda", "David", "Elizabeth",
+               "William", "Barbara", "Richard", "Susan", "Joseph", "Jessica", "Thomas", "Sarah", "Carlos", "Karen",
+               "Wei", "Priya", "Ahmed", "Yuki", "Olga", "Mateo", "Aisha", "Lars", "Fatima", "Kenji"]
+LAST_NAMES = ["Smith", "Johnson", "Williams", "Brown", "Jones", "Garcia", "Miller", "Davis", "Rodriguez", "Martinez",
+              "Hernandez", "Lopez", "Wilson", "Anderson", "Thomas", "Taylor", "Moore", "Jackson", "Martin", "Lee",
+              "Chen", "Patel", "Khan", "Tanaka", "Ivanova", "Silva", "Okafor", "Nielsen", "Haddad", "Sato"]
+COMPANY_WORDS = ["Acme", "Global", "Summit", "Pioneer", "Northwind", "Blue Ridge", "Apex", "Harbor", "Evergreen",
+                 "Keystone", "Redwood", "Silverline", "Union", "Metro", "Atlas", "Beacon"]
+COMPANY_SUFFIXES = ["Corporation", "Industries", "LLC", "Group", "Holdings", "Partners", "Services", "Inc"]
+CITIES = ["Springfield", "Riverside", "Franklin", "Greenville", "Fairview", "Madison", "Georgetown", "Salem",
+          "Clinton", "Arlington", "Ashland", "Dover", "Oxford", "Burlington", "Manchester", "Milton"]
+STREETS = ["Main St", "Oak Ave", "Maple Dr", "Cedar Ln", "Park Rd", "Pine St", "Elm St", "Lake View Blvd",
+           "Hillcrest Ave", "Washington St", "Industrial Pkwy", "Corporate Ave"]
+WORDS = ["unit", "repair", "inspection", "service", "panel", "system", "customer", "request", "replace", "install",
+         "check", "pressure", "filter", "valve", "leak", "schedule", "update", "safety", "report", "site", "order",
+         "parts", "warranty", "cooling", "heating", "electrical", "network", "upgrade", "maintenance", "quarterly",
+         "annual", "building", "floor", "office", "warehouse", "delivery", "follow", "up", "urgent", "review",
+         "contract", "invoice", "budget", "approval", "team", "training", "equipment", "meter", "reading", "access"]
+DOMAINS = ["example.com", "example.org", "mail.example.net", "corp.example.com"]
+FILE_TYPES = ["pdf", "doc", "docx", "txt", "csv"]
+IMAGE_TYPES = ["jpg", "jpeg", "png", "gif", "webp", "svg"]
+# Options for select fields without any, by field name
+NAMED_OPTIONS = {
+    "status": ["New", "In Progress", "On Hold", "Completed", "Cancelled"],
+    "priority": ["Low", "Medium", "High", "Critical"],
+    "department": ["Engineering", "Sales", "Marketing", "Operations", "Finance", "Support", "HR"],
+    "shift": ["Morning", "Afternoon", "Night"],
+    "tier": ["Bronze", "Silver", "Gold", "Platinum"],
+    "region": ["North", "South", "East", "West", "Central"],
+    "category": ["Hardware", "Software", "Facilities", "Electrical", "Plumbing", "HVAC"],
+    "industry": ["Technology", "Manufacturing", "Healthcare", "Retail", "Finance", "Logistics"],
+    "type": ["Standard", "Premium", "Internal", "External"],
+    "skill": ["HVAC", "Electrical", "Plumbing", "Security Systems", "Networking", "Carpentry"],
+}
+DEFAULT_OPTIONS = ["Option A", "Option B", "Option C", "Option D"]
+# Field types whose names are aliases for a seed_field_types.py type
+TYPE_ALIASES = {"textarea": "text", "float": "number", "decimal": "number", "int": "integer", "bool": "boolean",
+                "timestamp": "datetime", "money": "currency", "enum": "select", "choice": "select",
+                "multi_select": "multiselect", "relation": "reference", "lookup": "reference"}
+
+
+def _pick(rng, items):
+    # Much cheaper than rng.choice, which draws bits until the index fits
+    return items[int(rng.random() * len(items))]
+
+
+def _between(rng, low, high):
+    return low + int(rng.random() * (high - low + 1))
+
+
+def _person(rng):
+    return f"{_pick(rng, FIRST_NAMES)} {_pick(rng, LAST_NAMES)}"
+
+
+def _company(rng):
+    return f"{_pick(rng, COMPANY_WORDS)} {_pick(rng, COMPANY_SUFFIXES)}"
+
+
+def _email(rng, i):
+    return f"{_pick(rng, FIRST_NAMES).lower()}.{_pick(rng, LAST_NAMES).lower()}{i}@{_pick(rng, DOMAINS)}"
+
+
+def _phone(rng, i):
+    return f"+1 ({_between(rng, 200, 989)}) 555-{_between(rng, 0, 9999):04d}"
+
+
+def _words(rng, low, high):
+    return " ".join(rng.choices(WORDS, k=_between(rng, low, high)))
+
+
+def _sentences(rng, count):
+    return " ".join([_words(rng, 6, 16).capitalize() + "." for _ in range(count)])
+
+
+def _timestamp(rng):
+    return START + timedelta(seconds=int(rng.random() * SPAN_SECONDS))
+
+
+def _string_generator(name: str, long: bool = False) -> Callable:
+    """Text generator picked by field name; ``long`` fields default to sentences"""
+    if "email" in name:
+        return _email
+    if "phone" in name or "mobile" in name:
+        return _phone
+    if any(hint in name for hint in ("sku", "serial", "code", "number", "reference_no")):
+        return lambda rng, i: f"{_pick(rng, 'ABCDEFGHJKLMNPRSTUVWXYZ')}{_pick(rng, 'ABCDEFGHJKLMNPRSTUVWXYZ')}-{i:06d}"
+    if any(hint in name for hint in ("customer", "company", "vendor", "supplier", "account")):
+        return lambda rng, i: _company(rng)
+    if any(hint in name for hint in ("name", "technician", "assigned", "manager", "owner", "contact", "dispatcher")):
+        return lambda rng, i: _person(rng)
+    if "address" in name:
+        return lambda rng, i: f"{_between(rng, 1, 9999)} {_pick(rng, STREETS)}, {_pick(rng, CITIES)}"
+    if "city" in name or "location" in name:
+        return lambda rng, i: _pick(rng, CITIES)
+    if long or any(hint in name for hint in ("description", "notes", "comment", "summary", "details")):
+        return lambda rng, i: _sentences(rng, _between(rng, 1, 3))
+    if "title" in name or "subject" in name:
+        return lambda rng, i: _words(rng, 3, 6).capitalize()
+    return lambda rng, i: _words(rng, 1, 4)
+
+
+def _options(name: str, spec: Dict[str, Any], validation: Dict[str, Any]) -> List[Any]:
+    options = spec.get("options") or validation.get("options")
+    if options:
+        return [o["value"] if isinstance(o, dict) and "value" in o else o for o in options]
+    for hint, values in NAMED_OPTIONS.items():
+        if hint in name:
+            return values
+    return DEFAULT_OPTIONS
+
+
+def _skewed_choice(options: List[Any]) -> Callable:
+    # Earlier options are more common (weights 1, 1/2, 1/3, ...), like real status columns
+    weights = []
+    total = 0.0
+    for n in range(len(options)):
+        total += 1 / (n + 1)
+        weights.append(total)
+    return lambda rng, i: rng.choices(options, cum_weights=weights)[0]
+
+
+def field_generator(name: str, spec: Dict[str, Any], validation: Optional[Dict[str, Any]] = None,
+                    reference_ids=None) -> Callable:
+    """Value generator ``(rng, row number) -> value`` for one field of an object"""
+    validation = validation or {}
+    field_type = TYPE_ALIASES.get(spec.get("type", "string"), spec.get("type", "string"))
+    name = name.lower()
+
+    if field_type in ("string", "text"):
+        generate = _string_generator(name, long=field_type == "text" and name in ("text", "body", "content", "message"))
+        max_length = validation.get("max_length")
+        if max_length:
+            return lambda rng, i: generate(rng, i)[:max_length]
+        return generate
+    if field_type in ("number", "currency", "percentage", "integer"):
+        low = validation.get("min")
+        high = validation.get("max")
+        if field_type == "percentage":
+            low, high = low if low is not None else 0, high if high is not None else 100
+        low = low if low is not None else 0
+        if field_type == "integer":
+            high = high if high is not None else 1000
+            return lambda rng, i: _between(rng, low, high)
+        places = validation.get("decimal_places", 2)
+        if high is None:
+            # Long-tailed amounts: most are small, a few are large
+            return lambda rng, i: round(low + rng.lognormvariate(6, 1.2), places)
+        return lambda rng, i: round(rng.uniform(low, high), places)
+    if field_type == "boolean":
+        return lambda rng, i: rng.random() < 0.5
+    if field_type == "date":
+        return lambda rng, i: _timestamp(rng).strftime("%Y-%m-%d")
+    if field_type == "datetime":
+        return lambda rng, i: _timestamp(rng).strftime("%Y-%m-%d %H:%M:%S")
+    if field_type == "email":
+        return _email
+    if field_type == "phone":
+        return _phone
+    if field_type == "url":
+        return lambda rng, i: f"https://www.{_pick(rng, COMPANY_WORDS).lower().replace(' ', '')}.example.com/{_pick(rng, WORDS)}/{i}"
+    if field_type == "select":
+        return _skewed_choice(_options(name, spec, validation))
+    if field_type == "multiselect":
+        options = _options(name, spec, validation)
+        return lambda rng, i: rng.sample(options, rng.randint(1, min(3, len(options))))
+    if field_type == "reference":
+        if not reference_ids:
+            return lambda rng, i: None
+        return lambda rng, i: _pick(rng, reference_ids)
+    if field_type in ("file", "image"):
+        extensions = validation.get("allowed_types") or (IMAGE_TYPES if field_type == "image" else FILE_TYPES)
+        folder = "images" if field_type == "image" else "files"
+        return lambda rng, i: f"/uploads/{folder}/{_pick(rng, WORDS)}_{i}.{_pick(rng, extensions)}"
+    if validation.get("options"):
+        # App-specific choice types from metadata, e.g. "priority"
+        return _skewed_choice(_options(name, spec, validation))
+    return _string_generator(name)
+
+
+def record_generator(fields, validations: Optional[Dict[str, Dict[str, Any]]] = None,
+                     references: Optional[Dict[str, Any]] = None) -> Callable:
+    """Generator ``(rng, row number) -> data dict`` for an object's ``fields`` definition"""
+    if isinstance(fields, list):
+        fields = {f["name"]: f for f in fields if isinstance(f, dict) and "name" in f}
+    validations = validations or {}
+    references = references or {}
+    columns = []
+    for name, spec in (fields or {}).items():
+        if not isinstance(spec, dict):
+            spec = {"type": spec}
+        field_type = spec.get("type", "string")
+        generate = field_generator(name, spec, validations.get(field_type), references.get(name))
+        columns.append((name, generate, bool(spec.get("required"))))
+
+    def generate_record(rng, i):
+        data = {}
+        for name, generate, required in columns:
+            if not required and rng.random() < OPTIONAL_MISSING:
+                continue
+            data[name] = generate(rng, i)
+        return data
+
+    return generate_record
+
+
+def generate_rows(job: Dict[str, Any]):
+    """Rows (id, object_id, data, created_at, updated_at) of one chunk"""
+    rng = random.Random(f"{job['seed']}:{job['object_id']}:{job['chunk']}")
+    make_record = record_generator(job["fields"], job["validations"], job["references"])
+    for offset in range(job["count"]):
+        record_id = job["first_id"] + offset
+        created = _timestamp(rng)
+        updated = created + timedelta(seconds=rng.randrange(30 * 24 * 3600)) if rng.random() < 0.4 else created
+        yield record_id, job["object_id"], make_record(rng, record_id), created, updated
+
+
+def _copy_buffer(rows) -> io.StringIO:
+    lines = []
+    for record_id, object_id, data, created, updated in rows:
+        # json.dumps escapes control characters; only backslashes need escaping for COPY text format
+        payload = json.dumps(data, separators=(",", ":")).replace("\\", "\\\\")
+        lines.append(f"{record_id}\t{object_id}\t{payload}\t{created.isoformat(' ')}\t{updated.isoformat(' ')}\n")
+    return io.StringIO("".join(lines))
+
+
+_engines: Dict[str, Any] = {}
+
+
+def _worker_engine(url: str):
+    # One engine per process; forked workers must not share the parent's connections
+    key = f"{os.getpid()}:{url}"
+    if key not in _engines:
+        _engines[key] = create_engine(url, poolclass=NullPool)
+    return _engines[key]
+
+
+def load_chunk(job: Dict[str, Any]) -> int:
+    """Generate and load one chunk; returns the number of rows written"""
+    engine = _worker_engine(job["url"])
+    rows = generate_rows(job)
+    copy_sql = "COPY records (id, object_id, data, created_at, updated_at) FROM STDIN"
+    if engine.dialect.name == "postgresql" and engine.dialect.driver in ("psycopg2", "psycopg"):
+        buffer = _copy_buffer(rows)
+        raw = engine.raw_connection()
+        try:
+            cursor = raw.cursor()
+            if engine.dialect.driver == "psycopg2":
+                cursor.copy_expert(copy_sql, buffer)
+            else:
+                with cursor.copy(copy_sql) as copy:
+                    copy.write(buffer.getvalue())
+            raw.commit()
+        finally:
+            raw.close()
+    else:
+        table = SchemaRecord.__table__
+        batch = []
+        with engine.begin() as conn:
+            for record_id, object_id, data, created, updated in rows:
+                batch.append({"id": record_id, "object_id": object_id, "data": data,
+                              "created_at": created, "updated_at": updated})
+                if len(batch) == INSERT_BATCH:
+                    conn.execute(table.insert(), batch)
+                    batch = []
+            if batch:
+                conn.execute(table.insert(), batch)
+    return job["count"]
+
+
+def load_validations(session, app_id: Optional[int]) -> Dict[str, Dict[str, Any]]:
+    """Validation settings per field type from ``field_types`` metadata; app-specific rows win"""
+    rows = session.query(Metadata).filter(Metadata.key == "field_types").all()
+    validations = {}
+    for row in sorted(rows, key=lambda r: r.app_id is not None):
+        if row.app_id is not None and row.app_id != app_id:
+            continue
+        value = row.value or {}
+        types = value.get("field_types", value).get("types", []) if isinstance(value, dict) else []
+        for field_type in types:
+            if isinstance(field_type, dict) and "value" in field_type:
+                validations[field_type["value"]] = field_type.get("validation") or {}
+    return validations
+
+
+def reserve_ids(conn, count: int) -> int:
+    """First of ``count`` consecutive record ids nobody else will be given"""
+    if conn.dialect.name == "postgresql":
+        # Move the sequence past the block first so the app's own inserts skip it
+        sequence = conn.execute(text("SELECT pg_get_serial_sequence('records', 'id')")).scalar()
+        last = conn.execute(text(
+            f"SELECT setval('{sequence}', GREATEST((SELECT COALESCE(MAX(id), 0) FROM records), "
+            f"(SELECT last_value FROM {sequence})) + :count)"), {"count": count}).scalar()
+        return last - count + 1
+    return (conn.execute(select(func.max(SchemaRecord.id))).scalar() or 0) + 1
+
+
+def _reference_target(spec: Dict[str, Any], objects: List[SchemaObject], app_id: Optional[int]):
+    target = spec.get("referenced_object") or spec.get("object") or spec.get("reference")
+    if target is None:
+        return None
+    for obj in sorted(objects, key=lambda o: o.app_id != app_id):
+        if obj.id == target or obj.name == target or str(obj.id) == str(target):
+            return obj
+    return None
+
+
+def plan(session, url: str, rows: int, targets: Optional[Dict[str, int]] = None, app_id: Optional[int] = None,
+         object_ids: Optional[List[int]] = None, chunk_size: int = CHUNK_SIZE, seed: int = 42):
+    """Chunk jobs topping every selected object up to its target count; reserves their record ids"""
+    targets = targets or {}
+    all_objects = session.query(SchemaObject).order_by(SchemaObject.id).all()
+    selected = [o for o in all_objects
+                if (app_id is None or o.app_id == app_id) and (not object_ids or o.id in object_ids)]
+    counts = dict(session.query(SchemaRecord.object_id, func.count(SchemaRecord.id))
+                  .group_by(SchemaRecord.object_id).all())
+
+    wanted = {}
+    for obj in selected:
+        target = targets.get(str(obj.id), targets.get(obj.name, rows))
+        missing = target - counts.get(obj.id, 0)
+        if missing > 0:
+            wanted[obj.id] = missing
+    total = sum(wanted.values())
+    if total == 0:
+        return []
+
+    first_id = reserve_ids(session.connection(), total)
+    session.commit()
+    ranges = {}
+    for obj in selected:
+        if obj.id in wanted:
+            ranges[obj.id] = range(first_id, first_id + wanted[obj.id])
+            first_id += wanted[obj.id]
+
+    jobs = []
+    for obj in selected:
+        if obj.id not in wanted:
+            continue
+        fields = obj.fields or {}
+        items = fields.items() if isinstance(fields, dict) else [(f.get("name"), f) for f in fields if isinstance(f, dict)]
+        references = {}
+        for name, spec in items:
+            if not isinstance(spec, dict) or TYPE_ALIASES.get(spec.get("type"), spec.get("type")) != "reference":
+                continue
+            target = _reference_target(spec, all_objects, obj.app_id)
+            if target is None:
+                continue
+            if target.id in ranges:
+                references[name] = ranges[target.id]
+            else:
+                references[name] = [row[0] for row in session.query(SchemaRecord.id)
+                                    .filter(SchemaRecord.object_id == target.id).limit(10_000)]
+        validations = load_validations(session, obj.app_id)
+        block = ranges[obj.id]
+        for chunk, start in enumerate(range(0, len(block), chunk_size)):
+            jobs.append({
+                "url": url, "object_id": obj.id, "fields": fields, "validations": validations,
+                "references": references, "seed": seed, "chunk": chunk,
+                "first_id": block[start], "count": min(chunk_size, len(block) - start),
+            })
+    return jobs
+
+
+def run(jobs: List[Dict[str, Any]], workers: int = 1, progress: Optional[Callable[[int, int], None]] = None) -> int:
+    """Load the jobs, in ``workers`` processes when more than one; returns rows written"""
+    total = sum(job["count"] for job in jobs)
+    done = 0
+    if workers <= 1 or len(jobs) <= 1:
+        for job in jobs:
+            done += load_chunk(job)
+            if progress:
+                progress(done, total)
+        return done
+    with multiprocessing.Pool(workers) as pool:
+        for count in pool.imap_unordered(load_chunk, jobs):
+            done += count
+            if progress:
+                progress(done, total)
+    return done
+
+
+def generate(url: str, rows: int, targets: Optional[Dict[str, int]] = None, app_id: Optional[int] = None,
+             object_ids: Optional[List[int]] = None, workers: int = 1, chunk_size: int = CHUNK_SIZE,
+             seed: int = 42, progress: Optional[Callable[[int, int], None]] = None) -> Dict[int, range]:
+    """Top objects up to their target record counts; returns the new record ids per object id"""
+    from sqlalchemy.orm import Session
+
+    engine = create_engine(url, poolclass=NullPool)
+    with Session(engine) as session:
+        jobs = plan(session, url, rows, targets, app_id, object_ids, chunk_size, seed)
+    run(jobs, workers, progress)
+    if jobs and engine.dialect.name == "postgresql":
+        # Fresh planner statistics after a bulk load
+        with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+            conn.execute(text("ANALYZE records"))
+    engine.dispose()
+
+    added: Dict[int, range] = {}
+    for job in jobs:
+        first = added[job["object_id"]].start if job["object_id"] in added else job["first_id"]
+        added[job["object_id"]] = range(first, job["first_id"] + job["count"])
+    return added
+
+
+def _parse_targets(values: List[str]) -> Dict[str, int]:
+    targets = {}
+    for value in values:
+        key, _, count = value.rpartition("=")
+        if not key or not count.isdigit():
+            raise argparse.ArgumentTypeError(f"--target expects OBJECT=COUNT, got {value!r}")
+        targets[key] = int(count)
+    return targets
+
+
+if __name__ == "__main__":
+    from app.database import DATABASE_URL
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--database-url", default=DATABASE_URL)
+    parser.add_argument("--rows", type=int, default=10_000, help="target record count per object")
+    parser.add_argument("--target", action="append", default=[], metavar="OBJECT=COUNT",
+                        help="target count for one object, by id or name (repeatable)")
+    parser.add_argument("--app", type=int, help="only objects of this app")
+    parser.add_argument("--objects", help="only these comma-separated object ids")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--chunk-size", type=int, default=CHUNK_SIZE)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+    try:
+        parsed_targets = _parse_targets(args.target)
+    except argparse.ArgumentTypeError as e:
+        parser.error(str(e))
+
+    started = time.perf_counter()
+
+    def report(done, total):
+        rate = done / max(time.perf_counter() - started, 1e-9)
+        print(f"\r{done:,}/{total:,} records ({rate:,.0f}/s)", end="", file=sys.stderr)
+
+    result = generate(args.database_url, args.rows, parsed_targets, args.app,
+                      [int(i) for i in args.objects.split(",")] if args.objects else None,
+                      args.workers, args.chunk_size, args.seed, report)
+    print(file=sys.stderr)
+    for object_id, ids in result.items():
+        print(f"object {object_id}: {len(ids):,} records (ids {ids.start}-{ids.stop - 1})")
+    if not result:
+        print("Every selected object already has its target record count")
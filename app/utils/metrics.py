@@ -0,0 +1,220 @@
+"""
+Minimal in-process metrics: labelled counters, gauges and histograms kept in
+a process-wide registry. Cheap enough to update on the hot path, and
+rendered in the Prometheus text format by render_prometheus().
+"""
+import bisect
+import threading
+from typing import Dict, Iterable, Optional, Sequence, Tuple
+
+# Latency buckets in seconds
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+
+class Metric:
+    kind = "untyped"
+
+    def __init__(self, name: str, description: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.description = description
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, object]) -> Tuple[str, ...]:
+        return tuple([str(labels.get(name, "")) for name in self.labelnames])
+
+    def _labels(self, key: Tuple[str, ...]) -> Dict[str, str]:
+        return dict(zip(self.labelnames, key))
+
+
+class Counter(Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, description: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, description, labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, amount: float = 1, **labels):
+        self.inc_values(self._key(labels), amount)
+
+    def inc_values(self, key: Tuple[str, ...], amount: float = 1):
+        """Hot-path variant of inc() taking label values in labelnames order"""
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels) -> float:
+        return self._values.get(self._key(labels), 0)
+
+    def snapshot(self):
+        return [{"labels": self._labels(key), "value": value} for key, value in list(self._values.items())]
+
+
+class Gauge(Metric):
+    kind = "gauge"
+
+    def __init__(self, name: str, description: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, description, labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, amount: float = 1, **labels):
+        self.inc_values(self._key(labels), amount)
+
+    def inc_values(self, key: Tuple[str, ...], amount: float = 1):
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def dec(self, amount: float = 1, **labels):
+        self.inc(-amount, **labels)
+
+    def set(self, value: float, **labels):
+        with self._lock:
+            self._values[self._key(labels)] = value
+
+    def value(self, **labels) -> float:
+        return self._values.get(self._key(labels), 0)
+
+    def snapshot(self):
+        return [{"labels": self._labels(key), "value": value} for key, value in list(self._values.items())]
+
+
+class _HistogramValue:
+    __slots__ = ("bucket_counts", "count", "sum")
+
+    def __init__(self, size: int):
+        self.bucket_counts = [0] * size
+        self.count = 0
+        self.sum = 0.0
+
+
+class Histogram(Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, description: str, labelnames: Sequence[str] = (),
+                 buckets: Iterable[float] = DEFAULT_BUCKETS):
+        super().__init__(name, description, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self._values: Dict[Tuple[str, ...], _HistogramValue] = {}
+
+    def observe(self, value: float, **labels):
+        self.observe_values(self._key(labels), value)
+
+    def observe_values(self, key: Tuple[str, ...], value: float):
+        """Hot-path variant of observe() taking label values in labelnames order"""
+        # Index of the first bucket whose upper bound is >= value (len = +Inf bucket)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            entry = self._values.get(key)
+            if entry is None:
+                entry = self._values[key] = _HistogramValue(len(self.buckets) + 1)
+            entry.bucket_counts[index] += 1
+            entry.count += 1
+            entry.sum += value
+
+    def quantile(self, q: float, **labels) -> Optional[float]:
+        """Estimate a quantile from the buckets (upper bound of the bucket it falls in)"""
+        entry = self._values.get(self._key(labels))
+        if entry is None or entry.count == 0:
+            return None
+        return self._quantile(entry, q)
+
+    def _quantile(self, entry: _HistogramValue, q: float) -> Optional[float]:
+        rank = q * entry.count
+        seen = 0
+        for bound, count in zip(self.buckets, entry.bucket_counts):
+            seen += count
+            if seen >= rank:
+                return bound
+        # Like Prometheus, report the highest finite bound for the +Inf bucket
+        return self.buckets[-1]
+
+    def snapshot(self):
+        result = []
+        for key, entry in list(self._values.items()):
+            result.append({
+                "labels": self._labels(key),
+                "count": entry.count,
+                "sum": round(entry.sum, 6),
+                "p50": self._quantile(entry, 0.5),
+                "p99": self._quantile(entry, 0.99),
+            })
+        return result
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self._metrics: Dict[str, Metric] = {}
+        self._lock = threading.Lock()
+
+    def _get_or_create(self, cls, name, description, **kwargs):
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = self._metrics[name] = cls(name, description, **kwargs)
+            return metric
+
+    def counter(self, name: str, description: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self._get_or_create(Counter, name, description, labelnames=labelnames)
+
+    def gauge(self, name: str, description: str, labelnames: Sequence[str] = ()) -> Gauge:
+        return self._get_or_create(Gauge, name, description, labelnames=labelnames)
+
+    def histogram(self, name: str, description: str, labelnames: Sequence[str] = (),
+                  buckets: Iterable[float] = DEFAULT_BUCKETS) -> Histogram:
+        return self._get_or_create(Histogram, name, description, labelnames=labelnames, buckets=buckets)
+
+    def metrics(self):
+        return list(self._metrics.values())
+
+    def snapshot(self, prefix: str = ""):
+        return {
+            metric.name: metric.snapshot()
+            for metric in self.metrics()
+            if metric.name.startswith(prefix)
+        }
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: Optional[Tuple[str, str]] = None) -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra is not None:
+        pairs.append(f'{extra[0]}="{extra[1]}"')
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return repr(value)
+
+
+def render_prometheus(registry: "MetricsRegistry") -> str:
+    """Render every metric in the Prometheus text exposition format (0.0.4)"""
+    lines = []
+    for metric in registry.metrics():
+        lines.append(f"# HELP {metric.name} {_escape(metric.description)}")
+        lines.append(f"# TYPE {metric.name} {metric.kind}")
+        with metric._lock:
+            items = list(metric._values.items())
+        if isinstance(metric, Histogram):
+            for key, entry in items:
+                cumulative = 0
+                for bound, count in zip(metric.buckets + (float("inf"),), entry.bucket_counts):
+                    cumulative += count
+                    labels = _format_labels(metric.labelnames, key, ("le", _format_value(float(bound))))
+                    lines.append(f"{metric.name}_bucket{labels} {cumulative}")
+                labels = _format_labels(metric.labelnames, key)
+                lines.append(f"{metric.name}_sum{labels} {_format_value(entry.sum)}")
+                lines.append(f"{metric.name}_count{labels} {entry.count}")
+        else:
+            for key, value in items:
+                lines.append(f"{metric.name}{_format_labels(metric.labelnames, key)} {_format_value(value)}")
+    return "\n".join(lines) + "\n"
+
+
+# Process-wide registry
+registry = MetricsRegistry()
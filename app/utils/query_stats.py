@@ -0,0 +1,126 @@
+"""
+Per-request SQL statement statistics.
+
+instrument_engine() hooks SQLAlchemy's cursor events to time every
+statement. When a QueryStats is active in the current context (the
+QueryStatsMiddleware starts one per HTTP request), its statement count, total
+DB time and slowest statement are updated. Statements slower than
+DB_SLOW_QUERY_MS are logged with the shape of their bound parameters (types
+and sizes, never values). Inside a traced request each statement is also
+recorded as a "db.statement" span.
+"""
+import contextvars
+import logging
+import time
+from typing import Any, Optional
+
+from sqlalchemy import event
+
+from app.utils import config, metrics, tracing
+
+logger = logging.getLogger(__name__)
+
+# Longest statement text kept for the slowest statement and the slow-query log
+MAX_STATEMENT_CHARS = 500
+
+statement_seconds = metrics.registry.histogram(
+    "db_statement_seconds", "SQL statement execution time")
+slow_statements_total = metrics.registry.counter(
+    "db_slow_statements_total", "SQL statements slower than DB_SLOW_QUERY_MS")
+
+
+class QueryStats:
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.slowest = 0.0
+        self.slowest_statement: Optional[str] = None
+
+    def add(self, statement: str, elapsed: float):
+        self.count += 1
+        self.total += elapsed
+        if elapsed > self.slowest:
+            self.slowest = elapsed
+            self.slowest_statement = statement
+
+    def to_dict(self):
+        return {
+            "count": self.count,
+            "total_ms": round(self.total * 1000, 2),
+            "slowest_ms": round(self.slowest * 1000, 2),
+            "slowest_statement": _truncate(self.slowest_statement),
+        }
+
+
+# Set by instrument_engine() from DB_SLOW_QUERY_MS
+_slow_query_seconds = float("inf")
+
+_current: contextvars.ContextVar[Optional[QueryStats]] = contextvars.ContextVar("query_stats", default=None)
+
+
+def start() -> contextvars.Token:
+    """Start collecting into a fresh QueryStats for the current context"""
+    return _current.set(QueryStats())
+
+
+def stop(token: contextvars.Token):
+    _current.reset(token)
+
+
+def current() -> Optional[QueryStats]:
+    return _current.get()
+
+
+def _truncate(statement: Optional[str]) -> Optional[str]:
+    if statement is None or len(statement) <= MAX_STATEMENT_CHARS:
+        return statement
+    return statement[:MAX_STATEMENT_CHARS] + "..."
+
+
+def _value_shape(value: Any) -> str:
+    if value is None:
+        return "NULL"
+    name = type(value).__name__
+    if isinstance(value, (str, bytes, list, tuple, dict)):
+        return f"{name}({len(value)})"
+    return name
+
+
+def parameter_shape(parameters: Any, executemany: bool = False) -> Any:
+    """Types and sizes of bound parameters, without their values"""
+    if executemany and isinstance(parameters, (list, tuple)) and parameters:
+        return {"rows": len(parameters), "row": parameter_shape(parameters[0])}
+    if isinstance(parameters, dict):
+        return {key: _value_shape(value) for key, value in parameters.items()}
+    if isinstance(parameters, (list, tuple)):
+        return [_value_shape(value) for value in parameters]
+    return _value_shape(parameters)
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    context._query_started = time.perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    started = getattr(context, "_query_started", None)
+    if started is None:
+        return
+    elapsed = time.perf_counter() - started
+    statement_seconds.observe_values((), elapsed)
+    stats = _current.get()
+    if stats is not None:
+        stats.add(statement, elapsed)
+    tracing.record_span("db.statement", elapsed, statement=_truncate(statement))
+    if elapsed >= _slow_query_seconds:
+        slow_statements_total.inc_values(())
+        logger.warning("Slow query (%.1f ms): %s params=%s", elapsed * 1000, _truncate(statement),
+                       parameter_shape(parameters, executemany))
+
+
+def instrument_engine(engine):
+    """Time every statement run on ``engine``; safe to call more than once"""
+    global _slow_query_seconds
+    _slow_query_seconds = config.get_db_slow_query_ms() / 1000
+    if not event.contains(engine, "before_cursor_execute", _before_cursor_execute):
+        event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+        event.listen(engine, "after_cursor_execute", _after_cursor_execute)
@@ -0,0 +1,314 @@
+"""
+Lightweight tracing spans with W3C trace context.
+
+    with tracing.span("chat.prompt", route=route) as s:
+        ...
+        s.set_attribute("records", 3)
+
+The current span lives in a contextvar, so spans opened inside it, including
+in tasks and to_thread calls started from it, become its children. An
+incoming ``traceparent`` header (00-<trace id>-<span id>-<flags>) continues
+the caller's trace. Finished spans of sampled traces are handed to a
+background thread, which batches them to the configured exporter:
+
+* FileExporter - JSON lines in TRACE_FILE
+* CollectorExporter - JSON batches POSTed to TRACE_COLLECTOR_URL
+
+When tracing is off (the default), span() returns a shared no-op span.
+``python -m app.utils.tracing <file> [trace_id]`` prints a trace from a span
+file as an indented timeline.
+"""
+import asyncio
+import contextvars
+import json
+import logging
+import os
+import queue
+import random
+import re
+import sys
+import threading
+import time
+import urllib.request
+from contextlib import contextmanager
+from typing import Any, Dict, Iterable, List, Optional
+
+from app.utils import config, metrics
+
+logger = logging.getLogger(__name__)
+
+_TRACEPARENT = re.compile(r"^00-([0-9a-f]{32})-([0-9a-f]{16})-([0-9a-f]{2})$")
+
+spans_dropped_total = metrics.registry.counter(
+    "trace_spans_dropped_total", "Finished spans dropped because the export queue was full")
+
+
+def _random_hex(bits: int) -> str:
+    return f"{random.getrandbits(bits):0{bits // 4}x}"
+
+
+class Span:
+    __slots__ = ("name", "trace_id", "span_id", "parent_id", "sampled", "start_time", "_start",
+                 "duration", "attributes", "status")
+
+    def __init__(self, name: str, trace_id: str, parent_id: Optional[str], sampled: bool,
+                 attributes: Optional[Dict[str, Any]] = None):
+        self.name = name
+        self.trace_id = trace_id
+        self.span_id = _random_hex(64)
+        self.parent_id = parent_id
+        self.sampled = sampled
+        self.start_time = time.time()
+        self._start = time.perf_counter()
+        self.duration: Optional[float] = None
+        self.attributes = attributes or {}
+        self.status = "ok"
+
+    @property
+    def traceparent(self) -> str:
+        return f"00-{self.trace_id}-{self.span_id}-{'01' if self.sampled else '00'}"
+
+    def set_attribute(self, key: str, value: Any):
+        self.attributes[key] = value
+
+    def set_error(self, error: BaseException):
+        self.status = "error"
+        self.attributes["error"] = repr(error)
+
+    def end(self, duration: Optional[float] = None):
+        """Finish the span (once) and queue it for export"""
+        if self.duration is not None:
+            return
+        self.duration = duration if duration is not None else time.perf_counter() - self._start
+        if self.sampled and _tracer is not None:
+            _tracer.submit(self)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "name": self.name,
+            "start": self.start_time,
+            "duration_ms": round((self.duration or 0) * 1000, 3),
+            "status": self.status,
+            "attributes": self.attributes,
+        }
+
+
+class _NoopSpan:
+    """Returned while tracing is disabled; every method does nothing"""
+    trace_id = span_id = parent_id = None
+    sampled = False
+    traceparent = None
+
+    def set_attribute(self, key, value):
+        pass
+
+    def set_error(self, error):
+        pass
+
+    def end(self, duration=None):
+        pass
+
+
+NOOP_SPAN = _NoopSpan()
+
+
+class FileExporter:
+    def __init__(self, path: str):
+        self.path = path
+
+    def export(self, spans: List[Dict[str, Any]]):
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with open(self.path, "a") as f:
+            for item in spans:
+                f.write(json.dumps(item, default=str) + "\n")
+
+
+class CollectorExporter:
+    def __init__(self, url: str, timeout: float = 5.0):
+        self.url = url
+        self.timeout = timeout
+
+    def export(self, spans: List[Dict[str, Any]]):
+        body = json.dumps({"spans": spans}, default=str).encode()
+        request = urllib.request.Request(self.url, data=body, headers={"Content-Type": "application/json"})
+        with urllib.request.urlopen(request, timeout=self.timeout):
+            pass
+
+
+class Tracer:
+    """Samples new traces and exports finished spans in batches from a daemon thread"""
+
+    def __init__(self, exporter, sample_rate: float = 1.0, max_queue: int = 2048,
+                 batch_size: int = 256, flush_interval: float = 1.0):
+        self.exporter = exporter
+        self.sample_rate = sample_rate
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._queue: "queue.Queue[Span]" = queue.Queue(maxsize=max_queue)
+        self._thread = threading.Thread(target=self._run, name="trace-exporter", daemon=True)
+        self._thread.start()
+
+    def submit(self, span: Span):
+        try:
+            self._queue.put_nowait(span)
+        except queue.Full:
+            spans_dropped_total.inc()
+
+    def _run(self):
+        while True:
+            try:
+                batch = [self._queue.get(timeout=self.flush_interval)]
+            except queue.Empty:
+                continue
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            try:
+                self.exporter.export([item.to_dict() for item in batch])
+            except Exception as e:
+                logger.warning("Exporting %d spans failed: %s", len(batch), e)
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+
+    def flush(self):
+        """Wait until every span queued so far has been exported (tests and shutdown)"""
+        self._queue.join()
+
+
+_tracer: Optional[Tracer] = None
+_configured = False
+_current: contextvars.ContextVar[Optional[Span]] = contextvars.ContextVar("current_span", default=None)
+
+
+def configure(exporter=None, sample_rate: Optional[float] = None) -> Optional[Tracer]:
+    """Set up tracing from the arguments, or from TRACING_* settings when none are given"""
+    global _tracer, _configured
+    _configured = True
+    if exporter is None:
+        if not config.get_tracing_enabled():
+            _tracer = None
+            return None
+        url = config.get_trace_collector_url()
+        exporter = CollectorExporter(url) if url else FileExporter(config.get_trace_file())
+    if sample_rate is None:
+        sample_rate = config.get_trace_sample_rate()
+    _tracer = Tracer(exporter, sample_rate)
+    return _tracer
+
+
+def get_tracer() -> Optional[Tracer]:
+    if not _configured:
+        configure()
+    return _tracer
+
+
+def parse_traceparent(value: Optional[str]):
+    """(trace_id, parent span id, sampled) from a traceparent header, or None if invalid"""
+    match = _TRACEPARENT.match((value or "").strip().lower())
+    if match is None or match.group(1) == "0" * 32 or match.group(2) == "0" * 16:
+        return None
+    return match.group(1), match.group(2), int(match.group(3), 16) & 1 == 1
+
+
+def current_span() -> Optional[Span]:
+    return _current.get()
+
+
+def start_span(name: str, traceparent: Optional[str] = None, **attributes):
+    """Create a span under ``traceparent`` or the current span, without making it current"""
+    tracer = get_tracer()
+    if tracer is None:
+        return NOOP_SPAN
+    parent = _current.get()
+    remote = parse_traceparent(traceparent) if traceparent else None
+    if remote is not None:
+        trace_id, parent_id, sampled = remote
+    elif parent is not None:
+        trace_id, parent_id, sampled = parent.trace_id, parent.span_id, parent.sampled
+    else:
+        trace_id, parent_id, sampled = _random_hex(128), None, random.random() < tracer.sample_rate
+    return Span(name, trace_id, parent_id, sampled, attributes)
+
+
+@contextmanager
+def span(name: str, traceparent: Optional[str] = None, **attributes):
+    """Run the block in a new current span; exceptions mark it as failed"""
+    current = start_span(name, traceparent, **attributes)
+    if current is NOOP_SPAN:
+        yield current
+        return
+    token = _current.set(current)
+    try:
+        yield current
+    except (GeneratorExit, asyncio.CancelledError):
+        current.status = "cancelled"
+        raise
+    except BaseException as e:
+        current.set_error(e)
+        raise
+    finally:
+        try:
+            _current.reset(token)
+        except ValueError:
+            # Async generators can be closed from another context than the one they started in
+            _current.set(None)
+        current.end()
+
+
+def record_span(name: str, duration: float, **attributes):
+    """Record an already-timed child of the current span (e.g. a DB statement)"""
+    parent = _current.get()
+    if parent is None or not parent.sampled or _tracer is None:
+        return
+    child = Span(name, parent.trace_id, parent.span_id, True, attributes)
+    child.start_time -= duration
+    child.end(duration)
+
+
+def format_trace(spans: Iterable[Dict[str, Any]]) -> str:
+    """Indented timeline of one trace's spans: offset, duration, name, attributes"""
+    spans = sorted(spans, key=lambda s: s["start"])
+    if not spans:
+        return ""
+    origin = spans[0]["start"]
+    children: Dict[Optional[str], List[Dict[str, Any]]] = {}
+    ids = {s["span_id"] for s in spans}
+    for s in spans:
+        parent = s["parent_id"] if s["parent_id"] in ids else None
+        children.setdefault(parent, []).append(s)
+
+    lines = []
+
+    def walk(parent_id, depth):
+        for s in children.get(parent_id, []):
+            offset = (s["start"] - origin) * 1000
+            flag = " !" if s["status"] == "error" else ""
+            attrs = " ".join(f"{k}={v}" for k, v in s["attributes"].items())
+            lines.append(f"{offset:9.1f}ms {s['duration_ms']:9.1f}ms {'  ' * depth}{s['name']}{flag} {attrs}".rstrip())
+            walk(s["span_id"], depth + 1)
+
+    walk(None, 0)
+    return "\n".join(lines)
+
+
+if __name__ == "__main__":
+    # python -m app.utils.tracing <span file> [trace_id]; defaults to the slowest root span's trace
+    if len(sys.argv) < 2:
+        sys.exit("usage: python -m app.utils.tracing <span file> [trace_id]")
+    with open(sys.argv[1]) as f:
+        all_spans = [json.loads(line) for line in f if line.strip()]
+    if len(sys.argv) > 2:
+        trace_id = sys.argv[2]
+    else:
+        roots = [s for s in all_spans if s["parent_id"] is None] or all_spans
+        trace_id = max(roots, key=lambda s: s["duration_ms"])["trace_id"]
+    print(f"trace {trace_id}")
+    print(format_trace(s for s in all_spans if s["trace_id"] == trace_id))
@@ -1,95 +1,112 @@
 #!/usr/bin/env python3
 """
-Script to assign sample users to apps for testing
+Script to assign sample users to apps for testing.
+
+Runs as a chunked, resumable backfill over users (app/migrations/backfill.py):
+each chunk of users gets its assignments in its own transaction, skipping
+any that already exist, so the script can be re-run or resumed safely.
 """
+import argparse
+import logging
 import sys
 import os
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
-from app.database import SessionLocal
+from sqlalchemy import select, tuple_
+from app.database import engine
+from app.migrations.backfill import Backfill, add_arguments
 from app.models import User, AppUser, SchemaApp, UserRole
 
-def assign_users_to_apps():
+# Assign users to apps with different roles
+ASSIGNMENTS = [
+    # User 1 (John Smith) - Admin on app 1, User on app 2
+    {"user_id": 1, "app_id": 1, "role": "admin"},
+    {"user_id": 1, "app_id": 2, "role": "user"},
+
+    # User 2 (Sarah Johnson) - User on app 1, Viewer on app 3
+    {"user_id": 2, "app_id": 1, "role": "user"},
+    {"user_id": 2, "app_id": 3, "role": "viewer"},
+
+    # User 3 (Michael Chen) - Admin on app 2, User on app 1
+    {"user_id": 3, "app_id": 2, "role": "admin"},
+    {"user_id": 3, "app_id": 1, "role": "user"},
+
+    # User 4 (Emily Davis) - User on app 2, Viewer on app 1
+    {"user_id": 4, "app_id": 2, "role": "user"},
+    {"user_id": 4, "app_id": 1, "role": "viewer"},
+
+    # User 5 (David Wilson) - Admin on app 3
+    {"user_id": 5, "app_id": 3, "role": "admin"},
+
+    # User 6 (Lisa Brown) - User on app 3
+    {"user_id": 6, "app_id": 3, "role": "user"},
+
+    # User 7 (Robert Taylor) - Viewer on app 2
+    {"user_id": 7, "app_id": 2, "role": "viewer"},
+
+    # User 8 (Jennifer Garcia) - User on app 1
+    {"user_id": 8, "app_id": 1, "role": "user"},
+]
+
+def assign_users_to_apps(chunk_size=1000, rows_per_second=None, restart=False):
     """Assign sample users to apps"""
-    db = SessionLocal()
-    
-    try:
-        # Get all users and apps
-        users = db.query(User).all()
-        apps = db.query(SchemaApp).all()
-        
-        if not users:
-            print("No users found. Please run seed_users.py first.")
-            return
-            
-        if not apps:
-            print("No apps found. Please create some apps first.")
-            return
-        
-        # Assign users to apps with different roles
-        assignments = [
-            # User 1 (John Smith) - Admin on app 1, User on app 2
-            {"user_id": 1, "app_id": 1, "role": "admin"},
-            {"user_id": 1, "app_id": 2, "role": "user"},
-            
-            # User 2 (Sarah Johnson) - User on app 1, Viewer on app 3
-            {"user_id": 2, "app_id": 1, "role": "user"},
-            {"user_id": 2, "app_id": 3, "role": "viewer"},
-            
-            # User 3 (Michael Chen) - Admin on app 2, User on app 1
-            {"user_id": 3, "app_id": 2, "role": "admin"},
-            {"user_id": 3, "app_id": 1, "role": "user"},
-            
-            # User 4 (Emily Davis) - User on app 2, Viewer on app 1
-            {"user_id": 4, "app_id": 2, "role": "user"},
-            {"user_id": 4, "app_id": 1, "role": "viewer"},
-            
-            # User 5 (David Wilson) - Admin on app 3
-            {"user_id": 5, "app_id": 3, "role": "admin"},
-            
-            # User 6 (Lisa Brown) - User on app 3
-            {"user_id": 6, "app_id": 3, "role": "user"},
-            
-            # User 7 (Robert Taylor) - Viewer on app 2
-            {"user_id": 7, "app_id": 2, "role": "viewer"},
-            
-            # User 8 (Jennifer Garcia) - User on app 1
-            {"user_id": 8, "app_id": 1, "role": "user"},
+    with engine.connect() as conn:
+        has_users = conn.execute(select(User.id).limit(1)).first() is not None
+        app_ids = set(conn.execute(select(SchemaApp.id)).scalars())
+
+    if not has_users:
+        print("No users found. Please run seed_users.py first.")
+        return
+
+    if not app_ids:
+        print("No apps found. Please create some apps first.")
+        return
+
+    app_users = AppUser.__table__
+
+    def assign(conn, first, last):
+        # Assignments for the users in this chunk that exist and are not assigned yet
+        user_ids = set(conn.execute(select(User.id).where(User.id.between(first, last))).scalars())
+        wanted = [a for a in ASSIGNMENTS if a["user_id"] in user_ids and a["app_id"] in app_ids]
+        if not wanted:
+            return 0
+        existing = set(conn.execute(
+            select(app_users.c.user_id, app_users.c.app_id)
+            .where(tuple_(app_users.c.user_id, app_users.c.app_id).in_([(a["user_id"], a["app_id"]) for a in wanted]))
+        ).all())
+        rows = [
+            {"user_id": a["user_id"], "app_id": a["app_id"], "role": UserRole(a["role"])}
+            for a in wanted if (a["user_id"], a["app_id"]) not in existing
         ]
-        
-        # Check existing assignments
-        existing_assignments = db.query(AppUser).count()
-        if existing_assignments > 0:
-            print(f"Database already has {existing_assignments} user-app assignments. Skipping assignment.")
-            return
-        
-        # Create assignments
-        for assignment in assignments:
-            app_user = AppUser(
-                user_id=assignment["user_id"],
-                app_id=assignment["app_id"],
-                role=UserRole(assignment["role"])
-            )
-            db.add(app_user)
-        
-        db.commit()
-        print(f"Successfully assigned users to apps")
-        
-        # Print the assignments
-        print("\nUser-App Assignments:")
-        app_users = db.query(AppUser).all()
-        for app_user in app_users:
-            user = db.query(User).filter(User.id == app_user.user_id).first()
-            app = db.query(SchemaApp).filter(SchemaApp.id == app_user.app_id).first()
-            if user and app:
-                print(f"- {user.name} -> {app.name} ({app_user.role.value})")
-            
-    except Exception as e:
-        print(f"Error assigning users to apps: {e}")
-        db.rollback()
-        raise
-    finally:
-        db.close()
+        if rows:
+            conn.execute(app_users.insert(), rows)
+        return len(rows)
+
+    backfill = Backfill("assign_users_to_apps", "users", assign, engine=engine,
+                        chunk_size=chunk_size, rows_per_second=rows_per_second)
+    if restart:
+        backfill.reset()
+    result = backfill.run()
+    if result["finished_at"] and not result["scanned"]:
+        print(f"Already finished at {result['finished_at']:%Y-%m-%d %H:%M:%S} and no rows were added since; "
+              "nothing to do. Re-run with --restart to scan every row again.")
+        return
+    print(f"Successfully assigned users to apps ({result['changed']} new assignments)")
+
+    # Print the assignments
+    print("\nUser-App Assignments:")
+    with engine.connect() as conn:
+        rows = conn.execute(
+            select(User.name, SchemaApp.name, app_users.c.role)
+            .select_from(app_users)
+            .join(User, User.id == app_users.c.user_id)
+            .join(SchemaApp, SchemaApp.id == app_users.c.app_id)
+            .where(tuple_(app_users.c.user_id, app_users.c.app_id).in_([(a["user_id"], a["app_id"]) for a in ASSIGNMENTS]))
+        ).all()
+    for user_name, app_name, role in rows:
+        print(f"- {user_name} -> {app_name} ({role.value})")
 
 if __name__ == "__main__":
-    assign_users_to_apps() 
\ No newline at end of file
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+    args = add_arguments(argparse.ArgumentParser(description=__doc__)).parse_args()
+    assign_users_to_apps(args.chunk_size, args.rows_per_second, args.restart)
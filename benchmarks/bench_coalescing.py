@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+"""
+Benchmark WebSocket chunk coalescing on /ws/chat.
+
+Starts the app (with a fake token stream instead of OpenAI) in a uvicorn
+subprocess, opens concurrent sockets and compares frames per second and
+server CPU between per-token frames and coalesced frames.
+
+    python benchmarks/bench_coalescing.py --connections 50 --tokens 500
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+
+import websockets
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from benchmarks.common import free_port, process_cpu_seconds, start_server  # noqa: E402
+
+BENCH_TOKEN = "tok "
+
+
+async def run_client(url, index, expected_bytes):
+    frames = 0
+    received = 0
+    async with websockets.connect(url, max_size=None) as ws:
+        await ws.send(json.dumps({
+            "message": "benchmark",
+            "context": {"session_id": f"bench-{index}", "cache": False},
+        }))
+        while received < expected_bytes:
+            frame = await ws.recv()
+            frames += 1
+            received += len(frame)
+    return frames
+
+
+async def run_mode(port, server_pid, connections, tokens, coalesce_bytes, coalesce_ms):
+    url = f"ws://127.0.0.1:{port}/ws/chat?coalesce_bytes={coalesce_bytes}&coalesce_ms={coalesce_ms}"
+    expected_bytes = len(BENCH_TOKEN) * tokens
+
+    cpu_before = process_cpu_seconds(server_pid)
+    started = time.perf_counter()
+    frames = await asyncio.gather(*(run_client(url, i, expected_bytes) for i in range(connections)))
+    elapsed = time.perf_counter() - started
+    cpu_after = process_cpu_seconds(server_pid)
+
+    total_frames = sum(frames)
+    return {
+        "coalesce_bytes": coalesce_bytes,
+        "coalesce_ms": coalesce_ms,
+        "connections": connections,
+        "frames": total_frames,
+        "frames_per_reply": total_frames / connections,
+        "elapsed_s": round(elapsed, 3),
+        "frames_per_s": round(total_frames / elapsed, 1),
+        "bytes_per_s": round(expected_bytes * connections / elapsed, 1),
+        "server_cpu_s": None if cpu_before is None else round(cpu_after - cpu_before, 3),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--connections", type=int, default=50)
+    parser.add_argument("--tokens", type=int, default=500, help="token chunks per reply")
+    parser.add_argument("--token-delay-ms", type=float, default=0, help="delay between upstream tokens")
+    parser.add_argument("--modes", default="256:0,256:5,1024:20",
+                        help="comma separated coalesce_bytes:coalesce_ms pairs (ms=0 is per-token frames)")
+    parser.add_argument("--json", action="store_true", help="print results as JSON")
+    args = parser.parse_args()
+
+    port = free_port()
+    server = start_server("benchmarks.fake_stream_server:app", port, {
+        "BENCH_TOKENS": str(args.tokens),
+        "BENCH_TOKEN_DELAY_MS": str(args.token_delay_ms),
+        "CHAT_MAX_CONCURRENT": "100000",
+        "CHAT_MAX_QUEUE": "100000",
+        "CHAT_CACHE_ENABLED": "false",
+    })
+    try:
+        results = []
+        for mode in args.modes.split(","):
+            max_bytes, max_ms = mode.split(":")
+            results.append(asyncio.run(run_mode(
+                port, server.pid, args.connections, args.tokens, int(max_bytes), float(max_ms)
+            )))
+    finally:
+        server.terminate()
+        server.wait()
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+
+    print(f"{'bytes':>6} {'ms':>5} {'frames/reply':>13} {'frames/s':>10} {'elapsed s':>10} {'server cpu s':>13}")
+    for r in results:
+        print(f"{r['coalesce_bytes']:>6} {r['coalesce_ms']:>5} {r['frames_per_reply']:>13.1f} "
+              f"{r['frames_per_s']:>10} {r['elapsed_s']:>10} {str(r['server_cpu_s']):>13}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,415 @@
+#!/usr/bin/env python3
+"""
+CRUD benchmark for every route in app/main.py against a local Postgres.
+
+A throwaway Postgres is started from the local binaries or Docker (see
+benchmarks/postgres.py) unless --database-url is given. The database is
+seeded with a deterministic data set (records come from app/utils/datagen.py),
+a CRUD-only server (CHAT_ENABLED=false) is started on it, and each route is
+driven at every --concurrency level for --requests requests. Results include throughput,
+p50/p90/p99 latency and status counts per route and level, plus the commit,
+seed volumes and Postgres version, so runs on different commits can be
+compared.
+
+Write routes consume rows prepared for them before each run (fresh users to
+assign, memberships and metadata keys to delete), so every run does the
+same work.
+
+    python benchmarks/bench_crud.py --concurrency 1,8,32 --output results.json
+    python benchmarks/bench_crud.py --routes "GET /apps/{app_id}/users" --records-per-object 2000
+    python benchmarks/bench_crud.py --compare baseline.json --threshold 15
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import re
+import subprocess
+import sys
+import time
+from datetime import datetime, timezone
+
+import httpx
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from benchmarks.common import ROOT, free_port, percentile, process_cpu_seconds, start_server  # noqa: E402
+from benchmarks.postgres import LocalPostgres, server_version  # noqa: E402
+
+# Field layouts used for seeded objects, cycled per object
+OBJECT_TEMPLATES = [
+    ("WorkOrder", {"title": "text", "status": "select", "priority": "select", "due_date": "date", "hours": "number"}),
+    ("Customer", {"name": "text", "email": "email", "phone": "phone", "tier": "select", "active": "boolean"}),
+    ("Asset", {"serial": "text", "model": "text", "installed": "date", "value": "currency", "notes": "text"}),
+]
+INSERT_BATCH = 1000
+
+
+class Seed:
+    """Ids of the seeded rows, used to build requests"""
+
+    def __init__(self):
+        self.apps = []
+        self.objects = []
+        self.records = []
+        self.workflows = []
+        self.users = []
+        self.memberships = []
+
+
+def insert_rows(conn, table, rows):
+    for start in range(0, len(rows), INSERT_BATCH):
+        conn.execute(table.insert(), rows[start:start + INSERT_BATCH])
+
+
+def seed_database(engine, args):
+    """Create the schema and insert a deterministic data set; returns the seeded ids"""
+    from app import migrations
+    from app.database import Base
+    from app.models import AppStatus, AppUser, Metadata, SchemaApp, SchemaObject, SchemaWorkflow, User, UserRole
+    from app.utils import datagen
+
+    rng = random.Random(args.seed)
+    Base.metadata.drop_all(bind=engine)
+    migrations.schema_version.drop(bind=engine, checkfirst=True)
+    # The schema (and its indexes) as production gets it
+    migrations.upgrade(engine)
+    seed = Seed()
+    started = time.perf_counter()
+    with engine.begin() as conn:
+        insert_rows(conn, SchemaApp.__table__, [
+            {"id": a, "name": f"App {a}", "description": "Benchmark app", "status": AppStatus.ACTIVE, "app_metadata": {}}
+            for a in range(1, args.apps + 1)
+        ])
+        seed.apps = list(range(1, args.apps + 1))
+
+        objects = []
+        workflows = []
+        for app_id in seed.apps:
+            for _ in range(args.objects_per_app):
+                name, fields = OBJECT_TEMPLATES[len(objects) % len(OBJECT_TEMPLATES)]
+                objects.append({"id": len(objects) + 1, "name": name, "app_id": app_id,
+                                "fields": {key: {"type": value, "required": False} for key, value in fields.items()}})
+            for _ in range(args.workflows_per_app):
+                workflows.append({"id": len(workflows) + 1, "name": f"Flow {len(workflows) + 1}", "app_id": app_id,
+                                  "steps": [{"name": f"Step {s}", "fields": ["title"]} for s in range(4)]})
+        insert_rows(conn, SchemaObject.__table__, objects)
+        insert_rows(conn, SchemaWorkflow.__table__, workflows)
+        seed.objects = [o["id"] for o in objects]
+        seed.workflows = [w["id"] for w in workflows]
+
+        insert_rows(conn, User.__table__, [
+            {"id": u, "name": f"User {u}", "email": f"user{u}@example.com", "password_hash": "x"}
+            for u in range(1, args.users + 1)
+        ])
+        seed.users = list(range(1, args.users + 1))
+
+        memberships = []
+        for app_id in seed.apps:
+            for user_id in rng.sample(seed.users, min(args.memberships_per_app, len(seed.users))):
+                memberships.append({"app_id": app_id, "user_id": user_id, "role": rng.choice(list(UserRole))})
+        insert_rows(conn, AppUser.__table__, memberships)
+        seed.memberships = [(m["app_id"], m["user_id"]) for m in memberships]
+
+        insert_rows(conn, Metadata.__table__, [{"key": "field_types", "value": {"types": []}, "app_id": None}])
+    added = datagen.generate(engine.url.render_as_string(hide_password=False), args.records_per_object,
+                             workers=args.seed_workers, seed=args.seed)
+    seed.records = [record_id for ids in added.values() for record_id in ids]
+    reset_sequences(engine)
+    return seed, time.perf_counter() - started
+
+
+def reset_sequences(engine):
+    """Move id sequences past the explicitly inserted ids"""
+    from sqlalchemy import text
+    from app.database import Base
+
+    if engine.dialect.name != "postgresql":
+        return
+    with engine.begin() as conn:
+        for table in Base.metadata.sorted_tables:
+            conn.execute(text(
+                f"SELECT setval(pg_get_serial_sequence('{table.name}', 'id'), "
+                f"COALESCE((SELECT MAX(id) FROM {table.name}), 0) + 1, false)"
+            ))
+
+
+def prepare_users(engine, seed, count, tag):
+    """Fresh users with no memberships, for POST /apps/{app_id}/users"""
+    from app.models import User
+
+    with engine.begin() as conn:
+        result = conn.execute(User.__table__.insert().returning(User.__table__.c.id), [
+            {"name": f"Fresh {tag} {i}", "email": f"fresh-{tag}-{i}@example.com", "password_hash": "x"}
+            for i in range(count)
+        ])
+        return [row[0] for row in result]
+
+
+def prepare_memberships(engine, seed, count, tag):
+    """Memberships of fresh users, for DELETE /apps/{app_id}/users/{user_id}"""
+    from app.models import AppUser, UserRole
+
+    users = prepare_users(engine, seed, count, tag)
+    pairs = [(seed.apps[i % len(seed.apps)], user_id) for i, user_id in enumerate(users)]
+    with engine.begin() as conn:
+        conn.execute(AppUser.__table__.insert(), [
+            {"app_id": app_id, "user_id": user_id, "role": UserRole.USER} for app_id, user_id in pairs
+        ])
+    return pairs
+
+
+def prepare_metadata(engine, seed, count, tag):
+    """Metadata keys for DELETE /metadata/{key}"""
+    from app.models import Metadata
+
+    keys = [f"bench-{tag}-{i}" for i in range(count)]
+    with engine.begin() as conn:
+        conn.execute(Metadata.__table__.insert(), [{"key": key, "value": {"i": i}} for i, key in enumerate(keys)])
+    return keys
+
+
+def schema_body(i):
+    return {
+        "app_id": 1,
+        "objects": {f"Saved{i}": {"fields": {"name": {"type": "text"}}}},
+        "workflows": {f"SavedFlow{i}": {"steps": [{"name": "Start"}]}},
+    }
+
+
+def build_routes():
+    """Route name -> (prepare(engine, seed, count, tag) or None, request(rng, seed, i, prepared))"""
+    pick = random.Random.choice
+    return {
+        "GET /apps": (None, lambda rng, s, i, p: ("GET", "/apps", None)),
+        "POST /apps": (None, lambda rng, s, i, p: ("POST", "/apps", {"name": f"Bench app {i}", "description": "x"})),
+        "GET /apps/{app_id}/workflows": (None, lambda rng, s, i, p: ("GET", f"/apps/{pick(rng, s.apps)}/workflows", None)),
+        "GET /apps/{app_id}/objects": (None, lambda rng, s, i, p: ("GET", f"/apps/{pick(rng, s.apps)}/objects", None)),
+        "POST /workflows": (None, lambda rng, s, i, p: (
+            "POST", "/workflows", {"name": f"Bench flow {i}", "steps": [{"name": "Start"}], "app_id": pick(rng, s.apps)})),
+        "POST /objects": (None, lambda rng, s, i, p: (
+            "POST", "/objects", {"name": f"BenchObject{i}", "fields": {"name": {"type": "text"}}, "app_id": pick(rng, s.apps)})),
+        "GET /metadata": (None, lambda rng, s, i, p: ("GET", f"/metadata?key=field_types&app_id={pick(rng, s.apps)}", None)),
+        "POST /metadata": (None, lambda rng, s, i, p: (
+            "POST", "/metadata", {"key": f"bench-upsert-{i % 50}", "value": {"i": i}})),
+        "DELETE /metadata/{key}": (prepare_metadata, lambda rng, s, i, p: ("DELETE", f"/metadata/{p[i]}", None)),
+        "POST /save-schema": (None, lambda rng, s, i, p: ("POST", "/save-schema", schema_body(i))),
+        "PUT /workflows/{workflow_id}/layout": (None, lambda rng, s, i, p: (
+            "PUT", f"/workflows/{pick(rng, s.workflows)}/layout", {"layout": [{"row": i % 4, "fields": ["title"]}]})),
+        "GET /users": (None, lambda rng, s, i, p: ("GET", "/users", None)),
+        "GET /users/{user_id}/apps": (None, lambda rng, s, i, p: ("GET", f"/users/{pick(rng, s.memberships)[1]}/apps", None)),
+        "GET /apps/{app_id}/users": (None, lambda rng, s, i, p: ("GET", f"/apps/{pick(rng, s.apps)}/users", None)),
+        "POST /apps/{app_id}/users": (
+            prepare_users, lambda rng, s, i, p: ("POST", f"/apps/{s.apps[i % len(s.apps)]}/users", {"user_id": p[i], "role": "user"})),
+        "PUT /apps/{app_id}/users/{user_id}": (None, lambda rng, s, i, p: (
+            "PUT", "/apps/{}/users/{}".format(*pick(rng, s.memberships)), {"role": pick(rng, ["admin", "user", "viewer"])})),
+        "DELETE /apps/{app_id}/users/{user_id}": (
+            prepare_memberships, lambda rng, s, i, p: ("DELETE", "/apps/{}/users/{}".format(*p[i]), None)),
+        "GET /objects/{object_id}/records": (None, lambda rng, s, i, p: (
+            "GET", f"/objects/{pick(rng, s.objects)}/records", None)),
+        "POST /objects/{object_id}/records": (None, lambda rng, s, i, p: (
+            "POST", f"/objects/{pick(rng, s.objects)}/records", {"data": {"title": f"Bench {i}", "status": "open"}})),
+        "PUT /records/{record_id}": (None, lambda rng, s, i, p: (
+            "PUT", f"/records/{pick(rng, s.records)}", {"data": {"title": f"Updated {i}", "status": "closed"}})),
+        "POST /workflows/{workflow_id}/execute": (None, lambda rng, s, i, p: (
+            "POST", f"/workflows/{pick(rng, s.workflows)}/execute",
+            {"formData": {"title": "x"}, "recordId": pick(rng, s.records), "currentStep": 1})),
+    }
+
+
+async def drive(base_url, requests, concurrency, timeout):
+    """Send ``requests`` from ``concurrency`` workers; returns latencies and status counts"""
+    latencies = []
+    statuses = {}
+    queue = iter(requests)
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=timeout) as client:
+        async def worker():
+            for method, url, body in queue:
+                started = time.perf_counter()
+                try:
+                    response = await client.request(method, url, json=body)
+                    status = str(response.status_code)
+                except httpx.HTTPError as e:
+                    status = type(e).__name__
+                latencies.append(time.perf_counter() - started)
+                statuses[status] = statuses.get(status, 0) + 1
+
+        started = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        elapsed = time.perf_counter() - started
+    return latencies, statuses, elapsed
+
+
+def ms(value):
+    return None if value is None else round(value * 1000, 2)
+
+
+def run_route(name, route, engine, seed, base_url, concurrency, args, server_pid, tag):
+    prepare, make_request = route
+    # Rows prepared for write routes are unique per run (tag) and used once each
+    prepared = prepare(engine, seed, args.requests, tag) if prepare else None
+    rng = random.Random(f"{args.seed}:{name}:{concurrency}")
+    requests = [make_request(rng, seed, i, prepared) for i in range(args.requests)]
+    if prepare is None and args.warmup:
+        asyncio.run(drive(base_url, requests[:args.warmup], concurrency, args.timeout))
+
+    cpu_before = process_cpu_seconds(server_pid)
+    latencies, statuses, elapsed = asyncio.run(drive(base_url, requests, concurrency, args.timeout))
+    cpu_after = process_cpu_seconds(server_pid)
+    errors = sum(count for status, count in statuses.items() if not status.startswith("2"))
+    return {
+        "route": name,
+        "concurrency": concurrency,
+        "requests": len(latencies),
+        "errors": errors,
+        "statuses": statuses,
+        "throughput_rps": round(len(latencies) / elapsed, 1) if elapsed else None,
+        "p50_ms": ms(percentile(latencies, 50)),
+        "p90_ms": ms(percentile(latencies, 90)),
+        "p99_ms": ms(percentile(latencies, 99)),
+        "max_ms": ms(max(latencies) if latencies else None),
+        "server_cpu_s": None if cpu_before is None or cpu_after is None else round(cpu_after - cpu_before, 3),
+    }
+
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(results, baseline, threshold):
+    """Rows whose p99 grew or throughput fell by more than ``threshold`` percent"""
+    previous = {(r["route"], r["concurrency"]): r for r in baseline["results"]}
+    regressions = []
+    for row in results["results"]:
+        old = previous.get((row["route"], row["concurrency"]))
+        if not old or not old["p99_ms"] or not old["throughput_rps"]:
+            continue
+        p99_change = (row["p99_ms"] - old["p99_ms"]) / old["p99_ms"] * 100
+        rps_change = (row["throughput_rps"] - old["throughput_rps"]) / old["throughput_rps"] * 100
+        if p99_change > threshold or rps_change < -threshold:
+            regressions.append({
+                "route": row["route"], "concurrency": row["concurrency"],
+                "p99_ms": [old["p99_ms"], row["p99_ms"]], "p99_change_pct": round(p99_change, 1),
+                "throughput_rps": [old["throughput_rps"], row["throughput_rps"]], "throughput_change_pct": round(rps_change, 1),
+            })
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--database-url", help="existing (empty, disposable) Postgres database; its tables are recreated")
+    parser.add_argument("--postgres", choices=["auto", "binary", "docker"], default="auto",
+                        help="how to start a throwaway Postgres when --database-url is not given")
+    parser.add_argument("--image", default="postgres:16", help="Docker image for --postgres docker")
+    parser.add_argument("--fsync", action="store_true", help="keep fsync/synchronous_commit on in the throwaway server")
+    parser.add_argument("--apps", type=int, default=20)
+    parser.add_argument("--objects-per-app", type=int, default=5)
+    parser.add_argument("--workflows-per-app", type=int, default=3)
+    parser.add_argument("--records-per-object", type=int, default=200)
+    parser.add_argument("--users", type=int, default=500)
+    parser.add_argument("--memberships-per-app", type=int, default=25)
+    parser.add_argument("--seed-workers", type=int, default=os.cpu_count() or 1, help="processes generating records")
+    parser.add_argument("--seed", type=int, default=42, help="random seed for data and request mix")
+    parser.add_argument("--concurrency", default="1,8,32", help="comma-separated concurrency levels")
+    parser.add_argument("--requests", type=int, default=500, help="requests per route and concurrency level")
+    parser.add_argument("--warmup", type=int, default=20, help="unrecorded requests before each read-only run")
+    parser.add_argument("--routes", help="comma-separated route names to run (default: all)")
+    parser.add_argument("--workers", type=int, default=1, help="uvicorn worker processes")
+    parser.add_argument("--timeout", type=float, default=30.0)
+    parser.add_argument("--output", help="write the results JSON to this file")
+    parser.add_argument("--compare", help="baseline results JSON; exit 1 if any route regressed")
+    parser.add_argument("--threshold", type=float, default=10.0, help="regression threshold in percent")
+    args = parser.parse_args()
+
+    routes = build_routes()
+    if args.routes:
+        wanted = [name.strip() for name in args.routes.split(",")]
+        unknown = [name for name in wanted if name not in routes]
+        if unknown:
+            parser.error(f"unknown routes: {unknown}; choose from {list(routes)}")
+        routes = {name: routes[name] for name in wanted}
+    levels = [int(level) for level in args.concurrency.split(",")]
+
+    from sqlalchemy import create_engine
+
+    postgres = None
+    server = None
+    url = args.database_url
+    if url and re.match(r"^postgres(ql)?://", url):
+        url = re.sub(r"^postgres(ql)?://", "postgresql+psycopg2://", url)
+    try:
+        if url is None:
+            postgres = LocalPostgres(args.postgres, args.image, fsync=args.fsync)
+            url = postgres.start()
+        # The seeding helpers import app.database, which builds its engine from DATABASE_URL
+        os.environ["DATABASE_URL"] = url
+        engine = create_engine(url)
+        seed, seed_seconds = seed_database(engine, args)
+
+        port = free_port()
+        extra_args = ["--workers", str(args.workers)] if args.workers > 1 else []
+        server = start_server("app.main:app", port, {
+            "DATABASE_URL": url,
+            "CHAT_ENABLED": "false",
+        }, extra_args=extra_args)
+        base_url = f"http://127.0.0.1:{port}"
+
+        rows = []
+        for index, (name, route) in enumerate(routes.items()):
+            for concurrency in levels:
+                row = run_route(name, route, engine, seed, base_url, concurrency, args, server.pid,
+                                tag=f"{index}-{concurrency}")
+                rows.append(row)
+                print(f"{name:<42} c={concurrency:<4} {row['throughput_rps']:>9} rps  "
+                      f"p50 {row['p50_ms']:>8} ms  p99 {row['p99_ms']:>8} ms  errors {row['errors']}", file=sys.stderr)
+
+        results = {
+            "benchmark": "crud",
+            "commit": git_commit(),
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "python": platform.python_version(),
+            "postgres": server_version(url) if engine.dialect.name == "postgresql" else engine.dialect.name,
+            "postgres_mode": postgres.mode if postgres else "external",
+            "fsync": None if postgres is None else args.fsync,
+            "workers": args.workers,
+            "seed": {
+                "seed": args.seed, "apps": len(seed.apps), "objects": len(seed.objects), "workflows": len(seed.workflows),
+                "records": len(seed.records), "users": len(seed.users), "memberships": len(seed.memberships),
+                "seconds": round(seed_seconds, 2),
+            },
+            "requests_per_run": args.requests,
+            "results": rows,
+        }
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait()
+        if postgres is not None:
+            postgres.stop()
+
+    output = json.dumps(results, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output + "\n")
+    else:
+        print(output)
+
+    if args.compare:
+        with open(args.compare) as f:
+            regressions = compare(results, json.load(f), args.threshold)
+        for item in regressions:
+            print(f"REGRESSION {item['route']} c={item['concurrency']}: p99 {item['p99_change_pct']:+}%, "
+                  f"throughput {item['throughput_change_pct']:+}%", file=sys.stderr)
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+"""
+Benchmark worker import time and memory.
+
+Each mode imports the app in a fresh interpreter and reports the import wall
+time and peak RSS (median over --repeat runs), and whether langchain was
+loaded:
+
+* crud-only - app.main with CHAT_ENABLED=false
+* lazy      - app.main with chat routes; the LLM/graph are built on first use
+* eager     - app.main plus chat_service.init_chat(), i.e. the old import-time cost
+* chat-app  - app.chat_app, the standalone chat worker
+
+    python benchmarks/bench_import.py --repeat 5
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from benchmarks.common import ROOT  # noqa: E402
+
+PROBE = """
+import json, resource, sys, time
+started = time.perf_counter()
+import {module}
+{after}
+elapsed = time.perf_counter() - started
+print(json.dumps({{
+    "import_s": elapsed,
+    "peak_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+    "modules": len(sys.modules),
+    "langchain_loaded": any(m.startswith(("langchain", "langgraph")) for m in sys.modules),
+}}))
+"""
+
+MODES = {
+    "crud-only": ("app.main", "", {"CHAT_ENABLED": "false"}),
+    "lazy": ("app.main", "", {}),
+    "eager": ("app.main", "from app.services import chat_service; chat_service.init_chat()", {}),
+    "chat-app": ("app.chat_app", "", {}),
+}
+
+
+def run_probe(module, after, env_overrides):
+    env = dict(os.environ)
+    env.setdefault("OPENAI_API_KEY", "bench")
+    env.setdefault("DATABASE_URL", "sqlite://")
+    env.update(env_overrides)
+    output = subprocess.check_output(
+        [sys.executable, "-c", PROBE.format(module=module, after=after)], cwd=ROOT, env=env
+    )
+    return json.loads(output.decode().strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--json", action="store_true", help="print results as JSON")
+    args = parser.parse_args()
+
+    results = []
+    for name, (module, after, env) in MODES.items():
+        runs = [run_probe(module, after, env) for _ in range(args.repeat)]
+        results.append({
+            "mode": name,
+            "import_ms": round(statistics.median(r["import_s"] for r in runs) * 1000, 1),
+            "peak_rss_mb": round(statistics.median(r["peak_rss_mb"] for r in runs), 1),
+            "modules": runs[-1]["modules"],
+            "langchain_loaded": runs[-1]["langchain_loaded"],
+        })
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+
+    print(f"{'mode':>10} {'import ms':>10} {'peak rss MB':>12} {'modules':>8} {'langchain':>10}")
+    for r in results:
+        print(f"{r['mode']:>10} {r['import_ms']:>10} {r['peak_rss_mb']:>12} {r['modules']:>8} {str(r['langchain_loaded']):>10}")
+
+
+if __name__ == "__main__":
+    main()
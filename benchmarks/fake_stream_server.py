@@ -0,0 +1,35 @@
+"""
+ASGI entry point for benchmarks: the real app with the LLM graph replaced by a
+fake token stream, so /ws/chat can be exercised without calling OpenAI.
+
+    BENCH_TOKENS=500 BENCH_TOKEN_DELAY_MS=0 uvicorn benchmarks.fake_stream_server:app
+"""
+import asyncio
+import os
+
+from app.main import app  # noqa: F401 - re-exported for uvicorn
+from app.services import chat_service
+
+BENCH_TOKEN = "tok "
+BENCH_TOKENS = int(os.environ.get("BENCH_TOKENS", "500"))
+BENCH_TOKEN_DELAY_MS = float(os.environ.get("BENCH_TOKEN_DELAY_MS", "0"))
+
+
+class _Chunk:
+    def __init__(self, content):
+        self.content = content
+
+
+class FakeStreamGraph:
+    """Stand-in for the compiled graph that streams a fixed number of tokens"""
+
+    async def astream_events(self, input_state, version="v2"):
+        for _ in range(BENCH_TOKENS):
+            if BENCH_TOKEN_DELAY_MS:
+                await asyncio.sleep(BENCH_TOKEN_DELAY_MS / 1000)
+            else:
+                await asyncio.sleep(0)
+            yield {"event": "on_chat_model_stream", "data": {"chunk": _Chunk(BENCH_TOKEN)}}
+
+
+chat_service.graph = FakeStreamGraph()
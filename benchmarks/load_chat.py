@@ -0,0 +1,180 @@
+#!/usr/bin/env python3
+"""
+End-to-end load test for /ws/chat.
+
+By default a server is started with the fake chat model
+(CHAT_MODEL_BACKEND=fake), so no OpenAI calls are made. Each client socket
+sends framed chat messages and records time to first token (TTFT), the gaps
+between chunks and the full reply time. The report includes p50/p99 figures,
+busy/error counts and server CPU and peak RSS.
+
+    python benchmarks/load_chat.py --connections 2000 --ramp-seconds 10
+    python benchmarks/load_chat.py --url ws://staging:8000/ws/chat --server-pid 1234
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+
+import websockets
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from benchmarks.common import (  # noqa: E402
+    free_port, percentile, process_cpu_seconds, process_peak_rss_mb, raise_open_file_limit, start_server
+)
+
+PROMPTS = ["create app", "I need an object for customers", "continue", "add a workflow for approvals"]
+
+
+class LoadStats:
+    def __init__(self):
+        self.ttft = []
+        self.chunk_gaps = []
+        self.reply_times = []
+        self.chunks = 0
+        self.replies = 0
+        self.busy = 0
+        self.errors = 0
+        self.connect_failures = 0
+
+
+async def run_client(url, index, turns, stats, timeout):
+    try:
+        ws = await websockets.connect(url, max_size=None, open_timeout=timeout)
+    except Exception:
+        stats.connect_failures += 1
+        return
+
+    async with ws:
+        for turn in range(turns):
+            stream_id = str(turn)
+            sent = time.perf_counter()
+            last = None
+            await ws.send(json.dumps({
+                "stream_id": stream_id,
+                "message": PROMPTS[(index + turn) % len(PROMPTS)],
+                "context": {"session_id": f"load-{index}", "cache": False},
+            }))
+            while True:
+                try:
+                    frame = json.loads(await asyncio.wait_for(ws.recv(), timeout))
+                except Exception:
+                    stats.errors += 1
+                    return
+                if frame.get("stream_id") != stream_id:
+                    continue
+                now = time.perf_counter()
+                if frame["type"] == "chunk":
+                    if last is None:
+                        stats.ttft.append(now - sent)
+                    else:
+                        stats.chunk_gaps.append(now - last)
+                    last = now
+                    stats.chunks += 1
+                elif frame["type"] == "done":
+                    stats.replies += 1
+                    stats.reply_times.append(now - sent)
+                    break
+                elif frame["type"] == "busy":
+                    stats.busy += 1
+                    break
+                else:
+                    stats.errors += 1
+                    break
+
+
+async def run_load(url, connections, turns, ramp_seconds, timeout):
+    stats = LoadStats()
+    clients = []
+    delay = ramp_seconds / connections if connections else 0
+    for i in range(connections):
+        clients.append(asyncio.create_task(run_client(url, i, turns, stats, timeout)))
+        if delay:
+            await asyncio.sleep(delay)
+    await asyncio.gather(*clients)
+    return stats
+
+
+def ms(value):
+    return None if value is None else round(value * 1000, 2)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", help="existing /ws/chat URL; by default a fake-backend server is started")
+    parser.add_argument("--server-pid", type=int, help="pid of an existing server, for CPU/RSS figures")
+    parser.add_argument("--connections", type=int, default=500)
+    parser.add_argument("--turns", type=int, default=1, help="chat turns per connection")
+    parser.add_argument("--ramp-seconds", type=float, default=5.0)
+    parser.add_argument("--timeout", type=float, default=120.0)
+    parser.add_argument("--coalesce-ms", type=float, default=0)
+    parser.add_argument("--tokens-per-second", type=float, default=50)
+    parser.add_argument("--ttft-ms", type=float, default=300)
+    parser.add_argument("--max-concurrent", type=int, default=None,
+                        help="server CHAT_MAX_CONCURRENT (defaults to --connections)")
+    parser.add_argument("--json", action="store_true", help="print results as JSON")
+    args = parser.parse_args()
+
+    raise_open_file_limit()
+
+    server = None
+    server_pid = args.server_pid
+    url = args.url
+    if url is None:
+        port = free_port()
+        server = start_server("app.main:app", port, {
+            "CHAT_MODEL_BACKEND": "fake",
+            "FAKE_LLM_TOKENS_PER_SECOND": str(args.tokens_per_second),
+            "FAKE_LLM_TTFT_MS": str(args.ttft_ms),
+            "CHAT_MAX_CONCURRENT": str(args.max_concurrent or args.connections),
+            "CHAT_MAX_QUEUE": str(args.connections),
+            "CHAT_QUEUE_TIMEOUT_SECONDS": str(args.timeout),
+        })
+        server_pid = server.pid
+        url = f"ws://127.0.0.1:{port}/ws/chat"
+    url += ("&" if "?" in url else "?") + f"coalesce_ms={args.coalesce_ms}"
+
+    try:
+        cpu_before = process_cpu_seconds(server_pid) if server_pid else None
+        started = time.perf_counter()
+        stats = asyncio.run(run_load(url, args.connections, args.turns, args.ramp_seconds, args.timeout))
+        elapsed = time.perf_counter() - started
+        cpu_after = process_cpu_seconds(server_pid) if server_pid else None
+        peak_rss = process_peak_rss_mb(server_pid) if server_pid else None
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait()
+
+    server_cpu = None if cpu_before is None or cpu_after is None else cpu_after - cpu_before
+    results = {
+        "connections": args.connections,
+        "turns": args.turns,
+        "elapsed_s": round(elapsed, 2),
+        "replies": stats.replies,
+        "chunks": stats.chunks,
+        "busy": stats.busy,
+        "errors": stats.errors,
+        "connect_failures": stats.connect_failures,
+        "ttft_p50_ms": ms(percentile(stats.ttft, 50)),
+        "ttft_p99_ms": ms(percentile(stats.ttft, 99)),
+        "chunk_gap_p50_ms": ms(percentile(stats.chunk_gaps, 50)),
+        "chunk_gap_p99_ms": ms(percentile(stats.chunk_gaps, 99)),
+        "reply_p50_ms": ms(percentile(stats.reply_times, 50)),
+        "reply_p99_ms": ms(percentile(stats.reply_times, 99)),
+        "server_cpu_s": None if server_cpu is None else round(server_cpu, 2),
+        "server_cpu_util": None if server_cpu is None else round(server_cpu / elapsed, 3),
+        "server_peak_rss_mb": None if peak_rss is None else round(peak_rss, 1),
+    }
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+    else:
+        for key, value in results.items():
+            print(f"{key:>20}: {value}")
+
+
+if __name__ == "__main__":
+    main()
@@ -9,24 +9,19 @@ import sys
 import os
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
-from sqlalchemy import text
+from app import migrations
 from app.database import engine, Base
-from app.models import SchemaObject, SchemaWorkflow, SchemaApp
+import app.models  # noqa: F401 (registers the tables on Base)
 
 def recreate_tables():
-    """Drop and recreate all tables"""
+    """Drop all tables and rebuild the schema from the migrations"""
     try:
-        with engine.connect() as connection:
-            # Drop all tables
-            connection.execute(text("DROP TABLE IF EXISTS workflows CASCADE"))
-            connection.execute(text("DROP TABLE IF EXISTS objects CASCADE"))
-            connection.execute(text("DROP TABLE IF EXISTS apps CASCADE"))
-            connection.commit()
-            print("Dropped existing tables.")
+        Base.metadata.drop_all(bind=engine)
+        migrations.schema_version.drop(bind=engine, checkfirst=True)
+        print("Dropped existing tables.")
         
-        # Recreate all tables
-        Base.metadata.create_all(bind=engine)
-        print("Recreated all tables with latest schema.")
+        applied = migrations.upgrade(engine)
+        print(f"Recreated all tables (schema version {applied[-1]:04d}).")
         
     except Exception as e:
         print(f"Error recreating tables: {e}")
@@ -1,22 +1,19 @@
 #!/usr/bin/env python3
 """
 Script to seed the database with sample apps for testing.
-Run this after setting up the database and installing dependencies.
+Run this after `python -m app.migrations upgrade`.
 """
 
 import sys
 import os
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
-from app.database import get_db, create_tables
+from app.database import get_db
 from app.models import SchemaApp, AppStatus
 from sqlalchemy.orm import Session
 
 def seed_apps():
     """Add sample apps to the database"""
-    # Create tables if they don't exist
-    create_tables()
-    
     # Get database session
     db = next(get_db())
     
@@ -0,0 +1,96 @@
+import asyncio
+import pytest
+from app.services.admission import AdmissionController, ChatBusyError
+
+
+@pytest.mark.asyncio
+async def test_rejects_when_queue_full():
+    controller = AdmissionController(max_concurrent=1, max_queue=1, queue_timeout=5)
+    release = asyncio.Event()
+
+    async def hold(session_id):
+        async with controller.slot(session_id):
+            await release.wait()
+
+    running = asyncio.create_task(hold("a"))
+    await asyncio.sleep(0.01)
+    queued = asyncio.create_task(hold("b"))
+    await asyncio.sleep(0.01)
+    assert controller.stats()["queue_depth"] == 1
+
+    with pytest.raises(ChatBusyError) as exc_info:
+        async with controller.slot("c"):
+            pass
+    assert exc_info.value.to_frame() == {"type": "busy", "reason": "queue_full", "queue_depth": 1}
+
+    release.set()
+    await asyncio.gather(running, queued)
+    assert controller.stats()["admitted"] == 2
+    assert controller.stats()["rejected"] == 1
+
+
+@pytest.mark.asyncio
+async def test_single_flight_per_session_and_timeout():
+    controller = AdmissionController(max_concurrent=4, max_queue=4, queue_timeout=0.05)
+
+    async with controller.slot("a"):
+        # A second turn of the same session waits for the first and times out
+        with pytest.raises(ChatBusyError) as exc_info:
+            async with controller.slot("a"):
+                pass
+        assert exc_info.value.reason == "timeout"
+
+        # Other sessions are unaffected
+        async with controller.slot("b"):
+            assert controller.stats()["active"] == 2
+
+    assert controller.stats()["timed_out"] == 1
+    assert controller.stats()["active"] == 0
+
+
+@pytest.mark.asyncio
+async def test_turn_calls_borrow_free_slots_and_leave_queued_turns_theirs():
+    controller = AdmissionController(max_concurrent=3, max_queue=4, queue_timeout=5)
+    release = asyncio.Event()
+    running = 0
+    peak = 0
+
+    async def part(calls):
+        nonlocal running, peak
+        async with calls.call():
+            running += 1
+            peak = max(peak, running)
+            await release.wait()
+            running -= 1
+
+    async with controller.slot("a"):
+        calls = controller.turn_calls()
+        parts = [asyncio.create_task(part(calls)) for _ in range(5)]
+        await asyncio.sleep(0.01)
+        # The turn's own slot plus the two free ones
+        assert running == 3 and controller.stats()["extra_calls"] == 2
+        release.set()
+        await asyncio.gather(*parts)
+    assert peak == 3 and controller.stats()["extra_calls"] == 0
+
+    # With every slot taken and a turn queued, extra parts wait for their own turn's slot
+    release.clear()
+    queued_admitted = asyncio.Event()
+
+    async def queued_turn():
+        async with controller.slot("d"):
+            queued_admitted.set()
+
+    async with controller.slot("b"), controller.slot("c"):
+        held = controller.slot("e")
+        await held.__aenter__()
+        queued = asyncio.create_task(queued_turn())
+        await asyncio.sleep(0.01)
+        calls = controller.turn_calls()
+        parts = [asyncio.create_task(part(calls)) for _ in range(2)]
+        await asyncio.sleep(0.01)
+        assert running == 1 and controller.stats()["extra_calls"] == 0
+        await held.__aexit__(None, None, None)
+        await asyncio.wait_for(queued_admitted.wait(), 1)
+        release.set()
+        await asyncio.gather(queued, *parts)
@@ -0,0 +1,38 @@
+import pytest
+from sqlalchemy import func, select
+
+from app.models import SchemaApp, SchemaObject, SchemaRecord
+from tests.conftest import TEST_SEED_ROWS
+
+
+def object_id(db, name):
+    return db.execute(select(SchemaObject.id).where(SchemaObject.name == name)).scalar_one()
+
+
+def test_starts_from_the_seeded_template(client, db):
+    assert sorted(app["name"] for app in client.get("/apps").json()) == ["Field Service", "HR"]
+    records = client.get(f"/objects/{object_id(db, 'WorkOrder')}/records").json()
+    assert len(records) == TEST_SEED_ROWS
+    assert all(r["data"]["status"] in ("open", "in_progress", "closed") for r in records)
+
+
+@pytest.mark.parametrize("attempt", [1, 2])
+def test_writes_are_rolled_back_after_each_test(client, db, attempt):
+    # Runs twice; the second run only passes if the first one's writes were undone
+    assert client.post("/apps", json={"name": "Scratch", "status": "active"}).status_code == 200
+    work_orders = object_id(db, "WorkOrder")
+    created = client.post(f"/objects/{work_orders}/records", json={"data": {"title": "Fix boiler", "status": "open"}})
+    assert created.status_code == 200
+
+    assert db.execute(select(func.count()).select_from(SchemaApp)).scalar() == 3
+    count = db.execute(select(func.count()).where(SchemaRecord.object_id == work_orders)).scalar()
+    assert count == TEST_SEED_ROWS + 1
+
+
+def test_failed_requests_only_roll_back_their_savepoint(client, db):
+    # John (user 1) is already on HR. A bad role makes the route roll back, which must not undo the first commit
+    hr = db.execute(select(SchemaApp.id).where(SchemaApp.name == "HR")).scalar_one()
+    assert client.post(f"/apps/{hr}/users", json={"user_id": 2, "role": "viewer"}).status_code == 200
+    assert client.post(f"/apps/{hr}/users", json={"user_id": 1}).status_code == 400
+    assert client.post(f"/apps/{hr}/users", json={"user_id": 3, "role": "nonsense"}).status_code == 500
+    assert sorted(u["id"] for u in client.get(f"/apps/{hr}/users").json()) == [1, 2]
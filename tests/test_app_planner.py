@@ -0,0 +1,43 @@
+from app.services.app_planner import merge_parts, parse_part, parse_plan, part_prompt, plan_parts
+
+
+PLAN_REPLY = """Here is the plan:
+{"app": "CRM", "objects": [{"name": "Contact", "description": "a person"}, "Deal", {"name": "Contact"}],
+ "workflows": [{"name": "Qualify"}, {"description": "no name"}]}"""
+
+
+def test_parse_plan_cleans_up_entities():
+    plan = parse_plan(PLAN_REPLY, max_parts=10)
+    assert plan["app"] == "CRM"
+    assert [o["name"] for o in plan["objects"]] == ["Contact", "Deal"]
+    assert [w["name"] for w in plan["workflows"]] == ["Qualify"]
+
+
+def test_parse_plan_caps_parts_and_rejects_garbage():
+    plan = parse_plan(PLAN_REPLY, max_parts=2)
+    assert len(plan_parts(plan)) == 2
+    assert parse_plan("no json here", max_parts=10) is None
+    assert parse_plan('{"objects": []}', max_parts=10) is None
+
+
+def test_part_prompt_mentions_the_rest_of_the_app():
+    plan = parse_plan(PLAN_REPLY, max_parts=10)
+    prompt = part_prompt(plan, plan_parts(plan)[0])
+    assert "'Contact'" in prompt and "Deal" in prompt and "Qualify" in prompt
+
+
+def test_merge_parts_keeps_plan_order_and_reports_failures():
+    plan = parse_plan(PLAN_REPLY, max_parts=10)
+    contact, deal, qualify = plan_parts(plan)
+    parts = [
+        parse_part(qualify, '{"steps": [{"name": "Call"}]}'),
+        parse_part(deal, "not json"),
+        parse_part(contact, '{"fields": {"email": {"type": "email"}}}'),
+    ]
+    reply = merge_parts(plan, parts)
+    assert reply["type"] == "admin"
+    assert reply["config"] == {
+        "objects": {"Contact": {"fields": {"email": {"type": "email"}}}},
+        "workflows": {"Qualify": {"steps": [{"name": "Call"}]}},
+    }
+    assert "Could not generate: Deal" in reply["reply"]
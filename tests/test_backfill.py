@@ -0,0 +1,132 @@
+import pytest
+from sqlalchemy import create_engine, text
+
+import assign_users_to_apps
+import update_object_app_ids
+from app import migrations
+from app.migrations import backfill
+from app.migrations.backfill import Backfill
+
+
+@pytest.fixture
+def engine(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'backfill.db'}")
+    with engine.begin() as conn:
+        conn.execute(text("CREATE TABLE t (id INTEGER PRIMARY KEY, n INTEGER NOT NULL DEFAULT 0)"))
+        # Sparse ids: chunks are still chunk_size rows each
+        conn.execute(text("INSERT INTO t (id) VALUES (:id)"), [{"id": i * 7} for i in range(1, 51)])
+    return engine
+
+
+def bump(conn, first, last):
+    return conn.execute(text("UPDATE t SET n = n + 1 WHERE id BETWEEN :first AND :last"),
+                        {"first": first, "last": last}).rowcount
+
+
+def counts(engine):
+    with engine.connect() as conn:
+        return [row[0] for row in conn.execute(text("SELECT n FROM t ORDER BY id"))]
+
+
+def test_resumes_after_the_last_committed_chunk(engine):
+    calls = []
+
+    def flaky(conn, first, last):
+        calls.append((first, last))
+        if len(calls) == 3:
+            raise RuntimeError("killed")
+        return bump(conn, first, last)
+
+    job = Backfill("bump", "t", flaky, engine=engine, chunk_size=10)
+    with pytest.raises(RuntimeError):
+        job.run()
+    # The failed chunk rolled back; the checkpoint is after chunk 2
+    assert counts(engine) == [1] * 20 + [0] * 30
+    assert job.status()["last_id"] == 140 and job.status()["finished_at"] is None
+
+    result = job.run()
+    assert result["resumed_after"] == 140 and result["scanned"] == 30
+    assert calls[3:] == [(147, 210), (217, 280), (287, 350)]
+    assert counts(engine) == [1] * 50
+    assert job.status()["rows_scanned"] == 50 and job.status()["rows_changed"] == 50
+
+    # Finished: running again only visits rows added since
+    assert job.run()["scanned"] == 0
+    with engine.begin() as conn:
+        conn.execute(text("INSERT INTO t (id) VALUES (400), (401)"))
+    rerun = job.run()
+    assert rerun["finished_at"] is not None and rerun["resumed_after"] == 350
+    assert rerun["scanned"] == 2 and counts(engine)[-3:] == [1, 1, 1]
+    with engine.begin() as conn:
+        conn.execute(text("DELETE FROM t WHERE id >= 400"))
+    job.reset()
+    assert job.run()["changed"] == 50
+    assert counts(engine) == [2] * 50
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+        self.slept = []
+
+    def perf_counter(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.slept.append(seconds)
+        self.now += seconds
+
+
+def test_throttles_to_the_target_rate(engine, monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(backfill, "time", clock)
+    result = Backfill("throttled", "t", bump, engine=engine, chunk_size=10, rows_per_second=100).run()
+    assert result["chunks"] == 5
+    # 50 rows at 100 rows/s: one 0.1s pause per chunk of 10
+    assert clock.slept == pytest.approx([0.1] * 5)
+
+
+def test_retries_transient_errors(engine, monkeypatch):
+    monkeypatch.setattr(backfill, "time", FakeClock())
+    failures = []
+
+    def locked(conn, first, last):
+        if not failures:
+            failures.append(first)
+            conn.execute(text("SELECT * FROM missing_table"))
+        return bump(conn, first, last)
+
+    assert Backfill("retry", "t", locked, engine=engine, chunk_size=25).run()["changed"] == 50
+    assert counts(engine) == [1] * 50
+
+
+def test_fixup_scripts_run_as_backfills(tmp_path, monkeypatch, capsys):
+    engine = create_engine(f"sqlite:///{tmp_path / 'app.db'}")
+    migrations.upgrade(engine)
+    with engine.begin() as conn:
+        conn.execute(text("INSERT INTO apps (id, name, status) VALUES (1, 'HR', 'ACTIVE'), (2, 'Field', 'ACTIVE')"))
+        conn.execute(text("INSERT INTO objects (id, name, fields) VALUES "
+                          "(1, 'Employee', '{}'), (2, 'WorkOrder', '{}'), (3, 'Other', '{}'), (4, 'Customer', '{}')"))
+        conn.execute(text("INSERT INTO users (id, name, email, password_hash) VALUES "
+                          "(1, 'John', 'j@example.com', 'x'), (2, 'Sarah', 's@example.com', 'x')"))
+        conn.execute(text("INSERT INTO app_users (app_id, user_id, role) VALUES (1, 1, 'ADMIN')"))
+    monkeypatch.setattr(update_object_app_ids, "engine", engine)
+    monkeypatch.setattr(assign_users_to_apps, "engine", engine)
+
+    update_object_app_ids.update_object_app_ids(chunk_size=2)
+    assign_users_to_apps.assign_users_to_apps(chunk_size=1)
+    with engine.connect() as conn:
+        assert conn.execute(text("SELECT id, app_id FROM objects ORDER BY id")).all() == [
+            (1, 1), (2, 2), (3, None), (4, 2)]
+        # App 3 does not exist and user 1 was already on app 1
+        assert conn.execute(text("SELECT user_id, app_id, role FROM app_users ORDER BY user_id, app_id")).all() == [
+            (1, 1, "ADMIN"), (1, 2, "USER"), (2, 1, "USER")]
+
+    # Re-running reports that there was nothing new instead of silently doing nothing
+    capsys.readouterr()
+    update_object_app_ids.update_object_app_ids(chunk_size=2)
+    assert "Already finished" in capsys.readouterr().out
+    with engine.begin() as conn:
+        conn.execute(text("INSERT INTO objects (id, name, fields) VALUES (5, 'Technician', '{}')"))
+    update_object_app_ids.update_object_app_ids(chunk_size=2)
+    assert "Successfully updated 1 objects" in capsys.readouterr().out
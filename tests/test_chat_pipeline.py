@@ -0,0 +1,55 @@
+import asyncio
+import pytest
+from app.services.admission import ChatBusyError
+from app.services.chat_pipeline import GenerationRegistry, generate_reply
+from app.services.coalescer import CoalesceSettings
+
+REQUEST = {"messages": [{"role": "user", "content": "hi"}], "session_id": "s", "use_cache": None}
+
+
+@pytest.mark.asyncio
+async def test_generate_reply_reports_busy():
+    async def busy_handler(**kwargs):
+        raise ChatBusyError("queue_full", 3)
+        yield
+
+    events = [e async for e in generate_reply(busy_handler, REQUEST, CoalesceSettings())]
+    assert events == [{"type": "busy", "reason": "queue_full", "queue_depth": 3}]
+
+
+@pytest.mark.asyncio
+async def test_generate_reply_forwards_progress_events():
+    async def handler(**kwargs):
+        yield {"type": "progress", "stage": "planning"}
+        yield "Hi"
+
+    events = [e async for e in generate_reply(handler, REQUEST, CoalesceSettings())]
+    assert events == [
+        {"type": "progress", "stage": "planning"},
+        {"type": "chunk", "seq": 0, "data": "Hi"},
+        {"type": "done", "seq": 1},
+    ]
+
+
+@pytest.mark.asyncio
+async def test_orphaned_generation_is_cancelled_after_grace():
+    closed = asyncio.Event()
+
+    async def endless_handler(**kwargs):
+        try:
+            yield "a"
+            await asyncio.sleep(3600)
+        finally:
+            closed.set()
+
+    registry = GenerationRegistry(orphan_grace=0.02)
+    generation = registry.start(endless_handler, REQUEST, CoalesceSettings())
+
+    follower = generation.follow()
+    assert await follower.__anext__() == (0, {"type": "chunk", "seq": 0, "data": "a"})
+    await follower.aclose()
+
+    await asyncio.wait_for(closed.wait(), 1)
+    await asyncio.sleep(0)
+    assert generation.finished
+    assert registry.get(generation.id, generation.session_id) is generation
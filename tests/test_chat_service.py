@@ -1,6 +1,9 @@
+import json
+import time
 import pytest
 from unittest.mock import patch, AsyncMock
-from app.services import chat_service
+from app.services import chat_service, chat_timing, db_tools
+from app.services.record_index import RecordIndex
 
 @pytest.mark.asyncio
 async def test_handle_chat_streams_chunks():
@@ -19,4 +22,399 @@ async def test_handle_chat_streams_chunks():
         chunks = []
         async for chunk in chat_service.handle_chat("hi"):
             chunks.append(chunk)
-        assert chunks == ["Hello", " world!"] 
\ No newline at end of file
+        assert chunks == ["Hello", " world!"] 
+
+def make_fake_graph(events, calls):
+    async def fake_astream_events(*args, **kwargs):
+        calls.append(args)
+        for event in events:
+            yield event
+    return fake_astream_events
+
+
+@pytest.mark.asyncio
+async def test_handle_chat_replays_cached_reply():
+    chat_service.response_cache.clear()
+    chat_service.context_store.clear()
+    fake_events = [
+        {"event": "on_chat_model_stream", "data": {"chunk": type("Chunk", (), {"content": "Which domain?"})()}},
+    ]
+    calls = []
+
+    with patch.object(chat_service, "graph", autospec=True) as mock_graph:
+        mock_graph.astream_events = make_fake_graph(fake_events, calls)
+        first = [c async for c in chat_service.handle_chat("Create app", session_id="a")]
+        # Same opener from another session, differing only in case and whitespace
+        second = [c async for c in chat_service.handle_chat("  create   APP ", session_id="b")]
+
+    assert "".join(first) == "Which domain?"
+    assert "".join(second) == "Which domain?"
+    assert len(calls) == 1
+
+
+@pytest.mark.asyncio
+async def test_handle_chat_cache_opt_out():
+    chat_service.response_cache.clear()
+    chat_service.context_store.clear()
+    fake_events = [
+        {"event": "on_chat_model_stream", "data": {"chunk": type("Chunk", (), {"content": "Hi"})()}},
+    ]
+    calls = []
+
+    with patch.object(chat_service, "graph", autospec=True) as mock_graph:
+        mock_graph.astream_events = make_fake_graph(fake_events, calls)
+        [c async for c in chat_service.handle_chat("create app", session_id="a", use_cache=False)]
+        [c async for c in chat_service.handle_chat("create app", session_id="a")]
+
+    # The opt-out sticks to the session for later turns
+    assert len(calls) == 2
+    assert len(chat_service.response_cache) == 0
+
+
+@pytest.mark.asyncio
+async def test_handle_chat_routes_turns_by_intent(monkeypatch):
+    monkeypatch.setenv("CHAT_MODEL_BACKEND", "fake")
+    monkeypatch.setenv("CHAT_FANOUT_ENABLED", "false")
+    monkeypatch.setenv("FAKE_LLM_TOKENS_PER_SECOND", "0")
+    monkeypatch.setenv("FAKE_LLM_TTFT_MS", "0")
+    monkeypatch.setattr(chat_service, "llms", {})
+    monkeypatch.setattr(chat_service, "graph", None)
+    chat_service.context_store.clear()
+    strong_turns = chat_timing.turns_total.value(route="strong", model="fake-strong", outcome="ok")
+    fast_turns = chat_timing.turns_total.value(route="fast", model="fake-fast", outcome="ok")
+
+    # Runs the real graph: the router picks the node, the fake model streams the reply
+    reply = "".join([c async for c in chat_service.handle_chat("decide by yourself", session_id="r", use_cache=False)])
+    assert '"type": "admin"' in reply
+    [c async for c in chat_service.handle_chat("hello there", session_id="s", use_cache=False)]
+
+    assert chat_timing.turns_total.value(route="strong", model="fake-strong", outcome="ok") == strong_turns + 1
+    assert chat_timing.turns_total.value(route="fast", model="fake-fast", outcome="ok") == fast_turns + 1
+    assert set(chat_service.llms) == {"fast", "strong"}
+    strong_tokens = next(s for s in chat_service.route_stats()["chat_completion_tokens"]
+                         if s["labels"] == {"route": "strong"})
+    assert strong_tokens["sum"] > 0
+    assert set(chat_service.route_stats()) == set(chat_service.ROUTE_METRICS)
+
+
+@pytest.mark.asyncio
+async def test_graph_classifies_turns_without_a_preset_route(monkeypatch):
+    monkeypatch.setenv("CHAT_MODEL_BACKEND", "fake")
+    monkeypatch.setenv("CHAT_FANOUT_ENABLED", "false")
+    monkeypatch.setenv("FAKE_LLM_TOKENS_PER_SECOND", "0")
+    monkeypatch.setenv("FAKE_LLM_TTFT_MS", "0")
+    monkeypatch.setattr(chat_service, "llms", {})
+    monkeypatch.setattr(chat_service, "graph", None)
+    graph = chat_service.get_graph()
+
+    async def nodes(text):
+        state = {"messages": [{"role": "user", "content": text}]}
+        return [next(iter(update)) async for update in graph.astream(state, stream_mode="updates")]
+
+    assert (await nodes("hello there"))[0] == "fast"
+    assert (await nodes("decide by yourself"))[0] == "strong"
+
+
+def test_cache_key_depends_on_routed_model():
+    messages = [{"role": "user", "content": "create app"}]
+    assert chat_service.make_cache_key(messages, chat_service.get_model_name("fast")) != \
+        chat_service.make_cache_key(messages, "another-model")
+
+
+@pytest.mark.asyncio
+async def test_handle_chat_fans_out_complete_app_generation(monkeypatch):
+    monkeypatch.setenv("CHAT_MODEL_BACKEND", "fake")
+    monkeypatch.setenv("FAKE_LLM_TOKENS_PER_SECOND", "0")
+    monkeypatch.setenv("FAKE_LLM_TTFT_MS", "0")
+    monkeypatch.setattr(chat_service, "llms", {})
+    monkeypatch.setattr(chat_service, "graph", None)
+    chat_service.context_store.clear()
+
+    items = [item async for item in chat_service.handle_chat("create app, you decide", session_id="f", use_cache=False)]
+    progress = [item for item in items if isinstance(item, dict)]
+    text = "".join(item for item in items if isinstance(item, str))
+
+    assert [p["stage"] for p in progress[:2]] == ["planning", "planned"]
+    generated = [p for p in progress if p["stage"] == "generated"]
+    assert sorted(p["name"] for p in generated) == ["Dispatch", "Technician", "WorkOrder"]
+    assert generated[-1]["completed"] == generated[-1]["total"] == 3
+    # Planner and branch tokens stay internal; only the merged envelope is streamed
+    reply = json.loads(text)
+    assert reply["type"] == "admin"
+    assert list(reply["config"]["objects"]) == ["WorkOrder", "Technician"]
+    assert reply["config"]["workflows"]["Dispatch"]["steps"][0]["name"] == "Create"
+
+
+
+@pytest.mark.asyncio
+async def test_fan_out_calls_stay_within_the_upstream_limit(monkeypatch):
+    import asyncio
+    from app.services.admission import AdmissionController
+    from app.services.fake_llm import FakeChatModel
+
+    monkeypatch.setenv("CHAT_MODEL_BACKEND", "fake")
+    monkeypatch.setenv("FAKE_LLM_TOKENS_PER_SECOND", "0")
+    monkeypatch.setenv("FAKE_LLM_TTFT_MS", "0")
+    monkeypatch.setattr(chat_service, "llms", {})
+    monkeypatch.setattr(chat_service, "graph", None)
+    monkeypatch.setattr(chat_service, "admission", AdmissionController(max_concurrent=2))
+    chat_service.context_store.clear()
+
+    in_flight = peak = 0
+    astream = FakeChatModel._astream
+
+    async def counted_astream(self, *args, **kwargs):
+        nonlocal in_flight, peak
+        in_flight += 1
+        peak = max(peak, in_flight)
+        try:
+            await asyncio.sleep(0.01)
+            async for chunk in astream(self, *args, **kwargs):
+                yield chunk
+        finally:
+            in_flight -= 1
+
+    monkeypatch.setattr(FakeChatModel, "_astream", counted_astream)
+
+    async def turn(session_id):
+        return [i async for i in chat_service.handle_chat("create app, you decide", session_id=session_id,
+                                                          use_cache=False)]
+
+    turns = await asyncio.gather(turn("cap-a"), turn("cap-b"), turn("cap-c"))
+    # Each turn plans and generates three parts, but never more than two calls run at once
+    for items in turns:
+        assert json.loads("".join(i for i in items if isinstance(i, str)))["type"] == "admin"
+        assert sum(1 for i in items if isinstance(i, dict) and i["stage"] == "generated") == 3
+    assert peak == 2
+    assert chat_service.admission.stats()["extra_calls"] == 0
+
+def workflow_message(record, form_data=None, step=0):
+    return {"role": "user", "content": json.dumps({
+        "type": "workflow_execution",
+        "workflow": {"name": "Dispatch"},
+        "recordId": 7,
+        "recordData": record,
+        "formData": form_data or {},
+        "currentStep": step,
+    })}
+
+
+@pytest.mark.asyncio
+async def test_workflow_context_is_sent_once_then_as_deltas():
+    chat_service.context_store.clear()
+    fake_events = [
+        {"event": "on_chat_model_stream", "data": {"chunk": type("Chunk", (), {"content": "ok"})()}},
+    ]
+    calls = []
+    record = {"title": "Fix pump", "notes": "x" * 500, "status": "open"}
+    first = workflow_message(record)
+    second = workflow_message({**record, "status": "done"}, {"comment": "fixed"}, step=1)
+
+    with patch.object(chat_service, "graph", autospec=True) as mock_graph:
+        mock_graph.astream_events = make_fake_graph(fake_events, calls)
+        [c async for c in chat_service.handle_chat([first], session_id="w")]
+        history = [first, {"role": "assistant", "content": "ok"}, second]
+        [c async for c in chat_service.handle_chat(history, session_id="w")]
+
+    first_turn, second_turn = (call[0]["messages"] for call in calls)
+    # The record is not repeated in the system context
+    assert "Fix pump" not in first_turn[0]["content"]
+    assert "Fix pump" in first_turn[1]["content"]
+    # History is re-sent exactly as first rendered; the new turn only carries the changes
+    assert second_turn[1]["content"] == first_turn[1]["content"]
+    latest = second_turn[3]["content"]
+    assert '"status": "done"' in latest and '"comment": "fixed"' in latest
+    assert "Fix pump" not in latest and "xxxx" not in latest
+    assert "Current Step: 2" in latest
+    # Raw client history is not mutated
+    assert json.loads(history[2]["content"])["type"] == "workflow_execution"
+
+
+@pytest.mark.asyncio
+async def test_workflow_record_is_resent_when_history_is_not():
+    chat_service.context_store.clear()
+    fake_events = [
+        {"event": "on_chat_model_stream", "data": {"chunk": type("Chunk", (), {"content": "ok"})()}},
+    ]
+    calls = []
+    record = {"title": "Fix pump", "status": "open"}
+    first = workflow_message(record)
+    second = workflow_message({**record, "status": "done"}, step=1)
+    third = workflow_message({**record, "status": "closed"}, step=2)
+
+    with patch.object(chat_service, "graph", autospec=True) as mock_graph:
+        mock_graph.astream_events = make_fake_graph(fake_events, calls)
+        [c async for c in chat_service.handle_chat([first], session_id="legacy")]
+        # Legacy clients send only the latest message
+        [c async for c in chat_service.handle_chat([second], session_id="legacy")]
+        # History trimmed past the message that carried the full record
+        [c async for c in chat_service.handle_chat(
+            [second, {"role": "assistant", "content": "ok"}, third], session_id="legacy")]
+        # A typed follow-up without history
+        [c async for c in chat_service.handle_chat("What is left to do?", session_id="legacy")]
+
+    second_turn, trimmed_turn, question_turn = (call[0]["messages"] for call in calls[1:])
+    assert "Current Record:" in second_turn[1]["content"] and '"status": "done"' in second_turn[1]["content"]
+    assert "Current Record:" in trimmed_turn[1]["content"]
+    assert '"status": "closed"' in trimmed_turn[3]["content"] and "Fix pump" not in trimmed_turn[3]["content"]
+    # The record reaches the model through the system context instead
+    assert "Fix pump" in question_turn[0]["content"] and '"closed"' in question_turn[0]["content"]
+
+
+@pytest.mark.asyncio
+async def test_record_bound_turns_never_fan_out(monkeypatch):
+    monkeypatch.setenv("CHAT_MODEL_BACKEND", "fake")
+    monkeypatch.setenv("CHAT_FANOUT_ENABLED", "true")
+    monkeypatch.setenv("CHAT_RECORD_RETRIEVAL_ENABLED", "false")
+    monkeypatch.setenv("FAKE_LLM_TOKENS_PER_SECOND", "0")
+    monkeypatch.setenv("FAKE_LLM_TTFT_MS", "0")
+    monkeypatch.setattr(chat_service, "llms", {})
+    monkeypatch.setattr(chat_service, "graph", None)
+    chat_service.context_store.clear()
+    fanouts = chat_timing.turns_total.value(route="fanout", model="fake-fanout", outcome="ok")
+
+    # The record JSON mentions the decide phrases, but the user typed none of them
+    first = workflow_message({"title": "Boiler", "notes": "you decide; use defaults"})
+    items = [i async for i in chat_service.handle_chat([first], session_id="rb", use_cache=False)]
+    history = [first, {"role": "assistant", "content": "".join(i for i in items if isinstance(i, str))},
+               {"role": "user", "content": "Fine, you decide"}]
+    items += [i async for i in chat_service.handle_chat(history, session_id="rb", use_cache=False)]
+
+    assert not any(isinstance(i, dict) for i in items)
+    assert chat_timing.turns_total.value(route="fanout", model="fake-fanout", outcome="ok") == fanouts
+
+
+@pytest.mark.asyncio
+async def test_user_questions_get_matching_records_within_budget(monkeypatch):
+    chat_service.context_store.clear()
+    chat_service.response_cache.clear()
+    index = RecordIndex()
+    index.last_sync = time.monotonic()  # no database sync in this test
+    index.upsert(1, 10, {"title": "Replace pump", "status": "open", "assigned_to": "Mike"}, "WorkOrder")
+    index.upsert(2, 10, {"title": "Fix leak", "status": "open", "assigned_to": "Ana", "notes": "y" * 4000})
+    index.upsert(3, 10, {"title": "Paint wall", "status": "closed", "assigned_to": "Bo"})
+    monkeypatch.setattr(chat_service, "record_index", index)
+    monkeypatch.setenv("CHAT_RECORD_CONTEXT_TOKENS", "200")
+    fake_events = [
+        {"event": "on_chat_model_stream", "data": {"chunk": type("Chunk", (), {"content": "ok"})()}},
+    ]
+    calls = []
+
+    with patch.object(chat_service, "graph", autospec=True) as mock_graph:
+        mock_graph.astream_events = make_fake_graph(fake_events, calls)
+        [c async for c in chat_service.handle_chat("Which open work orders are assigned to Mike?", session_id="q")]
+        [c async for c in chat_service.handle_chat("create app", session_id="d")]
+
+    system = calls[0][0]["messages"][0]["content"]
+    assert 'WorkOrder #1: {"title":"Replace pump"' in system
+    # The long record does not fit the budget and the unrelated one does not match
+    assert "Fix leak" not in system and "Paint wall" not in system
+    # Design turns are not grounded in records
+    assert "Records matching" not in calls[1][0]["messages"][0]["content"]
+    # Grounded replies depend on the data, so they are not cached
+    assert len(chat_service.response_cache) == 1
+
+
+@pytest.mark.asyncio
+async def test_retrieval_stays_within_the_sessions_app_and_object(monkeypatch):
+    chat_service.context_store.clear()
+    chat_service.response_cache.clear()
+    index = RecordIndex()
+    index.last_sync = time.monotonic()  # no database sync in this test
+    index.upsert(1, 10, {"title": "Replace pump", "assigned_to": "Mike"}, "WorkOrder", app_id=1)
+    index.upsert(2, 20, {"name": "Mike Smith", "skill": "pump"}, "Technician", app_id=1)
+    index.upsert(3, 30, {"title": "Pump invoice", "owner": "Mike"}, "Invoice", app_id=2)
+    monkeypatch.setattr(chat_service, "record_index", index)
+    fake_events = [
+        {"event": "on_chat_model_stream", "data": {"chunk": type("Chunk", (), {"content": "ok"})()}},
+    ]
+    calls = []
+    question = "What does Mike have on pumps?"
+
+    with patch.object(chat_service, "graph", autospec=True) as mock_graph:
+        mock_graph.astream_events = make_fake_graph(fake_events, calls)
+        [c async for c in chat_service.handle_chat(question, session_id="app1", app_id=1)]
+        # The scope sticks to the session for later turns
+        [c async for c in chat_service.handle_chat(question, session_id="app1")]
+        [c async for c in chat_service.handle_chat(question, session_id="obj", app_id=1, object_id=20)]
+
+    in_app, later, in_object = (call[0]["messages"][0]["content"] for call in calls)
+    assert "Replace pump" in in_app and "Mike Smith" in in_app and "Pump invoice" not in in_app
+    assert "Replace pump" in later and "Pump invoice" not in later
+    assert "Mike Smith" in in_object and "Replace pump" not in in_object
+
+
+@pytest.mark.asyncio
+async def test_model_looks_data_up_with_cached_db_tools(monkeypatch):
+    monkeypatch.setenv("CHAT_MODEL_BACKEND", "fake")
+    monkeypatch.setenv("FAKE_LLM_TOKENS_PER_SECOND", "0")
+    monkeypatch.setenv("FAKE_LLM_TTFT_MS", "0")
+    monkeypatch.setenv("CHAT_RECORD_RETRIEVAL_ENABLED", "false")
+    monkeypatch.setattr(chat_service, "llms", {})
+    monkeypatch.setattr(chat_service, "graph", None)
+    chat_service.context_store.clear()
+    queries = []
+
+    def fake_list_objects(app_id=None, **scope):
+        queries.append(app_id)
+        return [{"id": 1, "name": "WorkOrder", "app_id": None, "fields": ["title"]}]
+
+    monkeypatch.setattr(db_tools, "list_objects", fake_list_objects)
+
+    for _ in range(2):
+        reply = "".join([c async for c in chat_service.handle_chat("what objects do I have?", session_id="t", use_cache=False)])
+        assert "WorkOrder" in json.loads(reply)["reply"]
+
+    # The second turn is answered from the session's tool cache
+    assert queries == [None]
+
+
+@pytest.mark.asyncio
+async def test_replies_from_db_tools_are_not_cached_across_sessions(monkeypatch):
+    monkeypatch.setenv("CHAT_MODEL_BACKEND", "fake")
+    monkeypatch.setenv("FAKE_LLM_TOKENS_PER_SECOND", "0")
+    monkeypatch.setenv("FAKE_LLM_TTFT_MS", "0")
+    monkeypatch.setenv("CHAT_RECORD_RETRIEVAL_ENABLED", "false")
+    monkeypatch.setattr(chat_service, "llms", {})
+    monkeypatch.setattr(chat_service, "graph", None)
+    chat_service.context_store.clear()
+    chat_service.response_cache.clear()
+    objects = [[{"id": 1, "name": "WorkOrder", "app_id": None, "fields": ["title"]}]]
+    monkeypatch.setattr(db_tools, "list_objects", lambda app_id=None, **scope: objects[-1])
+
+    first = "".join([c async for c in chat_service.handle_chat("what objects do I have?", session_id="u1")])
+    objects.append([{"id": 2, "name": "Invoice", "app_id": None, "fields": ["total"]}])
+    second = "".join([c async for c in chat_service.handle_chat("what objects do I have?", session_id="u2")])
+
+    assert "WorkOrder" in json.loads(first)["reply"]
+    # The other session queries the current data instead of replaying a stale answer
+    assert "Invoice" in json.loads(second)["reply"]
+    assert len(chat_service.response_cache) == 0
+
+
+@pytest.mark.asyncio
+async def test_handle_chat_records_turn_timings():
+    chat_service.context_store.clear()
+    chat_service.response_cache.clear()
+    fake_events = [
+        {"event": "on_chat_model_stream", "data": {"chunk": type("Chunk", (), {"content": "Which"})()}},
+        {"event": "on_chat_model_stream", "data": {"chunk": type("Chunk", (), {"content": " domain?"})()}},
+    ]
+    calls = []
+
+    with patch.object(chat_service, "graph", autospec=True) as mock_graph:
+        mock_graph.astream_events = make_fake_graph(fake_events, calls)
+        [c async for c in chat_service.handle_chat("create app", session_id="t1")]
+        [c async for c in chat_service.handle_chat("create app", session_id="t1")]
+        # Closing the stream early records the turn as cancelled
+        stream = chat_service.handle_chat("create app", session_id="t1", use_cache=False)
+        await stream.__anext__()
+        await stream.aclose()
+
+    timings = chat_service.context_store["t1"].timings_summary()
+    first, cached, cancelled = timings["turns"]
+    assert first["outcome"] == "ok" and first["chunks"] == 2 and not first["cached"]
+    assert first["completion_tokens"] > 0 and first["queue_wait_ms"] is not None
+    assert cached["outcome"] == "ok" and cached["cached"]
+    assert cancelled["outcome"] == "cancelled" and cancelled["chunks"] == 1
+    assert timings["summary"]["outcomes"] == {"ok": 2, "cancelled": 1}
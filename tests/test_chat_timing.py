@@ -0,0 +1,44 @@
+from app.services.chat_timing import TurnTimings, summarize_turns, ttft_seconds
+
+
+def test_turn_timings_phases_and_gaps():
+    timings = TurnTimings("s")
+    timings.mark_prompt_ready("fast")
+    timings.mark_admitted()
+    before = ttft_seconds.snapshot()
+    for _ in range(3):
+        timings.before_yield()
+        timings.after_yield()
+    timings.set_tokens(100, 30)
+    summary = timings.finish("ok")
+
+    assert summary["route"] == "fast" and summary["outcome"] == "ok"
+    assert summary["chunks"] == 3
+    for key in ("prompt_ms", "queue_wait_ms", "ttft_ms", "stream_ms", "total_ms", "max_gap_ms", "consumer_wait_ms"):
+        assert summary[key] is not None and summary[key] >= 0
+    # finish() only records once
+    assert timings.finish("error")["outcome"] == "ok"
+    assert ttft_seconds.snapshot() != before
+
+
+def test_turn_timings_without_chunks():
+    summary = TurnTimings("s").finish("busy")
+    assert summary["ttft_ms"] is None and summary["chunks"] == 0
+
+
+def test_summarize_turns():
+    turns = [
+        {"outcome": "ok", "ttft_ms": 100.0, "queue_wait_ms": 0.0, "tokens_per_second": 40.0,
+         "max_gap_ms": 20.0, "prompt_tokens": 500, "completion_tokens": 50},
+        {"outcome": "ok", "ttft_ms": 300.0, "queue_wait_ms": 10.0, "tokens_per_second": None,
+         "max_gap_ms": 80.0, "prompt_tokens": 700, "completion_tokens": 70},
+        {"outcome": "busy", "ttft_ms": None, "queue_wait_ms": None, "tokens_per_second": None,
+         "max_gap_ms": 0.0, "prompt_tokens": 0, "completion_tokens": 0},
+    ]
+    summary = summarize_turns(turns)
+    assert summary["turns"] == 3
+    assert summary["outcomes"] == {"ok": 2, "busy": 1}
+    assert summary["avg_ttft_ms"] == 200.0 and summary["max_ttft_ms"] == 300.0
+    assert summary["avg_tokens_per_second"] == 40.0
+    assert summary["max_gap_ms"] == 80.0
+    assert summary["prompt_tokens"] == 1200
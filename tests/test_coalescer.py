@@ -0,0 +1,64 @@
+import asyncio
+import pytest
+from app.services.coalescer import CoalesceSettings, coalesce_chunks
+
+
+async def fake_stream(chunks, delay=0.0):
+    for chunk in chunks:
+        if delay:
+            await asyncio.sleep(delay)
+        yield chunk
+
+
+@pytest.mark.asyncio
+async def test_coalesce_flushes_on_byte_threshold():
+    settings = CoalesceSettings(max_bytes=6, max_delay_ms=1000)
+    frames = [f async for f in coalesce_chunks(fake_stream(["ab", "cd", "ef", "gh", "i"]), settings)]
+    assert frames == ["abcdef", "ghi"]
+
+
+@pytest.mark.asyncio
+async def test_coalesce_flushes_after_delay():
+    settings = CoalesceSettings(max_bytes=1024, max_delay_ms=20)
+
+    async def bursty():
+        yield "Hel"
+        yield "lo"
+        await asyncio.sleep(0.1)
+        yield " world"
+
+    frames = [f async for f in coalesce_chunks(bursty(), settings)]
+    assert frames == ["Hello", " world"]
+
+
+@pytest.mark.asyncio
+async def test_coalesce_disabled_passes_chunks_through():
+    settings = CoalesceSettings(max_bytes=1024, max_delay_ms=0)
+    frames = [f async for f in coalesce_chunks(fake_stream(["a", "b"]), settings)]
+    assert frames == ["a", "b"]
+
+
+@pytest.mark.asyncio
+async def test_coalesce_close_stops_source():
+    closed = asyncio.Event()
+
+    async def endless():
+        try:
+            yield "a"
+            await asyncio.sleep(3600)
+        finally:
+            closed.set()
+
+    frames = coalesce_chunks(endless(), CoalesceSettings(max_bytes=1024, max_delay_ms=10))
+    assert await frames.__anext__() == "a"
+    await frames.aclose()
+    assert closed.is_set()
+
+
+@pytest.mark.asyncio
+async def test_coalesce_passes_progress_events_through_in_order():
+    settings = CoalesceSettings(max_bytes=1024, max_delay_ms=1000)
+    progress = {"type": "progress", "stage": "planning"}
+    frames = [f async for f in coalesce_chunks(fake_stream(["a", "b", progress, "c"]), settings)]
+    # The event flushes the text before it without waiting for the delay
+    assert frames == ["ab", progress, "c"]
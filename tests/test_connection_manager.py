@@ -0,0 +1,107 @@
+import asyncio
+import pytest
+from app.services.chat_protocol import ChatConnection
+from app.services.coalescer import CoalesceSettings
+from app.services.connection_manager import (
+    ConnectionClosed, ConnectionManager, ConnectionSettings, DROP, DISCONNECT
+)
+
+
+class FakeWebSocket:
+    """Minimal socket whose sends block until ``unblock`` is set"""
+
+    client = None
+
+    def __init__(self):
+        self.sent = []
+        self.unblock = asyncio.Event()
+        self.incoming = asyncio.Queue()
+        self.closed_with = None
+
+    async def send_text(self, text):
+        await self.unblock.wait()
+        self.sent.append(text)
+
+    async def receive_text(self):
+        return await self.incoming.get()
+
+    async def close(self, code=1000):
+        self.closed_with = code
+
+
+@pytest.mark.asyncio
+async def test_drop_policy_discards_frames_without_blocking_producer():
+    manager = ConnectionManager()
+    websocket = FakeWebSocket()
+    connection = manager.connect(websocket, ConnectionSettings(max_queue=2, policy=DROP))
+    assert await connection.send("chunk0")
+    await asyncio.sleep(0)
+
+    # The writer holds chunk0 while blocked; two more fit in the queue
+    results = [await connection.send(f"chunk{i}") for i in range(1, 5)]
+    assert results == [True, True, False, False]
+    assert manager.snapshot()[0]["frames_dropped"] == 2
+
+    websocket.unblock.set()
+    await asyncio.sleep(0.01)
+    assert websocket.sent == ["chunk0", "chunk1", "chunk2"]
+    await manager.disconnect(connection)
+    assert manager.summary()["live"] == 0
+
+
+@pytest.mark.asyncio
+async def test_drop_policy_never_drops_legacy_text_chunks():
+    manager = ConnectionManager()
+    websocket = FakeWebSocket()
+    connection = manager.connect(websocket, ConnectionSettings(max_queue=1, policy=DROP, send_timeout=0.05))
+
+    async def handler(**kwargs):
+        for i in range(5):
+            yield f"chunk{i} "
+
+    # Raw text has no seq, so a gap would go unnoticed; the slow client is disconnected instead
+    chat = ChatConnection(connection, handler, CoalesceSettings())
+    with pytest.raises(ConnectionClosed):
+        await chat.stream_legacy({"messages": [], "session_id": "s", "use_cache": None})
+    assert connection.frames_dropped == 0
+    assert websocket.closed_with == 1013
+    await manager.disconnect(connection)
+
+
+@pytest.mark.asyncio
+async def test_disconnect_policy_closes_slow_consumer():
+    manager = ConnectionManager()
+    websocket = FakeWebSocket()
+    connection = manager.connect(websocket, ConnectionSettings(max_queue=1, policy=DISCONNECT, send_timeout=0.05))
+    await asyncio.sleep(0)
+
+    await connection.send("a")
+    await connection.send("b")
+    with pytest.raises(ConnectionClosed):
+        await connection.send("c")
+    assert websocket.closed_with == 1013
+
+    # The receive side notices the close and unwinds
+    with pytest.raises(ConnectionClosed):
+        await connection.receive_text()
+    await manager.disconnect(connection)
+    assert manager.summary()["closed_slow_consumer"] == 1
+
+
+@pytest.mark.asyncio
+async def test_idle_timeout_waits_for_active_streams():
+    manager = ConnectionManager()
+    websocket = FakeWebSocket()
+    connection = manager.connect(websocket, ConnectionSettings(idle_timeout=0.02))
+    busy = [True]
+    connection.is_busy = lambda: busy[0]
+
+    receive = asyncio.create_task(connection.receive_text())
+    await asyncio.sleep(0.05)
+    assert not receive.done()
+
+    busy[0] = False
+    with pytest.raises(ConnectionClosed) as exc_info:
+        await receive
+    assert exc_info.value.reason == "idle"
+    await manager.disconnect(connection)
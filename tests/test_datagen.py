@@ -0,0 +1,107 @@
+import argparse
+import random
+import re
+from datetime import datetime
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.database import Base
+from app.models import Metadata, SchemaObject, SchemaRecord
+from app.utils import datagen
+
+FIELDS = {
+    "name": {"type": "text", "required": True},
+    "email": {"type": "email", "required": True},
+    "phone": {"type": "phone", "required": True},
+    "website": {"type": "url", "required": True},
+    "visits": {"type": "integer", "required": True},
+    "balance": {"type": "currency", "required": True},
+    "discount": {"type": "percentage", "required": True},
+    "active": {"type": "boolean", "required": True},
+    "since": {"type": "date", "required": True},
+    "last_seen": {"type": "datetime", "required": True},
+    "tier": {"type": "select", "required": True, "options": ["Gold", "Silver"]},
+    "tags": {"type": "multiselect", "required": True, "options": ["a", "b", "c", "d"]},
+    "contract": {"type": "file", "required": True},
+    "logo": {"type": "image", "required": True},
+    "severity": {"type": "priority", "required": True},
+    "notes": {"type": "textarea"},
+}
+VALIDATIONS = {"priority": {"options": ["Low", "Medium", "High"]}, "integer": {"min": 1, "max": 5}}
+
+
+def test_values_match_field_types():
+    make = datagen.record_generator(FIELDS, VALIDATIONS)
+    rng = random.Random(1)
+    for i in range(200):
+        data = make(rng, i)
+        assert re.match(r"^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}$", data["email"])
+        assert re.match(r"^[+]?[0-9\s\-\(\)]{10,}$", data["phone"])
+        assert data["website"].startswith("https://")
+        assert 1 <= data["visits"] <= 5
+        assert data["balance"] >= 0 and 0 <= data["discount"] <= 100
+        assert isinstance(data["active"], bool)
+        datetime.strptime(data["since"], "%Y-%m-%d")
+        datetime.strptime(data["last_seen"], "%Y-%m-%d %H:%M:%S")
+        assert data["tier"] in ("Gold", "Silver")
+        assert set(data["tags"]) <= {"a", "b", "c", "d"} and data["tags"]
+        assert data["contract"].rsplit(".", 1)[1] in datagen.FILE_TYPES
+        assert data["logo"].rsplit(".", 1)[1] in datagen.IMAGE_TYPES
+        assert data["severity"] in ("Low", "Medium", "High")
+    # Optional fields are sometimes left out
+    assert any("notes" not in make(rng, i) for i in range(200))
+
+
+def make_database(path):
+    url = f"sqlite:///{path}"
+    engine = create_engine(url)
+    Base.metadata.create_all(bind=engine)
+    with sessionmaker(bind=engine)() as db:
+        db.add(SchemaObject(id=1, name="Customer", fields=FIELDS, app_id=None))
+        db.add(SchemaObject(id=2, name="WorkOrder", app_id=None, fields={
+            "title": {"type": "text", "required": True},
+            "status": {"type": "select", "required": True},
+            "customer": {"type": "reference", "referenced_object": "Customer", "required": True},
+        }))
+        db.add(Metadata(key="field_types", value={"field_types": {"types": [
+            {"value": "priority", "validation": {"options": ["Low", "Medium", "High"]}}]}}))
+        db.add(SchemaRecord(id=1, object_id=1, data={"name": "Existing"}))
+        db.commit()
+    return url, engine
+
+
+def records(engine):
+    with sessionmaker(bind=engine)() as db:
+        return [(r.id, r.object_id, r.data, r.created_at) for r in db.query(SchemaRecord).order_by(SchemaRecord.id)]
+
+
+def test_generate_tops_up_objects_and_links_references(tmp_path):
+    url, engine = make_database(tmp_path / "gen.db")
+
+    added = datagen.generate(url, rows=30, targets={"WorkOrder": 50}, chunk_size=8)
+    # Customer already had one record
+    assert {object_id: len(ids) for object_id, ids in added.items()} == {1: 29, 2: 50}
+    rows = records(engine)
+    assert [r[0] for r in rows] == list(range(1, 81))
+    customers = {r[0] for r in rows if r[1] == 1}
+    assert all(r[2]["customer"] in customers for r in rows if r[1] == 2)
+    assert {r[2]["status"] for r in rows if r[1] == 2} <= set(datagen.NAMED_OPTIONS["status"])
+
+    # Targets already reached: nothing to do
+    assert datagen.generate(url, rows=30, targets={"WorkOrder": 50}) == {}
+
+
+def test_output_does_not_depend_on_worker_count(tmp_path):
+    one_url, one = make_database(tmp_path / "one.db")
+    many_url, many = make_database(tmp_path / "many.db")
+    datagen.generate(one_url, rows=40, chunk_size=7, seed=3, workers=1)
+    datagen.generate(many_url, rows=40, chunk_size=7, seed=3, workers=3)
+    assert records(one) == records(many)
+
+
+def test_parse_targets():
+    assert datagen._parse_targets(["WorkOrder=100", "7=5"]) == {"WorkOrder": 100, "7": 5}
+    with pytest.raises(argparse.ArgumentTypeError):
+        datagen._parse_targets(["WorkOrder"])
@@ -0,0 +1,99 @@
+import json
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from app.database import Base
+from app.models import SchemaObject, SchemaRecord, SchemaWorkflow
+from app.services import db_tools
+from app.utils.ttl_cache import TTLCache
+
+
+@pytest.fixture
+def session_factory():
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Base.metadata.create_all(bind=engine)
+    Session = sessionmaker(bind=engine)
+    with Session() as db:
+        db.add(SchemaObject(id=1, name="WorkOrder", fields={"title": {}, "status": {}}, app_id=None))
+        for i, status in enumerate(["open", "open", "closed"], start=1):
+            db.add(SchemaRecord(id=i, object_id=1, data={"title": f"Job {i}", "status": status, "notes": "x" * 100}))
+        db.add(SchemaWorkflow(id=1, name="Dispatch", steps=[{"name": "Assign"}]))
+        db.commit()
+    return Session
+
+
+def test_query_functions(session_factory):
+    assert db_tools.list_objects(session_factory=session_factory) == [
+        {"id": 1, "name": "WorkOrder", "app_id": None, "fields": ["title", "status"]}
+    ]
+    assert db_tools.count_records(1, {"status": "open"}, session_factory=session_factory)["count"] == 2
+
+    found = db_tools.find_records(1, {"status": "open"}, fields=["title"], limit=1, session_factory=session_factory)
+    assert found["records"] == [{"id": 1, "data": {"title": "Job 1"}}]
+    assert found["truncated"] is True
+
+    assert db_tools.get_workflow(name="Dispatch", session_factory=session_factory)["steps"] == [{"name": "Assign"}]
+    assert db_tools.get_workflow(workflow_id=99, session_factory=session_factory) == {"error": "workflow not found"}
+
+
+@pytest.mark.asyncio
+async def test_call_cached_memoizes_per_session_cache():
+    calls = []
+
+    def query(**kwargs):
+        calls.append(kwargs)
+        return {"count": len(calls)}
+
+    session_config = {"configurable": {"tool_cache": TTLCache(max_entries=8, ttl_seconds=30)}}
+    first = await db_tools.call_cached(session_config, "count", query, object_id=1)
+    second = await db_tools.call_cached(session_config, "count", query, object_id=1)
+    other = await db_tools.call_cached(session_config, "count", query, object_id=2)
+    # Without a session cache every call hits the database
+    await db_tools.call_cached(None, "count", query, object_id=1)
+
+    assert json.loads(first) == json.loads(second) == {"count": 1}
+    assert json.loads(other) == {"count": 2}
+    assert len(calls) == 3
+
+
+@pytest.mark.asyncio
+async def test_queries_stay_within_the_sessions_app(session_factory):
+    from app.models import SchemaApp
+
+    with session_factory() as db:
+        db.add_all([SchemaApp(id=1, name="HR"), SchemaApp(id=2, name="Payroll")])
+        db.add(SchemaObject(id=2, name="Employee", fields={"name": {}}, app_id=1))
+        db.add(SchemaObject(id=3, name="Salary", fields={"amount": {}}, app_id=2))
+        db.add(SchemaRecord(id=10, object_id=3, data={"amount": "9000"}))
+        db.add(SchemaWorkflow(id=2, name="Payday", steps=[], app_id=2))
+        db.commit()
+    hr_chat = {"configurable": {"app_id": 1}}
+
+    # The model asks for another app's records by id
+    found = await db_tools.call_cached(hr_chat, "find_records", db_tools.find_records, object_id=3,
+                                       session_factory=session_factory)
+    assert json.loads(found) == {"error": "object not found"}
+    counted = await db_tools.call_cached(hr_chat, "count_records", db_tools.count_records, object_id=3,
+                                         session_factory=session_factory)
+    assert json.loads(counted) == {"error": "object not found"}
+    listed = await db_tools.call_cached(hr_chat, "list_objects", db_tools.list_objects, app_id=2,
+                                        session_factory=session_factory)
+    assert json.loads(listed) == []
+    workflow = await db_tools.call_cached(hr_chat, "get_workflow", db_tools.get_workflow, name="Payday",
+                                          session_factory=session_factory)
+    assert json.loads(workflow) == {"error": "workflow not found"}
+
+    # An object scope allows only that object, and workflows of its app
+    payroll_chat = {"configurable": {"object_id": 3}}
+    found = await db_tools.call_cached(payroll_chat, "find_records", db_tools.find_records, object_id=3,
+                                       session_factory=session_factory)
+    assert [r["id"] for r in json.loads(found)["records"]] == [10]
+    listed = await db_tools.call_cached(payroll_chat, "list_objects", db_tools.list_objects,
+                                        session_factory=session_factory)
+    assert [o["id"] for o in json.loads(listed)] == [3]
+    workflow = await db_tools.call_cached(payroll_chat, "get_workflow", db_tools.get_workflow, name="Payday",
+                                          session_factory=session_factory)
+    assert json.loads(workflow)["id"] == 2
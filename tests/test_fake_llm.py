@@ -0,0 +1,32 @@
+import json
+import pytest
+from langchain_core.messages import HumanMessage
+from app.services import chat_service
+from app.services.fake_llm import FakeChatModel
+
+
+@pytest.mark.asyncio
+async def test_fake_model_streams_json_envelope():
+    model = FakeChatModel(tokens_per_second=0, ttft_median_ms=0, seed=1)
+    chunks = [chunk.content async for chunk in model.astream([HumanMessage(content="Create app")])]
+
+    assert len(chunks) > 1
+    reply = json.loads("".join(chunks))
+    assert reply["type"] == "admin"
+    assert "WorkOrder" in reply["config"]["objects"]
+
+
+def test_fake_model_is_deterministic_with_seed():
+    model = FakeChatModel(tokens_per_second=0, ttft_median_ms=0, seed=7)
+    first = model.invoke([HumanMessage(content="hello")]).content
+    second = model.invoke([HumanMessage(content="hello")]).content
+    assert first == second
+    assert json.loads(first)["type"] == "continue"
+
+
+def test_backend_selected_by_configuration(monkeypatch):
+    monkeypatch.setenv("CHAT_MODEL_BACKEND", "fake")
+    monkeypatch.setenv("FAKE_LLM_TOKENS_PER_SECOND", "1000")
+    llm = chat_service.build_llm()
+    assert isinstance(llm, FakeChatModel)
+    assert llm.tokens_per_second == 1000
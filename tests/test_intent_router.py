@@ -0,0 +1,60 @@
+from app.services import chat_service
+from app.services.intent_router import (
+    APP_KEYWORDS, DECIDE_KEYWORDS, FANOUT, FAST, OBJECT_KEYWORDS, STRONG, WORKFLOW_KEYWORDS,
+    choose_route, classify_intent,
+)
+
+
+def test_keywords_match_system_prompt_rules():
+    for keyword in APP_KEYWORDS + OBJECT_KEYWORDS + WORKFLOW_KEYWORDS + DECIDE_KEYWORDS:
+        assert f"'{keyword}" in chat_service.SYSTEM_PROMPT
+
+
+def test_classify_intent():
+    assert classify_intent("Please  CREATE app for field service") == "app"
+    assert classify_intent("add object Customer") == "object"
+    assert classify_intent("new workflow for approvals") == "workflow"
+    assert classify_intent("create app, you decide") == "decide"
+    assert classify_intent("what is the weather") is None
+
+
+def test_clarifying_turns_go_to_fast_model():
+    assert choose_route([{"role": "user", "content": "create app"}]) == FAST
+    assert choose_route([{"role": "user", "content": "hello"}]) == FAST
+    assert choose_route([]) == FAST
+
+
+def test_config_generation_goes_to_strong_model():
+    assert choose_route([{"role": "user", "content": "decide by yourself"}]) == STRONG
+    # After two clarifying questions the prompt asks for a schema
+    conversation = [
+        {"role": "user", "content": "create app"},
+        {"role": "assistant", "content": "Which domain?"},
+        {"role": "user", "content": "CRM"},
+        {"role": "assistant", "content": "Which objects?"},
+        {"role": "user", "content": "contacts"},
+    ]
+    assert choose_route(conversation) == STRONG
+    assert choose_route(conversation[:3]) == FAST
+    # A detailed request carries enough to generate straight away
+    detailed = "add object Customer with " + " ".join(f"field{i}" for i in range(30))
+    assert choose_route([{"role": "user", "content": detailed}]) == STRONG
+
+
+def test_complete_app_generation_fans_out_when_enabled():
+    assert choose_route([{"role": "user", "content": "create app, you decide"}], fanout=True) == FANOUT
+    assert choose_route([{"role": "user", "content": "decide by yourself"}], fanout=True) == FANOUT
+    # Single objects and workflows are small enough for one call
+    assert choose_route([{"role": "user", "content": "add object Customer, use defaults"}], fanout=True) == STRONG
+    assert choose_route([{"role": "user", "content": "create app"}], fanout=True) == FAST
+
+
+def test_decide_phrases_match_whole_phrases_only():
+    question = "What is the default priority for work orders?"
+    assert classify_intent(question) is None
+    assert choose_route([{"role": "user", "content": question}], fanout=True) == FAST
+    assert classify_intent("Use defaults, YOU decide.") == "decide"
+    assert classify_intent("anything you decided earlier") is None
+    for reply in ("Default", "defaults please", "just use the default", "go with the defaults", "Defaults are fine"):
+        assert classify_intent(reply) == "decide"
+    assert classify_intent("set the default value of status to open") is None
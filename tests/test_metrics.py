@@ -0,0 +1,74 @@
+from fastapi import FastAPI
+from fastapi.responses import StreamingResponse
+from fastapi.testclient import TestClient
+
+from app.middleware.metrics import MetricsMiddleware, request_seconds, requests_in_progress, requests_total, response_bytes
+from app.utils.metrics import MetricsRegistry, render_prometheus
+
+
+def test_render_prometheus_text_format():
+    registry = MetricsRegistry()
+    registry.counter("jobs_total", "Jobs run", ("queue",)).inc(3, queue='a"b')
+    registry.gauge("workers", "Busy workers").set(2)
+    histogram = registry.histogram("job_seconds", "Job time", buckets=(0.1, 1.0))
+    histogram.observe(0.05)
+    histogram.observe(0.5)
+    histogram.observe(7)
+
+    text = render_prometheus(registry)
+    assert '# TYPE jobs_total counter\njobs_total{queue="a\\"b"} 3\n' in text
+    assert "workers 2\n" in text
+    assert 'job_seconds_bucket{le="0.1"} 1\n' in text
+    assert 'job_seconds_bucket{le="1"} 2\n' in text
+    assert 'job_seconds_bucket{le="+Inf"} 3\n' in text
+    assert "job_seconds_sum 7.55\njob_seconds_count 3\n" in text
+
+
+def make_app():
+    app = FastAPI()
+    app.add_middleware(MetricsMiddleware)
+
+    @app.get("/items/{item_id}")
+    async def get_item(item_id: int):
+        return {"id": item_id}
+
+    @app.get("/stream")
+    async def stream():
+        async def body():
+            yield b"abc"
+            yield b"defg"
+        return StreamingResponse(body())
+
+    return app
+
+
+def test_middleware_labels_requests_by_route_template():
+    client = TestClient(make_app())
+    before = requests_total.value(method="GET", route="/items/{item_id}", status=200)
+    client.get("/items/1")
+    client.get("/items/2")
+    client.get("/nope")
+    client.get("/items/abc")  # validation error, same template
+
+    assert requests_total.value(method="GET", route="/items/{item_id}", status=200) == before + 2
+    assert requests_total.value(method="GET", route="/items/{item_id}", status=422) >= 1
+    assert requests_total.value(method="GET", route="unmatched", status=404) >= 1
+    assert requests_in_progress.value(method="GET") == 0
+    assert request_seconds.quantile(0.5, method="GET", route="/items/{item_id}") is not None
+
+
+def test_middleware_counts_streamed_response_bytes():
+    client = TestClient(make_app())
+    before = [s for s in response_bytes.snapshot() if s["labels"]["route"] == "/stream"]
+    assert client.get("/stream").text == "abcdefg"
+    after = [s for s in response_bytes.snapshot() if s["labels"]["route"] == "/stream"][0]
+    assert after["sum"] - (before[0]["sum"] if before else 0) == 7
+
+
+def test_metrics_endpoint():
+    from app.main import app
+    client = TestClient(app)
+    client.get("/metrics")
+    response = client.get("/metrics")
+    assert response.headers["content-type"].startswith("text/plain; version=0.0.4")
+    assert 'http_requests_total{method="GET",route="/metrics",status="200"}' in response.text
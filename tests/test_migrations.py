@@ -0,0 +1,86 @@
+import logging
+
+import pytest
+from sqlalchemy import create_engine, event, inspect, text
+
+from app import migrations, models  # noqa: F401 (registers the tables on Base)
+from app.database import Base
+
+
+@pytest.fixture
+def engine(tmp_path):
+    return create_engine(f"sqlite:///{tmp_path / 'migrate.db'}")
+
+
+def schema(engine):
+    inspector = inspect(engine)
+    return {
+        table: ({c["name"] for c in inspector.get_columns(table)}, {i["name"] for i in inspector.get_indexes(table)})
+        for table in inspector.get_table_names() if table != "schema_version"
+    }
+
+
+def test_upgrade_matches_models_and_is_idempotent(engine, tmp_path):
+    applied = migrations.upgrade(engine)
+    assert applied == [s.version for s in migrations.discover()]
+    assert migrations.current_version(engine) == applied[-1]
+    assert migrations.upgrade(engine) == []
+
+    # The migrated schema is what the models describe
+    models_engine = create_engine(f"sqlite:///{tmp_path / 'models.db'}")
+    Base.metadata.create_all(bind=models_engine)
+    assert schema(engine) == schema(models_engine)
+
+
+def test_baseline_adopts_a_legacy_database(engine):
+    with engine.begin() as conn:
+        conn.execute(text("CREATE TABLE apps (id INTEGER PRIMARY KEY, name VARCHAR NOT NULL, description TEXT, "
+                          "status VARCHAR NOT NULL, app_metadata JSON, created_at DATETIME, updated_at DATETIME)"))
+        conn.execute(text("CREATE TABLE workflows (id INTEGER PRIMARY KEY, name VARCHAR NOT NULL, steps JSON NOT NULL, "
+                          "created_at DATETIME, updated_at DATETIME)"))
+        conn.execute(text("INSERT INTO workflows (id, name, steps) VALUES (1, 'Dispatch', '[]')"))
+
+    migrations.upgrade(engine, target=1)
+    assert migrations.current_version(engine) == 1
+    columns, _ = schema(engine)["workflows"]
+    assert {"app_id", "layout"} <= columns
+    with engine.connect() as conn:
+        assert conn.execute(text("SELECT name FROM workflows")).scalar() == "Dispatch"
+
+
+def test_online_helpers_refuse_to_run_in_a_transaction(engine):
+    with engine.begin() as conn:
+        m = migrations.Migration(conn, transactional=True)
+        with pytest.raises(migrations.MigrationError):
+            m.create_index("ix_x", "t", ["a"])
+        with pytest.raises(migrations.MigrationError):
+            m.backfill("t", "a = 1")
+
+
+def test_backfill_commits_in_batches(engine):
+    with engine.begin() as conn:
+        conn.execute(text("CREATE TABLE t (id INTEGER PRIMARY KEY, a INTEGER, b INTEGER)"))
+        conn.execute(text("INSERT INTO t (id, a) VALUES (:id, :id)"), [{"id": i} for i in range(1, 101)])
+
+    statements = []
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        # Batches run on their own connections from the engine
+        event.listen(engine, "before_cursor_execute", lambda *args: statements.append(args[2]))
+        m = migrations.Migration(conn, transactional=False)
+        assert m.backfill("t", "b = a * 2", where="b IS NULL", batch_size=30) == 100
+        # Re-running finds nothing left to do
+        assert m.backfill("t", "b = a * 2", where="b IS NULL", batch_size=30) == 0
+    assert sum(s.startswith("UPDATE") for s in statements) == 8
+    with engine.connect() as conn:
+        assert conn.execute(text("SELECT COUNT(*) FROM t WHERE b = a * 2")).scalar() == 100
+
+
+def test_check_warns_about_pending_migrations(engine, caplog, monkeypatch):
+    monkeypatch.setenv("DB_AUTO_MIGRATE", "false")
+    with caplog.at_level(logging.WARNING, logger="app.migrations"):
+        assert migrations.check(engine) is False
+    assert "pending migration" in caplog.text
+
+    monkeypatch.setenv("DB_AUTO_MIGRATE", "true")
+    assert migrations.check(engine) is True
+    assert migrations.pending(engine) == []
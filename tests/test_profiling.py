@@ -0,0 +1,95 @@
+import cProfile
+import time
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.middleware import profiling
+from app.middleware.profiling import ProfileStore, ProfilingMiddleware
+from app.routers.profiles import router as profiles_router
+
+SECRET = "s3cret"
+
+
+@pytest.fixture
+def store(tmp_path, monkeypatch):
+    monkeypatch.setenv("PROFILING_SECRET", SECRET)
+    store = ProfileStore(str(tmp_path), max_files=2)
+    monkeypatch.setattr(profiling, "_store", store)
+    return store
+
+
+@pytest.fixture
+def client(store):
+    app = FastAPI()
+    app.add_middleware(ProfilingMiddleware)
+    app.include_router(profiles_router)
+
+    @app.get("/items/{item_id}")
+    async def get_item(item_id: int):
+        return {"id": item_id, "total": sum(range(1000))}
+
+    return TestClient(app)
+
+
+def test_sign_and_verify():
+    token = profiling.sign("/items/1", secret=SECRET)
+    assert profiling.verify(token, "/items/1", secret=SECRET)
+    assert not profiling.verify(token, "/items/2", secret=SECRET)
+    assert not profiling.verify(token, "/items/1", secret="other")
+    assert not profiling.verify(token, "/items/1", secret="")
+    assert not profiling.verify(profiling.sign("/items/1", ttl=-5, secret=SECRET), "/items/1", secret=SECRET)
+    assert not profiling.verify("garbage", "/items/1", secret=SECRET)
+
+
+def test_store_keeps_newest_profiles(store):
+    ids = []
+    for i in range(3):
+        profile_id = store.new_id()
+        store.save(profile_id, cProfile.Profile(), {"path": f"/p/{i}"})
+        ids.append(profile_id)
+        time.sleep(0.002)
+
+    assert [p["path"] for p in store.list()] == ["/p/2", "/p/1"]
+    assert store.path(ids[0]) is None
+    assert store.path(ids[2]) is not None
+    assert store.path("../../etc/passwd") is None
+
+
+def test_signed_request_is_profiled(client, store):
+    response = client.get("/items/7", headers={"X-Profile": profiling.sign("/items/7")})
+    assert response.json()["id"] == 7
+    profile_id = response.headers["x-profile-id"]
+
+    [meta] = store.list()
+    assert meta["id"] == profile_id
+    assert meta["method"] == "GET" and meta["path"] == "/items/7" and meta["status"] == 200
+
+    # The query flag works too
+    response = client.get(f"/items/8?profile={profiling.sign('/items/8')}")
+    assert "x-profile-id" in response.headers
+
+
+def test_unsigned_or_mismatched_requests_are_not_profiled(client, store):
+    assert "x-profile-id" not in client.get("/items/1").headers
+    assert "x-profile-id" not in client.get("/items/1", headers={"X-Profile": profiling.sign("/items/2")}).headers
+    assert store.list() == []
+
+
+def test_admin_endpoints_require_signature(client, store):
+    client.get("/items/3", headers={"X-Profile": profiling.sign("/items/3")})
+    assert client.get("/admin/profiles").status_code == 403
+
+    admin = {"X-Profile": profiling.sign(profiling.ADMIN_PATH)}
+    [meta] = client.get("/admin/profiles", headers=admin).json()
+    report = client.get(f"/admin/profiles/{meta['id']}", headers=admin)
+    assert report.status_code == 200
+    assert "function calls" in report.text
+
+    raw = client.get(f"/admin/profiles/{meta['id']}?format=pstats", headers=admin)
+    assert raw.headers["content-type"] == "application/octet-stream"
+    assert client.get(f"/admin/profiles/{meta['id']}?sort=bogus", headers=admin).status_code == 400
+    assert client.get("/admin/profiles/123-deadbeef", headers=admin).status_code == 404
+    # Listing requests are never profiled themselves
+    assert len(client.get("/admin/profiles", headers=admin).json()) == 1
@@ -0,0 +1,95 @@
+import logging
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, text
+from sqlalchemy.pool import StaticPool
+
+from app.middleware.query_stats import QueryStatsMiddleware, db_seconds_per_request, statements_per_request
+from app.utils import query_stats
+
+
+def make_engine():
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    query_stats.instrument_engine(engine)
+    query_stats.instrument_engine(engine)
+    return engine
+
+
+def test_stats_collected_only_inside_a_context():
+    engine = make_engine()
+    with engine.connect() as conn:
+        conn.execute(text("SELECT 1"))
+        token = query_stats.start()
+        conn.execute(text("SELECT 1"))
+        conn.execute(text("SELECT :a, :b"), {"a": 1, "b": "xy"})
+        stats = query_stats.current()
+        query_stats.stop(token)
+
+    assert query_stats.current() is None
+    # instrument_engine is idempotent, so each statement is counted once
+    assert stats.count == 2
+    assert stats.total >= stats.slowest > 0
+    assert stats.to_dict()["slowest_statement"] in ("SELECT 1", "SELECT ?, ?")
+
+
+def test_parameter_shape_hides_values():
+    assert query_stats.parameter_shape({"id": 3, "name": "secret", "x": None}) == {
+        "id": "int", "name": "str(6)", "x": "NULL"}
+    assert query_stats.parameter_shape((1, b"ab")) == ["int", "bytes(2)"]
+    assert query_stats.parameter_shape([(1, "a"), (2, "b")], executemany=True) == {
+        "rows": 2, "row": ["int", "str(1)"]}
+
+
+def test_slow_query_logged_with_parameter_shapes(monkeypatch, caplog):
+    monkeypatch.setenv("DB_SLOW_QUERY_MS", "0")
+    engine = make_engine()
+    with caplog.at_level(logging.WARNING, logger="app.utils.query_stats"):
+        with engine.connect() as conn:
+            conn.execute(text("SELECT :name"), {"name": "hunter2"})
+
+    assert "Slow query" in caplog.text
+    assert "str(7)" in caplog.text
+    assert "hunter2" not in caplog.text
+
+
+def make_app(engine, debug_headers):
+    app = FastAPI()
+    app.add_middleware(QueryStatsMiddleware, debug_headers=debug_headers)
+
+    @app.get("/things/{thing_id}")
+    async def get_thing(thing_id: int):
+        # One query per item, like an N+1 loop
+        with engine.connect() as conn:
+            for i in range(thing_id):
+                conn.execute(text("SELECT :i"), {"i": i})
+        return {"id": thing_id}
+
+    return app
+
+
+def _series(histogram, route):
+    for item in histogram.snapshot():
+        if item["labels"] == {"method": "GET", "route": route}:
+            return item
+    return {"count": 0, "sum": 0}
+
+
+def test_middleware_records_per_request_metrics_and_headers():
+    engine = make_engine()
+    before = _series(statements_per_request, "/things/{thing_id}")
+    response = TestClient(make_app(engine, debug_headers=True)).get("/things/3")
+
+    assert response.headers["x-db-statements"] == "3"
+    assert float(response.headers["x-db-time-ms"]) >= float(response.headers["x-db-slowest-ms"])
+    assert response.headers["server-timing"].startswith("db;dur=")
+    after = _series(statements_per_request, "/things/{thing_id}")
+    assert after["count"] == before["count"] + 1
+    assert after["sum"] == before["sum"] + 3
+    assert _series(db_seconds_per_request, "/things/{thing_id}")["count"] >= 1
+
+
+def test_middleware_headers_only_in_debug():
+    response = TestClient(make_app(make_engine(), debug_headers=False)).get("/things/2")
+    assert response.status_code == 200
+    assert "x-db-statements" not in response.headers
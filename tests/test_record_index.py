@@ -0,0 +1,122 @@
+import threading
+from datetime import datetime
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from app.database import Base
+from app.models import SchemaObject, SchemaRecord
+from app.services.record_index import RecordIndex, tokenize
+
+
+def make_index():
+    index = RecordIndex()
+    index.upsert(1, 10, {"title": "Replace pump", "status": "open", "assigned_to": "Mike"}, "WorkOrder")
+    index.upsert(2, 10, {"title": "Inspect boiler", "status": "closed", "assigned_to": "Mike"})
+    index.upsert(3, 10, {"title": "Fix leak", "status": "open", "assigned_to": "Ana"})
+    index.upsert(4, 20, {"name": "Mike Smith", "email": "mike@example.com"}, "Technician")
+    return index
+
+
+def test_tokenize_splits_identifiers_and_plurals():
+    assert tokenize("WorkOrders assigned_to Mike's") == ["work", "order", "assigned", "to", "mike", "s"]
+
+
+def test_search_ranks_matching_records():
+    index = make_index()
+    results = index.search("which open work orders are assigned to Mike?", k=2)
+    assert results[0][1]["id"] == 1
+    assert results[0][1]["object"] == "WorkOrder"
+    assert [r["id"] for _, r in index.search("mike", k=5, object_ids=[20])] == [4]
+    assert index.search("nothing matches", k=5) == []
+
+
+def test_upsert_replaces_previous_terms():
+    index = make_index()
+    index.upsert(3, 10, {"title": "Fix leak", "status": "closed", "assigned_to": "Ana"})
+    assert 3 not in [r["id"] for _, r in index.search("open", k=5)]
+    index.remove(3)
+    assert len(index) == 3
+    assert "ana" not in index.postings
+
+
+def test_sync_from_db_picks_up_new_updated_and_deleted_records():
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Base.metadata.create_all(bind=engine)
+    Session = sessionmaker(bind=engine)
+    with Session() as db:
+        db.add(SchemaObject(id=1, name="WorkOrder", fields={}))
+        db.add(SchemaRecord(id=1, object_id=1, data={"title": "Replace pump"}, updated_at=datetime(2025, 1, 1)))
+        db.commit()
+
+    index = RecordIndex()
+    index.sync_from_db(Session)
+    assert index.search("pump", k=1)[0][1]["object"] == "WorkOrder"
+
+    with Session() as db:
+        record = db.get(SchemaRecord, 1)
+        record.data = {"title": "Replace valve"}
+        record.updated_at = datetime(2025, 1, 2)
+        db.add(SchemaRecord(id=2, object_id=1, data={"title": "Check pump"}, updated_at=datetime(2025, 1, 3)))
+        db.commit()
+
+    index.sync_from_db(Session)
+    assert len(index) == 2
+    assert index.watermark == datetime(2025, 1, 3)
+    assert index.search("valve", k=1)[0][1]["id"] == 1
+    assert index.search("pump", k=1)[0][1]["id"] == 2
+
+    # Deleted rows are dropped on the next sync, though nothing was updated
+    with Session() as db:
+        db.delete(db.get(SchemaRecord, 2))
+        db.commit()
+    index.sync_from_db(Session)
+    assert len(index) == 1
+    assert index.search("pump", k=5) == []
+
+
+def test_search_is_limited_to_an_app_or_object():
+    index = make_index()
+    index.upsert(5, 30, {"title": "Open ticket for Mike"}, "Ticket", app_id=2)
+    index.object_apps.update({10: 1, 20: 1})
+    assert {r["id"] for _, r in index.search("open mike", k=10, app_id=1)} == {1, 2, 3, 4}
+    assert [r["id"] for _, r in index.search("open mike", k=10, app_id=2)] == [5]
+    assert [r["id"] for _, r in index.search("open mike", k=10, object_ids=[20], app_id=1)] == [4]
+    assert index.object_of(5) == 30 and index.object_of(99) is None
+
+
+def test_concurrent_syncs_scan_once():
+    scans = []
+    started = threading.Event()
+    release = threading.Event()
+
+    class NoRows(list):
+        def filter(self, *conditions):
+            return self
+
+        def yield_per(self, count):
+            return self
+
+    class SlowSession:
+        def __init__(self):
+            scans.append(self)
+
+        def query(self, *columns):
+            started.set()
+            release.wait(5)
+            return NoRows()
+
+        def close(self):
+            pass
+
+    index = RecordIndex()
+    first = threading.Thread(target=index.maybe_sync, args=(60, SlowSession))
+    first.start()
+    assert started.wait(5)
+    # A turn arriving mid-sync searches the current index instead of scanning again, even when due
+    index.maybe_sync(0, SlowSession)
+    release.set()
+    first.join()
+    index.maybe_sync(60, SlowSession)
+    assert len(scans) == 1
@@ -0,0 +1,45 @@
+import json
+from app.services.reply_parser import ReplyStreamParser
+
+
+def run_parser(text, chunk_size):
+    parser = ReplyStreamParser()
+    events = []
+    for i in range(0, len(text), chunk_size):
+        events.extend(parser.feed(text[i:i + chunk_size]))
+    events.extend(parser.finish())
+    return events
+
+
+def test_reply_deltas_match_reply_for_any_chunking():
+    envelope = {
+        "reply": "- Line \"one\"\n- café \U0001F680 \\ done",
+        "type": "admin",
+        "config": {"objects": {"Customer": {"fields": {"name": {"type": "text"}}}}, "workflows": {}},
+    }
+    text = json.dumps(envelope, indent=2)
+    for chunk_size in (1, 2, 3, 7, len(text)):
+        events = run_parser(text, chunk_size)
+        reply = "".join(e["data"] for e in events if e["type"] == "reply_delta")
+        assert reply == envelope["reply"]
+        assert [e["value"] for e in events if e["type"] == "reply_type"] == ["admin"]
+        assert events[-1] == {"type": "config", "config": envelope["config"]}
+
+
+def test_type_is_sent_before_reply_finishes():
+    parser = ReplyStreamParser()
+    events = parser.feed('{"type": "continue", "config": {"a": [1, {"b": "}"}]}, "reply": "Wh')
+    assert events == [{"type": "reply_type", "value": "continue"}, {"type": "reply_delta", "data": "Wh"}]
+    assert parser.feed('ich domain?"}') == [{"type": "reply_delta", "data": "ich domain?"}]
+
+
+def test_invalid_config_reports_parse_error():
+    events = run_parser('{"reply": "ok", "type": "admin", "config": []}', 4)
+    assert events[-1]["type"] == "parse_error"
+    assert events[-1]["error"] == "config must be an object"
+
+
+def test_plain_text_reply_falls_back_to_raw_text():
+    events = run_parser("Sorry, I can only help with apps.", 5)
+    assert events[0] == {"type": "reply_delta", "data": "Sorry, I can only help with apps."}
+    assert events[1]["type"] == "parse_error"
@@ -0,0 +1,133 @@
+import json
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.middleware.tracing import TracingMiddleware
+from app.services import chat_service
+from app.utils import tracing
+
+PARENT = "00-4bf92f3577b34da6a3ce929d0e0e4736-00f067aa0ba902b7-01"
+
+
+class ListExporter:
+    def __init__(self):
+        self.spans = []
+
+    def export(self, spans):
+        self.spans.extend(spans)
+
+
+@pytest.fixture
+def exporter():
+    exporter = ListExporter()
+    tracer = tracing.configure(exporter, sample_rate=1.0)
+    exporter.flush = tracer.flush
+    yield exporter
+    tracing.configure()
+
+
+def by_name(spans):
+    return {s["name"]: s for s in spans}
+
+
+def test_parse_traceparent():
+    assert tracing.parse_traceparent(PARENT) == ("4bf92f3577b34da6a3ce929d0e0e4736", "00f067aa0ba902b7", True)
+    assert tracing.parse_traceparent(PARENT[:-1] + "0")[2] is False
+    assert tracing.parse_traceparent("00-" + "0" * 32 + "-00f067aa0ba902b7-01") is None
+    assert tracing.parse_traceparent("garbage") is None
+    assert tracing.parse_traceparent(None) is None
+
+
+def test_disabled_tracing_uses_noop_span():
+    tracing.configure()
+    with tracing.span("anything") as span:
+        span.set_attribute("a", 1)
+    assert span is tracing.NOOP_SPAN
+    assert tracing.current_span() is None
+
+
+def test_spans_nest_and_export(exporter):
+    with tracing.span("outer", PARENT, kind="test") as outer:
+        with tracing.span("inner"):
+            tracing.record_span("db.statement", 0.002, statement="SELECT 1")
+        with pytest.raises(ValueError):
+            with tracing.span("failing"):
+                raise ValueError("boom")
+    assert tracing.current_span() is None
+    exporter.flush()
+
+    spans = by_name(exporter.spans)
+    assert spans["outer"]["trace_id"] == "4bf92f3577b34da6a3ce929d0e0e4736"
+    assert spans["outer"]["parent_id"] == "00f067aa0ba902b7"
+    assert spans["outer"]["attributes"] == {"kind": "test"}
+    assert spans["inner"]["parent_id"] == outer.span_id
+    assert spans["db.statement"]["parent_id"] == spans["inner"]["span_id"]
+    assert spans["db.statement"]["duration_ms"] == 2.0
+    assert spans["failing"]["status"] == "error"
+
+    timeline = tracing.format_trace(exporter.spans)
+    assert timeline.splitlines()[0].endswith("outer kind=test")
+    assert "    db.statement statement=SELECT 1" in timeline
+
+
+def test_unsampled_parent_is_not_exported(exporter):
+    with tracing.span("outer", PARENT[:-1] + "0"):
+        with tracing.span("inner"):
+            pass
+    exporter.flush()
+    assert exporter.spans == []
+
+
+def test_file_exporter(tmp_path):
+    path = tmp_path / "spans" / "trace.jsonl"
+    tracing.FileExporter(str(path)).export([{"name": "a"}, {"name": "b"}])
+    assert [json.loads(line)["name"] for line in path.read_text().splitlines()] == ["a", "b"]
+
+
+def test_middleware_continues_incoming_trace(exporter):
+    app = FastAPI()
+    app.add_middleware(TracingMiddleware)
+
+    @app.get("/records/{record_id}")
+    async def get_record(record_id: int):
+        with tracing.span("record.load"):
+            return {"id": record_id}
+
+    response = TestClient(app).get("/records/5", headers={"traceparent": PARENT})
+    exporter.flush()
+
+    spans = by_name(exporter.spans)
+    server = spans["GET /records/{record_id}"]
+    assert server["trace_id"] == "4bf92f3577b34da6a3ce929d0e0e4736"
+    assert server["attributes"]["status"] == 200
+    assert spans["record.load"]["parent_id"] == server["span_id"]
+    assert response.headers["traceresponse"] == f"00-{server['trace_id']}-{server['span_id']}-01"
+
+
+@pytest.mark.asyncio
+async def test_chat_turn_spans(exporter, monkeypatch):
+    monkeypatch.setenv("CHAT_MODEL_BACKEND", "fake")
+    monkeypatch.setenv("FAKE_LLM_TOKENS_PER_SECOND", "0")
+    monkeypatch.setenv("FAKE_LLM_TTFT_MS", "0")
+    monkeypatch.setenv("CHAT_RECORD_RETRIEVAL_ENABLED", "false")
+    monkeypatch.setattr(chat_service, "llms", {})
+    monkeypatch.setattr(chat_service, "graph", None)
+    chat_service.context_store.clear()
+
+    with tracing.span("ws.message", PARENT):
+        chunks = [c async for c in chat_service.handle_chat("hello there", session_id="t", use_cache=False)]
+    assert chunks
+    exporter.flush()
+
+    spans = by_name(exporter.spans)
+    turn = spans["chat.turn"]
+    assert turn["parent_id"] == spans["ws.message"]["span_id"]
+    assert turn["attributes"]["outcome"] == "ok"
+    assert turn["attributes"]["route"] == "fast"
+    for name in ("chat.prompt", "chat.admission"):
+        assert spans[name]["parent_id"] == turn["span_id"]
+    # Graph nodes run in their own tasks but still nest under the turn
+    assert spans["llm.call"]["parent_id"] == turn["span_id"]
+    assert spans["llm.call"]["attributes"]["model"] == "fake-fast"
@@ -1,15 +1,19 @@
+import asyncio
+import json
+import threading
 import pytest
 from fastapi.testclient import TestClient
 from fastapi import WebSocket
 from unittest.mock import patch, AsyncMock
 from app.main import app
+from app.services import chat_service
 
 client = TestClient(app)
 
 @pytest.mark.asyncio
 async def test_websocket_chat_stream(monkeypatch):
     # Mock handle_chat to yield fake streaming chunks
-    async def fake_handle_chat(message):
+    async def fake_handle_chat(messages, **kwargs):
         yield "Hello"
         yield " world!"
 
@@ -20,4 +24,150 @@ async def test_websocket_chat_stream(monkeypatch):
             chunk1 = websocket.receive_text()
             chunk2 = websocket.receive_text()
             assert chunk1 == "Hello"
-            assert chunk2 == " world!" 
\ No newline at end of file
+            assert chunk2 == " world!"
+
+def test_websocket_cancel_closes_upstream_stream():
+    started = threading.Event()
+    closed = threading.Event()
+
+    async def fake_astream_events(*args, **kwargs):
+        try:
+            yield {"event": "on_chat_model_stream", "data": {"chunk": type("Chunk", (), {"content": "Hello"})()}}
+            started.set()
+            # Simulate a slow upstream that never finishes on its own
+            await asyncio.sleep(3600)
+        finally:
+            closed.set()
+
+    with patch.object(chat_service, "graph", autospec=True) as mock_graph:
+        mock_graph.astream_events = fake_astream_events
+        with client.websocket_connect("/ws/chat") as websocket:
+            websocket.send_text(json.dumps({"message": "cancel me", "context": {"session_id": "ws-cancel", "cache": False}}))
+            assert websocket.receive_text() == "Hello"
+            assert started.wait(1)
+
+            websocket.send_text(json.dumps({"type": "cancel"}))
+            assert json.loads(websocket.receive_text()) == {"type": "cancelled", "active": True}
+            assert closed.is_set()
+
+def test_websocket_disconnect_closes_upstream_stream():
+    closed = threading.Event()
+
+    async def fake_astream_events(*args, **kwargs):
+        try:
+            yield {"event": "on_chat_model_stream", "data": {"chunk": type("Chunk", (), {"content": "Hello"})()}}
+            await asyncio.sleep(3600)
+        finally:
+            closed.set()
+
+    with patch.object(chat_service, "graph", autospec=True) as mock_graph:
+        mock_graph.astream_events = fake_astream_events
+        with client.websocket_connect("/ws/chat") as websocket:
+            websocket.send_text(json.dumps({"message": "bye", "context": {"session_id": "ws-disconnect", "cache": False}}))
+            assert websocket.receive_text() == "Hello"
+
+    assert closed.wait(1)
+
+def test_websocket_framed_streams_are_multiplexed():
+    async def fake_handle_chat(messages, session_id="default", **kwargs):
+        content = messages[-1]["content"]
+        if content == "fail":
+            raise RuntimeError("upstream exploded")
+        for word in content.split():
+            await asyncio.sleep(0.01)
+            yield word
+
+    with patch("app.services.chat_service.handle_chat", new=fake_handle_chat):
+        with client.websocket_connect("/ws/chat") as websocket:
+            websocket.send_text(json.dumps({"stream_id": "a", "message": "one two three"}))
+            websocket.send_text(json.dumps({"stream_id": "b", "message": "four five"}))
+            websocket.send_text(json.dumps({"stream_id": "c", "message": "fail"}))
+
+            chunks = {"a": [], "b": []}
+            finished = {}
+            while len(finished) < 3:
+                frame = json.loads(websocket.receive_text())
+                if frame["type"] == "chunk":
+                    assert frame["seq"] == len(chunks[frame["stream_id"]])
+                    chunks[frame["stream_id"]].append(frame["data"])
+                else:
+                    finished[frame["stream_id"]] = frame
+
+    assert chunks == {"a": ["one", "two", "three"], "b": ["four", "five"]}
+    assert finished["a"] == {"type": "done", "stream_id": "a", "seq": 3}
+    assert finished["b"] == {"type": "done", "stream_id": "b", "seq": 2}
+    assert finished["c"] == {"type": "error", "stream_id": "c", "error": "upstream exploded"}
+
+def parse_sse(body):
+    events = []
+    for block in body.strip().split("\n\n"):
+        fields = dict(line.split(": ", 1) for line in block.splitlines())
+        events.append((fields["id"], fields["event"], json.loads(fields["data"])))
+    return events
+
+def test_sse_chat_stream_and_resume():
+    async def fake_handle_chat(messages, **kwargs):
+        for word in ["Hello", " world", "!"]:
+            yield word
+
+    with patch("app.services.chat_service.handle_chat", new=fake_handle_chat):
+        response = client.post("/chat/stream", json={"message": "hi", "context": {"session_id": "sse"}})
+        assert response.headers["content-type"].startswith("text/event-stream")
+        events = parse_sse(response.text)
+        assert [e[1] for e in events] == ["chunk", "chunk", "chunk", "done"]
+        assert "".join(e[2]["data"] for e in events if e[1] == "chunk") == "Hello world!"
+
+        # Reconnecting with Last-Event-ID replays only what came after it
+        resumed = client.get("/chat/stream?session_id=sse", headers={"Last-Event-ID": events[1][0]})
+        assert [e[0] for e in parse_sse(resumed.text)] == [events[2][0], events[3][0]]
+
+        assert client.get("/chat/stream?session_id=sse", headers={"Last-Event-ID": "missing:0"}).status_code == 404
+        # Another session cannot replay the reply, and ids are not guessable
+        assert client.get("/chat/stream?session_id=other", headers={"Last-Event-ID": events[0][0]}).status_code == 404
+        assert client.get("/chat/stream", headers={"Last-Event-ID": events[0][0]}).status_code == 404
+        assert not events[0][0].startswith("g1:")
+
+def test_websocket_framed_stream_with_parsed_envelope():
+    reply = json.dumps({"reply": "Which domain?", "type": "continue", "config": {}})
+
+    async def fake_handle_chat(messages, **kwargs):
+        for i in range(0, len(reply), 5):
+            yield reply[i:i + 5]
+
+    with patch("app.services.chat_service.handle_chat", new=fake_handle_chat):
+        with client.websocket_connect("/ws/chat") as websocket:
+            websocket.send_text(json.dumps({"stream_id": "p", "message": "hi", "parse": True}))
+            frames = []
+            while not frames or frames[-1]["type"] != "done":
+                frames.append(json.loads(websocket.receive_text()))
+
+    types = [f["type"] for f in frames]
+    assert "chunk" not in types
+    assert types.index("reply_type") < types.index("config")
+    assert "".join(f["data"] for f in frames if f["type"] == "reply_delta") == "Which domain?"
+    assert frames[-2] == {"type": "config", "stream_id": "p", "config": {}}
+    assert frames[-1]["seq"] == types.count("reply_delta")
+
+def test_session_timings_endpoint():
+    fake_events = [
+        {"event": "on_chat_model_stream", "data": {"chunk": type("Chunk", (), {"content": "Hi"})()}},
+    ]
+
+    async def fake_astream_events(*args, **kwargs):
+        for event in fake_events:
+            yield event
+
+    with patch.object(chat_service, "graph", autospec=True) as mock_graph:
+        mock_graph.astream_events = fake_astream_events
+        with client.websocket_connect("/ws/chat") as websocket:
+            websocket.send_text(json.dumps({"messages": [{"role": "user", "content": "hello"}],
+                                            "context": {"session_id": "timed"}}))
+            assert websocket.receive_text() == "Hi"
+
+    response = client.get("/chat/sessions/timed/timings")
+    assert response.status_code == 200
+    body = response.json()
+    assert body["summary"]["turns"] == 1
+    assert body["turns"][0]["chunks"] == 1
+    assert "chat_ttft_seconds" in client.get("/chat/stats").json()["timings"]
+    assert client.get("/chat/sessions/unknown/timings").status_code == 404
@@ -1,67 +1,80 @@
 #!/usr/bin/env python3
 """
-Script to update existing objects with app_id values
+Script to update existing objects with app_id values.
+
+Runs as a chunked, resumable backfill (app/migrations/backfill.py): objects
+are updated a chunk at a time, each chunk in its own transaction, and an
+interrupted run continues where it stopped.
 """
+import argparse
+import logging
 import sys
 import os
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
-from app.database import SessionLocal
+from sqlalchemy import case, func, select, update
+from app.database import engine
+from app.migrations.backfill import Backfill, add_arguments
 from app.models import SchemaObject, SchemaApp
 
-def update_object_app_ids():
+# Assign objects to apps based on their names
+OBJECT_ASSIGNMENTS = {
+    # Employee Management App (app_id: 1)
+    "Employee": 1,
+    "LeaveRequest": 1,
+    "AttendanceRecord": 1,
+    # Field Service App (app_id: 2)
+    "WorkOrder": 2,
+    "Dispatcher": 2,
+    "Technician": 2,
+    "Customer": 2,
+}
+
+def update_object_app_ids(chunk_size=1000, rows_per_second=None, restart=False):
     """Update existing objects with app_id values"""
-    db = SessionLocal()
-    
-    try:
-        # Get all apps
-        apps = db.query(SchemaApp).all()
-        if not apps:
-            print("No apps found. Please create some apps first.")
-            return
-        
-        print(f"Found {len(apps)} apps:")
-        for app in apps:
-            print(f"- App {app.id}: {app.name}")
-        
-        # Get all objects without app_id
-        objects = db.query(SchemaObject).filter(SchemaObject.app_id.is_(None)).all()
-        print(f"\nFound {len(objects)} objects without app_id:")
-        
-        # Assign objects to apps based on their names
-        object_assignments = {
-            # Employee Management App (app_id: 1)
-            "Employee": 1,
-            "LeaveRequest": 1,
-            "AttendanceRecord": 1,
-            # Field Service App (app_id: 2)
-            "WorkOrder": 2,
-            "Dispatcher": 2,
-            "Technician": 2,
-            "Customer": 2,
-        }
-        
-        updated_count = 0
-        for obj in objects:
-            if obj.name in object_assignments:
-                obj.app_id = object_assignments[obj.name]
-                updated_count += 1
-                print(f"- Assigned {obj.name} to app {object_assignments[obj.name]}")
-            else:
-                print(f"- No assignment found for {obj.name}")
-        
-        if updated_count > 0:
-            db.commit()
-            print(f"\nSuccessfully updated {updated_count} objects with app_id values")
-        else:
-            print("\nNo objects were updated")
-            
-    except Exception as e:
-        print(f"Error updating object app_ids: {e}")
-        db.rollback()
-        raise
-    finally:
-        db.close()
+    with engine.connect() as conn:
+        app_ids = set(conn.execute(select(SchemaApp.id)).scalars())
+    if not app_ids:
+        print("No apps found. Please create some apps first.")
+        return
+
+    assignments = {name: app_id for name, app_id in OBJECT_ASSIGNMENTS.items() if app_id in app_ids}
+    for name, app_id in OBJECT_ASSIGNMENTS.items():
+        if app_id not in app_ids:
+            print(f"- App {app_id} does not exist; skipping {name}")
+    if not assignments:
+        print("\nNo objects were updated")
+        return
+
+    objects = SchemaObject.__table__
+
+    def assign(conn, first, last):
+        return conn.execute(
+            update(objects)
+            .where(objects.c.id.between(first, last), objects.c.app_id.is_(None), objects.c.name.in_(assignments))
+            .values(app_id=case(assignments, value=objects.c.name))
+        ).rowcount
+
+    backfill = Backfill("update_object_app_ids", "objects", assign, engine=engine,
+                        chunk_size=chunk_size, rows_per_second=rows_per_second)
+    if restart:
+        backfill.reset()
+    result = backfill.run()
+    if result["finished_at"] and not result["scanned"]:
+        print(f"Already finished at {result['finished_at']:%Y-%m-%d %H:%M:%S} and no rows were added since; "
+              "nothing to do. Re-run with --restart to scan every row again.")
+        return
+    print(f"\nSuccessfully updated {result['changed']} objects with app_id values "
+          f"({result['scanned']} scanned in {result['chunks']} chunks)")
+
+    with engine.connect() as conn:
+        unassigned = conn.execute(
+            select(objects.c.name, func.count()).where(objects.c.app_id.is_(None)).group_by(objects.c.name)
+        ).all()
+    for name, count in unassigned:
+        print(f"- No assignment found for {name} ({count} objects)")
 
 if __name__ == "__main__":
-    update_object_app_ids() 
\ No newline at end of file
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+    args = add_arguments(argparse.ArgumentParser(description=__doc__)).parse_args()
+    update_object_app_ids(args.chunk_size, args.rows_per_second, args.restart)